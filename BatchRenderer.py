@@ -0,0 +1,268 @@
+"""
+Module for BatchRenderer class, which renders plots of sampler data to image files without
+the GUI, e.g. for shift reports:
+
+    python BatchRenderer.py jobs.json --output-dir plots --workers 4
+
+where jobs.json holds a list of jobs like:
+
+    [{"alias": "weather2", "y": ["WINDVEL"], "y2": ["TEMP_1"], "hours": 24}]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from SamplerData import SamplerData, read_table_columns, read_table_units
+from PlotData import PlotData
+from LogViewConfig import find_sparrow_file, load_aliases, load_derived_columns, derived_columns_for
+
+# batch plots are decimated to about this many points per line, like the GUI's
+MAX_PLOT_POINTS = 4000
+
+def group_overlapping(jobs):
+    """
+    Groups jobs whose time ranges overlap (or touch), so that each group can be read in one
+    pass, without reading the files between ranges that don't.
+
+    Returns:
+        list: The indices of the jobs in each group, with the groups in time order.
+    """
+    groups = []
+    group_end = None
+    for i in sorted(range(len(jobs)), key=lambda i: jobs[i]['start']):
+        if groups and jobs[i]['start'] <= group_end:
+            groups[-1].append(i)
+            group_end = max(group_end, jobs[i]['end'])
+        else:
+            groups.append([i])
+            group_end = jobs[i]['end']
+    return groups
+
+def render_sampler_jobs(directory, jobs, output_dir, derived_columns=None):
+    """
+    Renders all the jobs for one sampler directory.  The jobs whose time ranges overlap are
+    grouped (see group_overlapping), the data for each group is read once, for the union of
+    its columns and time ranges, and each job's plot is made from its share of it.  This is
+    a module level function so that it can run in a worker process.
+
+    Args:
+        directory (str): The sampler directory.
+        jobs (list): Jobs (dicts) with 'x', 'y', 'y2', the expressions, 'start' and 'end'
+            datetimes, and 'output', the image filename.
+        output_dir (str): Where the images are written.
+        derived_columns (list): DerivedColumns the jobs can plot, besides the FITS columns.
+
+    Returns:
+        list: A result dict for each job, with its 'output', 'rows', 'read_seconds' (for the
+        read shared by its group), 'render_seconds' and 'error' (None if the job succeeded).
+    """
+    try:
+        sampler = SamplerData(directory, derived_columns=derived_columns)
+    except Exception as e:
+        return [dict(output=job['output'], rows=0, read_seconds=0.0, render_seconds=0.0, error=str(e)) for job in jobs]
+    results = {}
+    for group in group_overlapping(jobs):
+        group_results = render_job_group(sampler, [jobs[i] for i in group], output_dir)
+        results.update(zip(group, group_results))
+    return [results[i] for i in range(len(jobs))]
+
+def render_job_group(sampler, jobs, output_dir):
+    """
+    Renders jobs on one sampler from a single read of the data, for the union of their
+    columns and time ranges (see render_sampler_jobs).
+
+    Returns:
+        list: A result dict for each job.
+    """
+    results = {}
+    read_start = time.perf_counter()
+    try:
+        start = min(job['start'] for job in jobs)
+        end = max(job['end'] for job in jobs)
+        # the file holding the start of the range began before it
+        files = sampler.get_fits_files_from_names(start, end, before=True)
+        if not files:
+            raise Exception('No FITS files found in the time range.')
+        names = read_table_columns(files[-1])
+        units = read_table_units(files[-1])
+        col_units = dict(zip(names, units))
+        for derived in sampler.derived_columns.values():
+            if all(col in col_units for col in derived.inputs):
+                col_units.setdefault(derived.name, derived.units)
+        # a job asking for columns that aren't there fails alone, without spoiling the shared read
+        for i, job in enumerate(jobs):
+            unknown = [col for col in [job['x']] + job['y'] + job['y2'] if col not in col_units]
+            if unknown:
+                results[i] = dict(output=job['output'], rows=0, read_seconds=0.0, render_seconds=0.0, error=f"Unknown columns: {', '.join(unknown)}")
+        cols = list(dict.fromkeys(['DMJD'] + [col for i, job in enumerate(jobs) if i not in results for col in [job['x']] + job['y'] + job['y2']]))
+        data = sampler.get_data(cols, (start, end), files=files)
+    except Exception as e:
+        return [dict(output=job['output'], rows=0, read_seconds=0.0, render_seconds=0.0, error=str(e)) for job in jobs]
+    read_seconds = time.perf_counter() - read_start
+    for i, job in enumerate(jobs):
+        if i in results:
+            continue
+        render_start = time.perf_counter()
+        result = dict(output=job['output'], rows=0, read_seconds=read_seconds, render_seconds=0.0, error=None)
+        try:
+            if data.shape[0] == 0:
+                raise Exception('No data returned for the selected time range.')
+            rows = data[(data[:, 0] >= sampler.datetime_to_mjd(job['start'])) & (data[:, 0] <= sampler.datetime_to_mjd(job['end']))]
+            if rows.shape[0] == 0:
+                raise Exception('No data returned for the selected time range.')
+            job_data = rows[:, [cols.index(col) for col in [job['x']] + job['y'] + job['y2']]]
+            plot_data = PlotData.from_data(sampler, job_data, job['x'], job['y'], job['y2'], job['x_expr'], job['y_expr'], job['y2_expr'], col_units, max_points=MAX_PLOT_POINTS)
+            fig, ax = plot_data.plot_data()
+            fig.set_size_inches(job['width'], job['height'])
+            FigureCanvasAgg(fig)
+            fig.savefig(os.path.join(output_dir, job['output']), dpi=job['dpi'])
+            result['rows'] = rows.shape[0]
+        except Exception as e:
+            result['error'] = str(e)
+        result['render_seconds'] = time.perf_counter() - render_start
+        results[i] = result
+    return [results[i] for i in range(len(jobs))]
+
+class BatchRenderer:
+
+    """
+    Renders plots of sampler data to image files in parallel, without the GUI.  Each job
+    names an alias from the sparrow file (or a sampler directory), the columns to plot,
+    optional expressions, and a time range.  Jobs for the same sampler are rendered
+    together, in one worker process, so that those whose time ranges overlap share the
+    data read for them.
+    """
+
+    def __init__(self, aliases, root_dir='.', output_dir='.', max_workers=None, derived_columns=None):
+        # configparser lower cases the alias names
+        self.aliases = {alias.lower(): path for alias, path in aliases.items()}
+        # as read by load_derived_columns
+        self.derived_columns = derived_columns if derived_columns is not None else {}
+        self.root_dir = root_dir
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+
+    def load_jobs(self, filename):
+        "reads a list of jobs from the given JSON file"
+        with open(filename) as f:
+            jobs = json.load(f)
+        if not isinstance(jobs, list):
+            raise ValueError(f"{filename} should contain a list of jobs")
+        return jobs
+
+    def normalize_job(self, job, now=None):
+        """
+        Fills in the defaults of a job and resolves its sampler directory and time range.
+        The range is given by 'start' and 'end' (ISO format), or by 'hours' before 'end'
+        (which defaults to now).
+
+        Returns:
+            tuple: (directory, job)
+        """
+        if 'alias' in job:
+            path = self.aliases.get(job['alias'].lower())
+            if path is None:
+                raise ValueError(f"Unknown alias: {job['alias']}")
+            directory = os.path.join(self.root_dir, path)
+        elif 'directory' in job:
+            directory = job['directory']
+        else:
+            raise ValueError("A job needs an alias or a directory")
+        now = now if now is not None else datetime.utcnow()
+        end = datetime.fromisoformat(job['end']) if 'end' in job else now
+        if 'start' in job:
+            start = datetime.fromisoformat(job['start'])
+        else:
+            start = end - timedelta(hours=float(job.get('hours', 24)))
+        y = job.get('y', [])
+        if isinstance(y, str):
+            y = [y]
+        if not y:
+            raise ValueError("A job needs at least one y column")
+        y2 = job.get('y2', [])
+        if isinstance(y2, str):
+            y2 = [y2]
+        name = job.get('alias', os.path.basename(os.path.normpath(directory)))
+        output = job.get('output', f"{name}_{'_'.join(y + y2)}.png".replace(' ', '_').replace(os.sep, '_'))
+        return directory, dict(
+            x=job.get('x', 'DMJD'),
+            y=y,
+            y2=y2,
+            x_expr=job.get('x_expr', 'x+0'),
+            y_expr=job.get('y_expr', 'y*1'),
+            y2_expr=job.get('y2_expr', 'y2*1'),
+            start=start,
+            end=end,
+            output=output,
+            width=float(job.get('width', 8)),
+            height=float(job.get('height', 5)),
+            dpi=int(job.get('dpi', 100)),
+        )
+
+    def render(self, jobs, now=None):
+        """
+        Renders the given jobs, grouped by sampler, in a pool of worker processes.
+
+        Args:
+            jobs (list): Job dicts, as read by load_jobs.
+            now (datetime): The time that relative ranges end at; defaults to now.
+
+        Returns:
+            list: A result dict for each job, in the order given (see render_sampler_jobs).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        results = [None] * len(jobs)
+        groups = {}
+        for i, job in enumerate(jobs):
+            try:
+                directory, normalized = self.normalize_job(job, now=now)
+            except Exception as e:
+                results[i] = dict(output=job.get('output'), rows=0, read_seconds=0.0, render_seconds=0.0, error=str(e))
+                continue
+            # an alias may have derived columns of its own
+            alias = job['alias'].lower() if 'alias' in job else None
+            groups.setdefault((directory, alias), []).append((i, normalized))
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(render_sampler_jobs, directory, [job for _, job in group], self.output_dir, derived_columns_for(self.derived_columns, alias)): group
+                for (directory, alias), group in groups.items()
+            }
+            for future in as_completed(futures):
+                for (i, _), result in zip(futures[future], future.result()):
+                    results[i] = result
+        return results
+
+def main(args=None):
+    "renders the jobs in the given file, and reports how long each took"
+    parser = argparse.ArgumentParser(description='Render plots of sampler data to image files.')
+    parser.add_argument('jobs', help='JSON file holding a list of jobs')
+    parser.add_argument('--output-dir', default='.', help='where the images are written')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes')
+    parser.add_argument('--sparrow', default=None, help='sparrow file with the [Logs] aliases')
+    options = parser.parse_args(args)
+    filename = options.sparrow or find_sparrow_file()
+    aliases, root_dir = load_aliases(filename) if filename else ({}, None)
+    derived_columns = load_derived_columns(filename) if filename else {}
+    renderer = BatchRenderer(aliases, root_dir=root_dir or '.', output_dir=options.output_dir, max_workers=options.workers, derived_columns=derived_columns)
+    jobs = renderer.load_jobs(options.jobs)
+    start = time.perf_counter()
+    results = renderer.render(jobs)
+    failed = 0
+    for result in results:
+        if result['error']:
+            failed += 1
+            print(f"FAILED {result['output']}: {result['error']}")
+        else:
+            print(f"{result['output']}: {result['rows']} rows, read {result['read_seconds']:.2f} s (shared), render {result['render_seconds']:.2f} s")
+    print(f"{len(results) - failed}/{len(results)} plots rendered in {time.perf_counter() - start:.2f} s")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
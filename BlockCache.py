@@ -0,0 +1,51 @@
+"Module for BlockCache class"
+import threading
+from collections import OrderedDict
+
+class BlockCache:
+
+    """
+    A least recently used cache of numpy arrays, bounded by the total number of bytes held.
+    SamplerData uses this to keep the decoded columns of recently read FITS files in memory,
+    so that re-reading a time range (e.g. when zooming in on a plot) doesn't go back to disk.
+    It can be shared by threads: every method holds a lock while it uses the cache.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._blocks)
+
+    def __contains__(self, key):
+        return key in self._blocks
+
+    def get(self, key, default=None):
+        "returns the array for the key, marking it as recently used"
+        with self._lock:
+            if key not in self._blocks:
+                return default
+            self._blocks.move_to_end(key)
+            return self._blocks[key]
+
+    def put(self, key, array):
+        "adds the array to the cache, evicting the least recently used arrays to stay in budget"
+        with self._lock:
+            if key in self._blocks:
+                self.nbytes -= self._blocks.pop(key).nbytes
+            if array.nbytes > self.max_bytes:
+                return
+            self._blocks[key] = array
+            self.nbytes += array.nbytes
+            while self.nbytes > self.max_bytes:
+                _, evicted = self._blocks.popitem(last=False)
+                self.nbytes -= evicted.nbytes
+
+    def clear(self):
+        "removes everything from the cache"
+        with self._lock:
+            self._blocks.clear()
+            self.nbytes = 0
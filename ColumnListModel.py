@@ -0,0 +1,46 @@
+"Module for ColumnListModel class"
+from PySide6.QtCore import QAbstractListModel, QModelIndex, Qt
+
+class ColumnListModel(QAbstractListModel):
+
+    """
+    A list model of the columns of a sampler, shared by the x, y and y2 column pickers, so
+    that a sampler with thousands of columns is loaded with one reset of the model rather
+    than by creating an item per column for each picker.  Each row displays "col (units)",
+    and holds the column name in the user role (0x0100).
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.names = []
+        self.units = []
+        # the row of each column name, so that looking one up doesn't scan the list
+        self._rows = {}
+
+    def set_columns(self, names, units=None):
+        "replaces the columns, with their units (if known)"
+        self.beginResetModel()
+        self.names = list(names)
+        self.units = list(units) if units is not None else [''] * len(self.names)
+        self._rows = {}
+        for row, name in enumerate(self.names):
+            self._rows.setdefault(name, row)
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.names):
+            return None
+        name = self.names[index.row()]
+        if role == Qt.DisplayRole:
+            units = self.units[index.row()] if index.row() < len(self.units) else ''
+            return f"{name} ({units})"
+        if role == Qt.UserRole:
+            return name
+        return None
+
+    def row_of(self, name):
+        "returns the row of the named column, or -1"
+        return self._rows.get(name, -1)
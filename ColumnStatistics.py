@@ -0,0 +1,184 @@
+"Module for ColumnStatistics class"
+
+import numpy as np
+
+
+class ColumnStatistics:
+
+    """
+    Summary statistics for one column of data that can be computed in a single pass over
+    the data, a chunk at a time, and merged with the statistics of other chunks.  This lets
+    statistics be computed per FITS file, cached, and combined in any order.
+
+    The count, mean and variance are accumulated with the numerically stable update of
+    Chan et al., the min and max exactly, and the quantiles and histogram approximately,
+    from a mergeable quantile sketch: a stack of buffers where each item in level i stands
+    for 2**i of the original values.  When a level grows past sketch_size items, it is
+    sorted and every other item is promoted to the next level.
+    """
+
+    def __init__(self, sketch_size=256):
+        self.count = 0
+        self.nan_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sketch_size = sketch_size
+        self.levels = []
+        # alternates which half of a sorted level is promoted, to avoid biasing quantiles
+        self._offset = 0
+
+    def __repr__(self):
+        return f"ColumnStatistics(count={self.count}, mean={self.mean}, std={self.std}, min={self.min}, max={self.max})"
+
+    @property
+    def variance(self):
+        "the (population) variance of the values"
+        return self.m2 / self.count if self.count > 0 else np.nan
+
+    @property
+    def std(self):
+        "the (population) standard deviation of the values"
+        return np.sqrt(self.variance)
+
+    def add(self, values):
+        """
+        Adds a chunk of values to the statistics.  NaNs are counted, but otherwise ignored.
+
+        Args:
+            values (array_like): The values to add.
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        nans = np.isnan(values)
+        num_nans = int(nans.sum())
+        if num_nans:
+            self.nan_count += num_nans
+            values = values[~nans]
+        if len(values) == 0:
+            return
+        chunk = ColumnStatistics(self.sketch_size)
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(((values - chunk.mean) ** 2).sum())
+        chunk.min = float(values.min())
+        chunk.max = float(values.max())
+        chunk.levels = [values]
+        self._merge_moments(chunk)
+        self._merge_sketch(chunk)
+
+    def merge(self, other):
+        """
+        Merges the statistics of another chunk of data into these statistics.
+
+        Args:
+            other (ColumnStatistics): The statistics to merge.
+
+        Returns:
+            ColumnStatistics: self, to allow chaining.
+        """
+        self.nan_count += other.nan_count
+        if other.count > 0:
+            self._merge_moments(other)
+            self._merge_sketch(other)
+        return self
+
+    def _merge_moments(self, other):
+        "combines the count, mean, m2, min and max of the two sets of values"
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def _merge_sketch(self, other):
+        "combines the quantile sketch levels of the two sets of values, then compacts them"
+        for i, level in enumerate(other.levels):
+            if i < len(self.levels):
+                self.levels[i] = np.concatenate([self.levels[i], level])
+            else:
+                self.levels.append(np.array(level))
+        i = 0
+        while i < len(self.levels):
+            level = self.levels[i]
+            if len(level) > self.sketch_size:
+                level = np.sort(level)
+                # an odd item out stays behind in this level
+                keep = level[-1:] if len(level) % 2 else level[:0]
+                promoted = level[self._offset:len(level) - len(keep):2]
+                self._offset = 1 - self._offset
+                self.levels[i] = keep
+                if i + 1 < len(self.levels):
+                    self.levels[i + 1] = np.concatenate([self.levels[i + 1], promoted])
+                else:
+                    self.levels.append(promoted)
+            i += 1
+
+    def _sketch_items(self):
+        "returns the sorted items in the sketch and their weights"
+        if not self.levels:
+            return np.array([]), np.array([])
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** i) for i, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantile(self, q):
+        """
+        Returns the approximate quantile(s) of the values.
+
+        Args:
+            q (float or array_like): Quantile(s) to compute, between 0 and 1.
+
+        Returns:
+            float or np.ndarray: The value(s) at the given quantile(s).
+        """
+        items, weights = self._sketch_items()
+        if len(items) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        cumulative = np.cumsum(weights)
+        ranks = np.asarray(q, dtype=np.float64) * cumulative[-1]
+        indices = np.minimum(np.searchsorted(cumulative, ranks), len(items) - 1)
+        result = items[indices]
+        # the extremes are known exactly
+        result = np.where(np.asarray(q) <= 0, self.min, np.where(np.asarray(q) >= 1, self.max, result))
+        return result if np.ndim(q) else float(result)
+
+    def histogram(self, bins=50):
+        """
+        Returns an approximate histogram of the values, spanning their min to max.
+
+        Args:
+            bins (int): Number of bins.
+
+        Returns:
+            tuple: (counts, bin_edges), as returned by np.histogram.
+        """
+        items, weights = self._sketch_items()
+        if len(items) == 0:
+            return np.histogram([], bins=bins)
+        counts, edges = np.histogram(items, bins=bins, range=(self.min, self.max), weights=weights)
+        # scale the weights so the histogram totals the exact count
+        return counts * (self.count / counts.sum()), edges
+
+    def summary(self, percentiles=(1, 5, 25, 50, 75, 95, 99)):
+        """
+        Returns a dictionary of the statistics, suitable for displaying in a table.
+
+        Args:
+            percentiles (tuple): The percentiles to include.
+        """
+        summary = {
+            'count': self.count,
+            'NaNs': self.nan_count,
+            'min': self.min if self.count else np.nan,
+            'max': self.max if self.count else np.nan,
+            'mean': self.mean if self.count else np.nan,
+            'std': self.std,
+        }
+        values = self.quantile(np.array(percentiles) / 100.0)
+        for p, value in zip(percentiles, values):
+            summary[f"p{p}"] = value
+        return summary
@@ -0,0 +1,153 @@
+"Module for CompactSeries class"
+
+import numpy as np
+
+# how the times of a CompactSeries can be stored: whole ticks (of tick_seconds) or
+# seconds, since its epoch
+COMPACT_TIME_FORMATS = ('int32', 'float32')
+
+def choose_time_format(time_format, span_seconds, step_seconds=None, tick_seconds=0.001):
+    """
+    Returns the format that can store times up to span_seconds from the epoch without
+    losing samples: the one asked for if it fits, else float32 if its precision at the end
+    of the span is within half the step between samples (when the step is known), else
+    None, meaning the times have to be kept as float64.
+
+    Raises:
+        ValueError: If the format is unknown.
+    """
+    if time_format not in COMPACT_TIME_FORMATS:
+        raise ValueError(f"Unknown time format: {time_format}; use one of {', '.join(COMPACT_TIME_FORMATS)}")
+    if time_format == 'int32' and span_seconds / tick_seconds <= np.iinfo(np.int32).max:
+        return 'int32'
+    if step_seconds is None or np.spacing(np.float32(span_seconds)) <= step_seconds / 2:
+        return 'float32'
+    return None
+
+
+class CompactSeries:
+
+    """
+    A compact, in memory form of a query result.  SamplerData.get_data returns a 2D array of
+    float64, where every value takes 8 bytes, though most sampler2log data columns are 4
+    byte floats (E).  Here the times are kept as a float64 epoch (an MJD) plus an offset for
+    each row: either an int32 number of ticks (1 ms by default, exact to half a tick over
+    +/- 24 days), or float32 seconds, whose precision falls with the distance from the
+    epoch (to within about 4 ms a day away).  The other columns keep the dtype they have in
+    the FITS files, so a 50 Hz sampler's time and one E column take 8 bytes a row, not 16.
+
+    Indexing like the 2D array it stands for is supported: series[:, i] gives a column
+    (the DMJD column as float64), and series[rows] gives a CompactSeries of the selected
+    rows, so that it can be decimated and plotted in its place.  to_array() gives the 2D
+    float64 array itself.
+    """
+
+    def __init__(self, epoch, offsets, columns, names, tick_seconds=0.001):
+        self.epoch = float(epoch)
+        self.offsets = offsets
+        # the arrays of the columns other than DMJD, keyed by name
+        self.columns = columns
+        # the names of all the columns, in order, which may include DMJD
+        self.names = list(names)
+        self.tick_seconds = tick_seconds
+
+    def __repr__(self):
+        return f"CompactSeries(rows={len(self)}, names={self.names}, time_format={self.time_format})"
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def shape(self):
+        "the shape of the 2D array this stands for"
+        return (len(self), len(self.names))
+
+    @property
+    def time_format(self):
+        "one of COMPACT_TIME_FORMATS"
+        return 'int32' if self.offsets.dtype == np.int32 else 'float32'
+
+    @property
+    def nbytes(self):
+        "the bytes used by the times and columns"
+        return self.offsets.nbytes + sum(values.nbytes for values in self.columns.values())
+
+    @classmethod
+    def from_columns(cls, dmjd, columns, names, epoch, time_format='int32', tick_seconds=0.001):
+        """
+        Makes a CompactSeries from the DMJD of each row and the other columns.
+
+        Args:
+            dmjd (np.ndarray): The times of the rows, in MJD.
+            columns (dict): The arrays of the other columns, keyed by name.
+            names (list): The names of all the columns, in order.
+            epoch (float): The MJD the times are stored relative to.
+            time_format (str): One of COMPACT_TIME_FORMATS.
+            tick_seconds (float): The length of the ticks of int32 offsets.
+
+        Raises:
+            ValueError: If the format is unknown, or the times are too far from the epoch
+            to be counted in int32 ticks.
+        """
+        seconds = (np.asarray(dmjd, dtype=np.float64) - epoch) * 86400.0
+        if time_format == 'int32':
+            ticks = np.round(seconds / tick_seconds)
+            limit = np.iinfo(np.int32).max
+            if len(ticks) and (ticks.min() < -limit or ticks.max() > limit):
+                raise ValueError(f"Times more than {limit * tick_seconds / 86400.0:.1f} days from the epoch can not be stored in int32 ticks of {tick_seconds} s; use float32")
+            offsets = ticks.astype(np.int32)
+        elif time_format == 'float32':
+            offsets = seconds.astype(np.float32)
+        else:
+            raise ValueError(f"Unknown time format: {time_format}; use one of {', '.join(COMPACT_TIME_FORMATS)}")
+        return cls(epoch, offsets, {name: columns[name] for name in names if name != 'DMJD'}, names, tick_seconds)
+
+    @classmethod
+    def concatenate(cls, series_list):
+        "joins CompactSeries with the same columns, epoch and time format, one after another"
+        first = series_list[0]
+        for series in series_list[1:]:
+            if series.names != first.names or series.epoch != first.epoch or series.offsets.dtype != first.offsets.dtype:
+                raise ValueError("Only CompactSeries with the same columns, epoch and time format can be joined")
+        offsets = np.concatenate([series.offsets for series in series_list])
+        columns = {name: np.concatenate([series.columns[name] for series in series_list]) for name in first.columns}
+        return cls(first.epoch, offsets, columns, first.names, first.tick_seconds)
+
+    @property
+    def dmjd(self):
+        "the times of the rows, in MJD"
+        if self.time_format == 'int32':
+            seconds = self.offsets * self.tick_seconds
+        else:
+            seconds = self.offsets.astype(np.float64)
+        return self.epoch + seconds / 86400.0
+
+    def column(self, name):
+        "returns the values of the named column; DMJD as float64, the others in their own dtype"
+        return self.dmjd if name == 'DMJD' else self.columns[name]
+
+    def __getitem__(self, index):
+        if isinstance(index, tuple):
+            rows, col = index
+            values = self.column(self.names[col])
+            return values[rows]
+        columns = {name: values[index] for name, values in self.columns.items()}
+        return CompactSeries(self.epoch, self.offsets[index], columns, self.names, self.tick_seconds)
+
+    def to_array(self):
+        "returns the 2D float64 array this stands for, as get_data would"
+        if not self.names:
+            return np.zeros((len(self), 0))
+        return np.column_stack([np.asarray(self.column(name), dtype=np.float64) for name in self.names])
+
+    def save(self, file):
+        "writes the series to a file (or file object) in numpy's .npz format"
+        arrays = {f"column_{i}": values for i, values in enumerate(self.columns.values())}
+        np.savez(file, epoch=self.epoch, offsets=self.offsets, tick_seconds=self.tick_seconds, names=np.array(self.names), column_names=np.array(list(self.columns)), **arrays)
+
+    @classmethod
+    def load(cls, file):
+        "reads a series written by save"
+        with np.load(file) as npz:
+            columns = {str(name): npz[f"column_{i}"] for i, name in enumerate(npz['column_names'])}
+            return cls(float(npz['epoch']), npz['offsets'], columns, [str(name) for name in npz['names']], float(npz['tick_seconds']))
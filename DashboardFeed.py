@@ -0,0 +1,152 @@
+"Module for DashboardFeed class"
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from SamplerData import read_table_columns, read_table_units, ordered_mask
+
+
+class DashboardFeed:
+
+    """
+    The data behind the sparklines of one alias on the dashboard: the means of some of its
+    columns over a fixed number of time buckets covering the last few hours.  The first
+    load reads the files in the window; after that, refresh reads only the rows appended
+    to the youngest file since the last update (and any newer files), adds them to their
+    buckets, and slides the window along, dropping the buckets that fall out of it.  Memory
+    use depends on the number of buckets, not on how long the dashboard runs.
+    """
+
+    def __init__(self, alias, sampler, columns, hours=24.0, points=240):
+        self.alias = alias
+        self.sampler = sampler
+        self.columns = list(columns)
+        self.hours = hours
+        self.points = points
+        self.bucket_seconds = hours * 3600.0 / points
+        self.units = {}
+        # the index of the first bucket in the window, counting from MJD 0
+        self.first_bucket = None
+        self.sums = np.zeros((points, len(self.columns)))
+        self.counts = np.zeros((points, len(self.columns)))
+        # the youngest file read, and how many of its rows have been read
+        self.last_file = None
+        self.rows_read = 0
+        # the last sample added, so that samples repeated by the next file are dropped
+        self.last_mjd = -np.inf
+
+    def __repr__(self):
+        return f"DashboardFeed({self.alias!r}, {self.columns}, last_file={self.last_file}, rows_read={self.rows_read})"
+
+    def bucket_index(self, mjd):
+        "the index of the bucket holding the given MJDs, counting from MJD 0"
+        return np.floor(np.asarray(mjd) * 86400.0 / self.bucket_seconds).astype(np.int64)
+
+    def slide(self, now):
+        "moves the window to end at now, dropping the buckets that fall out of it"
+        first_bucket = int(self.bucket_index(self.sampler.datetime_to_mjd(now))) - self.points + 1
+        if self.first_bucket is not None:
+            shift = first_bucket - self.first_bucket
+            if 0 < shift < self.points:
+                self.sums = np.concatenate([self.sums[shift:], np.zeros((shift, len(self.columns)))])
+                self.counts = np.concatenate([self.counts[shift:], np.zeros((shift, len(self.columns)))])
+            elif shift != 0:
+                self.sums[:] = 0
+                self.counts[:] = 0
+        self.first_bucket = first_bucket
+
+    def add(self, block):
+        "adds rows (DMJD then the columns) to the buckets in the window"
+        if block is None or len(block) == 0:
+            return
+        block = block[ordered_mask(block[:, 0], self.last_mjd)]
+        if len(block) == 0:
+            return
+        self.last_mjd = float(block[-1, 0])
+        buckets = self.bucket_index(block[:, 0]) - self.first_bucket
+        inside = (buckets >= 0) & (buckets < self.points)
+        buckets = buckets[inside]
+        values = block[inside, 1:]
+        valid = ~np.isnan(values)
+        for i in range(len(self.columns)):
+            self.sums[:, i] += np.bincount(buckets, weights=np.where(valid[:, i], values[:, i], 0.0), minlength=self.points)
+            self.counts[:, i] += np.bincount(buckets, weights=valid[:, i], minlength=self.points)
+
+    def read_from(self, files, first_row):
+        """
+        Reads the given files, the first of them from first_row on, into the buckets,
+        remembering the last file and how many of its rows were read; returns the number
+        of rows read
+        """
+        num_read = 0
+        for i, file_path in enumerate(files):
+            block, num_rows = self.sampler.read_rows(file_path, ['DMJD'] + self.columns, first_row if i == 0 else 0)
+            if block is None:
+                continue
+            self.add(block)
+            num_read += len(block)
+            self.last_file = file_path
+            self.rows_read = num_rows
+        return num_read
+
+    def load(self, now=None):
+        """
+        Reads the whole window, ending at now (by default the current UTC time); returns
+        the number of rows read
+        """
+        now = now if now is not None else datetime.utcnow()
+        self.first_bucket = None
+        self.sums[:] = 0
+        self.counts[:] = 0
+        self.last_file = None
+        self.rows_read = 0
+        self.last_mjd = -np.inf
+        self.slide(now)
+        # the file holding the start of the window began before it
+        files = self.sampler.get_fits_files_from_names(now - timedelta(hours=self.hours), now, before=True)
+        num_read = self.read_from(files, 0)
+        if self.last_file is not None:
+            self.units = dict(zip(read_table_columns(self.last_file), read_table_units(self.last_file)))
+            self.units.update({name: derived.units for name, derived in self.sampler.derived_columns.items()})
+        return num_read
+
+    def refresh(self, now=None):
+        """
+        Slides the window to end at now, and reads just the rows appended to the youngest
+        file since the last load or refresh, and any files started since; returns the
+        number of rows read
+        """
+        now = now if now is not None else datetime.utcnow()
+        if self.last_file is None:
+            return self.load(now)
+        self.slide(now)
+        last_start = self.sampler.get_datetime_from_filename(self.last_file)
+        files = self.sampler.get_fits_files_from_names(last_start, now + timedelta(days=1))
+        newer = [f for f in files if os.path.basename(f) > os.path.basename(self.last_file)]
+        return self.read_from([self.last_file] + newer, self.rows_read)
+
+    def series(self):
+        """
+        Returns the buckets of the window that have data
+
+        Returns:
+            tuple: (mjd, means), the MJDs of the middles of the buckets, and a 2D array of
+            the mean of each column in each bucket (NaN where a column has no data).
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = np.where(self.counts > 0, self.sums / self.counts, np.nan)
+        has_data = self.counts.sum(axis=1) > 0
+        mjd = (self.first_bucket + np.arange(self.points) + 0.5) * self.bucket_seconds / 86400.0
+        return mjd[has_data], means[has_data]
+
+def refresh_feeds(feeds, now=None, max_workers=4):
+    """
+    Loads the feeds that haven't been loaded yet, and refreshes the rest, in parallel (the
+    samplers are safe to share between threads); returns the number of rows read for each
+    """
+    now = now if now is not None else datetime.utcnow()
+    if not feeds:
+        return []
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda feed: feed.refresh(now), feeds))
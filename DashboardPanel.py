@@ -0,0 +1,72 @@
+"Module for DashboardPanel class"
+import time
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QCheckBox
+from PySide6.QtCore import QTimer
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from astropy.time import Time
+from DashboardFeed import refresh_feeds
+
+class DashboardPanel(QWidget):
+
+    """
+    This class creates a panel of small sparklines, one for each of the aliases and
+    columns given in the dashboard configuration, for an overview of the last few hours.
+    The samplers are read in parallel and drawn in one figure; each refresh reads only the
+    rows added since the last one.
+    """
+
+    def __init__(self, make_feeds, refresh_seconds=60.0, parent=None):
+        super().__init__(parent)
+        self.make_feeds = make_feeds
+        self.feeds = None
+        controls_layout = QHBoxLayout()
+        self.refresh_button = QPushButton('Refresh')
+        controls_layout.addWidget(self.refresh_button)
+        self.auto_refresh = QCheckBox(f'Auto refresh every {refresh_seconds:g} s')
+        controls_layout.addWidget(self.auto_refresh)
+        self.dashboard_label = QLabel('')
+        controls_layout.addWidget(self.dashboard_label, stretch=1)
+        self.figure = Figure(figsize=(4, 3))
+        self.canvas = FigureCanvas(self.figure)
+        layout = QVBoxLayout()
+        layout.addLayout(controls_layout)
+        layout.addWidget(self.canvas, stretch=1)
+        self.setLayout(layout)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(int(refresh_seconds * 1000))
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_button.clicked.connect(self.refresh)
+        self.auto_refresh.toggled.connect(lambda checked: self.refresh_timer.start() if checked else self.refresh_timer.stop())
+
+    def refresh(self, now=None):
+        "reads the new data of all the feeds (all of it the first time) and redraws them"
+        if self.feeds is None:
+            self.feeds = self.make_feeds()
+        start = time.perf_counter()
+        num_rows = refresh_feeds(self.feeds, now)
+        self.dashboard_label.setText(f"{sum(num_rows)} rows read from {len(self.feeds)} samplers in {time.perf_counter() - start:.2f} s")
+        self.plot_feeds()
+
+    def plot_feeds(self):
+        "draws a sparkline for each column of each feed, sharing the time axis, in one pass"
+        self.figure.clear()
+        lines = [(feed, i) for feed in (self.feeds or []) for i in range(len(feed.columns))]
+        if not lines:
+            self.figure.text(0.5, 0.5, 'No [Dashboard] aliases configured', ha='center', va='center')
+        axes = self.figure.subplots(len(lines), 1, sharex=True, squeeze=False)[:, 0] if lines else []
+        for ax, (feed, i) in zip(axes, lines):
+            mjd, means = feed.series()
+            col = feed.columns[i]
+            label = f"{feed.alias}: {col}"
+            units = feed.units.get(col, '')
+            if len(mjd):
+                ax.plot(Time(mjd, format='mjd').datetime, means[:, i], linewidth=0.8)
+                label += f" = {means[-1, i]:.4g} {units}"
+            ax.text(0.01, 0.95, label, transform=ax.transAxes, ha='left', va='top', fontsize='small')
+            ax.tick_params(labelsize='x-small')
+            ax.set_yticks([])
+        if lines:
+            self.figure.autofmt_xdate()
+        self.figure.subplots_adjust(hspace=0.05, left=0.05, right=0.98, top=0.98)
+        self.canvas.draw_idle()
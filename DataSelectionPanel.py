@@ -1,13 +1,18 @@
 
-from PySide6.QtWidgets import QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTextEdit, QComboBox, QListWidget, QListWidgetItem, QGridLayout, QMessageBox
+from PySide6.QtWidgets import QGroupBox, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTextEdit, QComboBox, QListWidget, QListView, QLineEdit, QGridLayout, QMessageBox
+from PySide6.QtCore import Qt, QSortFilterProxyModel, QItemSelection, QItemSelectionModel
 import os
+from ColumnListModel import ColumnListModel
 
 class DataSelectionPanel(QGroupBox):
 
     """
     This class creates a panel for selecting data columns and aliases.
     It allows users to choose x, y, and y2 columns, set expressions for them,
-    and load data from predefined aliases.
+    and load data from predefined aliases.  The column pickers share one ColumnListModel;
+    the y and y2 lists can be narrowed down by typing in the search box, and the columns
+    selected in them are remembered by name, so that they stay selected while the lists
+    are filtered and when another sampler with the same columns is loaded.
     """
 
     def __init__(self, aliases, loadSampler, parent=None, rootDir=None):
@@ -25,14 +30,21 @@ class DataSelectionPanel(QGroupBox):
         fit_columns_panel = QGroupBox('fit columns')
         grid_layout = QGridLayout()
         # create the widgets for choosing what cols to plot
+        self.column_model = ColumnListModel(self)
         self.x_dropdown = QComboBox()
         self.x_dropdown.setObjectName('x')
-        self.y_list = QListWidget()
-        self.y_list.setObjectName('y')
-        self.y_list.setSelectionMode(QListWidget.MultiSelection)
-        self.y2_list = QListWidget()
-        self.y2_list.setObjectName('y2')
-        self.y2_list.setSelectionMode(QListWidget.MultiSelection)
+        self.x_dropdown.setModel(self.column_model)
+        self.column_filter = QLineEdit()
+        self.column_filter.setPlaceholderText('search columns')
+        self.column_filter.setClearButtonEnabled(True)
+        # the names of the columns selected in each list, in the order they were selected
+        self._selected = {'y': [], 'y2': []}
+        # set while the selections are being put back, so that doesn't count as the user's
+        self._restoring = False
+        self._proxies = {}
+        self.y_list = self.make_column_list('y')
+        self.y2_list = self.make_column_list('y2')
+        self._lists = {'y': self.y_list, 'y2': self.y2_list}
         # create the widgets for expressions to apply to the column data
         # here we default to expressions that won't change the actual data values
         self.x_expr = QTextEdit()
@@ -44,6 +56,10 @@ class DataSelectionPanel(QGroupBox):
         self.y2_expr = QTextEdit()
         self.y2_expr.setText('y2*1')
         self.y2_expr.setFixedHeight(self.y2_expr.fontMetrics().height() + 12)
+        # an optional condition rows must satisfy to be plotted, e.g. 'WINDVEL > 10'
+        self.where_expr = QTextEdit()
+        self.where_expr.setPlaceholderText('e.g. WINDVEL > 10 and HUMIDITY_1 >= 0.9')
+        self.where_expr.setFixedHeight(self.where_expr.fontMetrics().height() + 12)
         # layout the widgets in a grid, along with labels
         grid_layout.addWidget(QLabel('Axis:'), 0, 0)
         grid_layout.addWidget(QLabel('Column:'), 0, 1)
@@ -51,12 +67,17 @@ class DataSelectionPanel(QGroupBox):
         grid_layout.addWidget(QLabel('x:'), 1, 0)
         grid_layout.addWidget(self.x_dropdown, 1, 1)
         grid_layout.addWidget(self.x_expr, 1, 2)
-        grid_layout.addWidget(QLabel('y:'), 2, 0)
-        grid_layout.addWidget(self.y_list, 2, 1)
-        grid_layout.addWidget(self.y_expr, 2, 2)
-        grid_layout.addWidget(QLabel('y2:'), 3, 0)
-        grid_layout.addWidget(self.y2_list, 3, 1)
-        grid_layout.addWidget(self.y2_expr, 3, 2)
+        grid_layout.addWidget(QLabel('search:'), 2, 0)
+        grid_layout.addWidget(self.column_filter, 2, 1)
+        grid_layout.addWidget(QLabel('y:'), 3, 0)
+        grid_layout.addWidget(self.y_list, 3, 1)
+        grid_layout.addWidget(self.y_expr, 3, 2)
+        grid_layout.addWidget(QLabel('y2:'), 4, 0)
+        grid_layout.addWidget(self.y2_list, 4, 1)
+        grid_layout.addWidget(self.y2_expr, 4, 2)
+        grid_layout.addWidget(QLabel('where:'), 5, 0)
+        grid_layout.addWidget(self.where_expr, 5, 1, 1, 2)
+        self.column_filter.textChanged.connect(self.filter_columns)
         fit_columns_panel.setLayout(grid_layout)
 
         # Right hand side panel
@@ -98,3 +119,84 @@ class DataSelectionPanel(QGroupBox):
         layout.addWidget(right_panel)
         self.setLayout(layout)
 
+    def make_column_list(self, which):
+        "creates a multiple selection view of the columns, filtered by the search box"
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSourceModel(self.column_model)
+        proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        self._proxies[which] = proxy
+        view = QListView()
+        view.setObjectName(which)
+        view.setModel(proxy)
+        view.setSelectionMode(QListView.MultiSelection)
+        # all the rows are the same height, so wide samplers don't need every row measured
+        view.setUniformItemSizes(True)
+        view.selectionModel().selectionChanged.connect(lambda selected, deselected: self.on_selection_changed(which, selected, deselected))
+        return view
+
+    def on_selection_changed(self, which, selected, deselected):
+        "keeps track of the names of the columns the user selects in a list"
+        if self._restoring:
+            return
+        chosen = self._selected[which]
+        for index in deselected.indexes():
+            name = index.data(Qt.UserRole)
+            if name in chosen:
+                chosen.remove(name)
+        for index in selected.indexes():
+            name = index.data(Qt.UserRole)
+            if name not in chosen:
+                chosen.append(name)
+
+    def restore_selection(self, which):
+        "selects the rows of a list showing the columns remembered as selected in it"
+        proxy = self._proxies[which]
+        selection = QItemSelection()
+        for name in self._selected[which]:
+            row = self.column_model.row_of(name)
+            if row < 0:
+                continue
+            index = proxy.mapFromSource(self.column_model.index(row))
+            if index.isValid():
+                selection.select(index, index)
+        self._restoring = True
+        try:
+            self._lists[which].selectionModel().select(selection, QItemSelectionModel.ClearAndSelect)
+        finally:
+            self._restoring = False
+
+    def filter_columns(self, text):
+        "shows just the columns containing the text in the y and y2 lists"
+        for which, proxy in self._proxies.items():
+            self._restoring = True
+            try:
+                proxy.setFilterFixedString(text)
+            finally:
+                self._restoring = False
+            self.restore_selection(which)
+
+    def set_columns(self, names, units=None):
+        """
+        Shows the given columns (and units) in the pickers, keeping the x column and the
+        selected y and y2 columns that are still among them
+        """
+        x_col = self.x_dropdown.currentData()
+        self._restoring = True
+        try:
+            self.column_model.set_columns(names, units)
+        finally:
+            self._restoring = False
+        for which in self._selected:
+            self._selected[which] = [name for name in self._selected[which] if name in self.column_model.names]
+            self.restore_selection(which)
+        row = self.column_model.row_of(x_col) if x_col is not None else -1
+        self.x_dropdown.setCurrentIndex(max(row, 0) if names else -1)
+
+    def selected_columns(self, which):
+        "returns the names of the columns selected in the 'y' or 'y2' list, in the order they were selected"
+        return list(self._selected[which])
+
+    def select_columns(self, which, names):
+        "selects the named columns in the 'y' or 'y2' list"
+        self._selected[which] = [name for name in dict.fromkeys(names) if self.column_model.row_of(name) >= 0]
+        self.restore_selection(which)
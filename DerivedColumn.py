@@ -0,0 +1,90 @@
+"Module for DerivedColumn class"
+
+import ast
+import re
+import numpy as np
+
+# the names, besides columns, that derived column formulas can use
+FORMULA_NAMES = {
+    'np': np,
+    'abs': np.abs,
+    'sqrt': np.sqrt,
+    'exp': np.exp,
+    'log': np.log,
+    'log10': np.log10,
+    'sin': np.sin,
+    'cos': np.cos,
+    'tan': np.tan,
+    'arctan2': np.arctan2,
+    'hypot': np.hypot,
+    'radians': np.radians,
+    'degrees': np.degrees,
+    'minimum': np.minimum,
+    'maximum': np.maximum,
+    'where': np.where,
+    'pi': np.pi,
+}
+
+
+class DerivedColumn:
+
+    """
+    A virtual column, computed from other columns by a formula, e.g. TEMP_1 - TEMP_2, or
+    WINDVEL * cos(radians(WINDDIR)) for a component of the wind vector.  The formula is a
+    numpy expression of column names and the functions in FORMULA_NAMES, and is evaluated
+    on whole arrays of a file's rows at a time.  Only the columns the formula uses need to
+    be read to compute it.
+    """
+
+    def __init__(self, name, formula, units=''):
+        if not re.fullmatch(r'[A-Za-z_]\w*', name):
+            raise ValueError(f"Derived column name '{name}' must be a valid identifier")
+        try:
+            tree = ast.parse(formula, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Can not parse formula for {name}: '{formula}': {e.msg}")
+        self.name = name
+        self.formula = formula
+        self.units = units
+        # the columns the formula uses, in the order they first appear
+        names = [node.id for node in ast.walk(tree) if isinstance(node, ast.Name)]
+        self.inputs = list(dict.fromkeys(n for n in names if n not in FORMULA_NAMES))
+        if not self.inputs:
+            raise ValueError(f"The formula for {name} does not use any columns: '{formula}'")
+        if name in self.inputs:
+            raise ValueError(f"The formula for {name} can not use {name} itself")
+        self._code = compile(tree, f"<{name}>", 'eval')
+
+    def __repr__(self):
+        return f"DerivedColumn({self.name!r}, {self.formula!r}, {self.units!r})"
+
+    @property
+    def key(self):
+        "identifies the column by its definition, for caching its values"
+        return f"{self.name}={self.formula}"
+
+    @classmethod
+    def parse(cls, name, text):
+        """
+        Makes a derived column from a definition like 'TEMP_1 - TEMP_2 [Celsius]', where
+        the units in square brackets at the end are optional
+        """
+        match = re.fullmatch(r'\s*(.*?)\s*(?:\[([^\[\]]*)\])?\s*', text)
+        return cls(name, match.group(1), (match.group(2) or '').strip())
+
+    def evaluate(self, arrays):
+        """
+        Computes the column.
+
+        Args:
+            arrays (dict): The values of (at least) the input columns, as equal length arrays.
+
+        Returns:
+            np.ndarray: The values of the column.
+        """
+        values = {col: arrays[col] for col in self.inputs}
+        result = eval(self._code, {'__builtins__': {}, **FORMULA_NAMES}, values)
+        result = np.asarray(result, dtype=np.float64)
+        # a formula may come out as a scalar, e.g. if it only uses a column in np.mean
+        shape = np.shape(values[self.inputs[0]])
+        return result if result.shape == shape else np.full(shape, result)
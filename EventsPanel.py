@@ -0,0 +1,71 @@
+"Module for EventsPanel class"
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTextEdit, QListWidget, QListWidgetItem
+from astropy.time import Time
+
+class EventsPanel(QWidget):
+
+    """
+    This class creates a panel for searching for events: the time intervals in which a
+    condition on the data held, e.g. 'WINDVEL > 15', or in which there is no data at all.
+    The intervals found are listed, and activating one calls the given function with its
+    (start, end) datetimes, so that the plot can jump to it.
+    """
+
+    def __init__(self, find_events, jump_to_event, find_gaps=None, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        condition_layout = QHBoxLayout()
+        condition_layout.addWidget(QLabel('condition:'))
+        self.condition_expr = QTextEdit()
+        self.condition_expr.setPlaceholderText('e.g. WINDVEL > 15')
+        self.condition_expr.setFixedHeight(self.condition_expr.fontMetrics().height() + 12)
+        condition_layout.addWidget(self.condition_expr)
+        self.find_button = QPushButton('Find Events')
+        self.find_button.setEnabled(False)
+        condition_layout.addWidget(self.find_button)
+        self.gaps_button = QPushButton('Find Gaps')
+        self.gaps_button.setEnabled(False)
+        condition_layout.addWidget(self.gaps_button)
+        layout.addLayout(condition_layout)
+        self.events_label = QLabel('')
+        layout.addWidget(self.events_label)
+        self.event_list = QListWidget()
+        layout.addWidget(self.event_list)
+        self.setLayout(layout)
+        self.find_button.clicked.connect(find_events)
+        if find_gaps is not None:
+            self.gaps_button.clicked.connect(find_gaps)
+        # the start and end datetimes of each event are kept with its list item
+        self.event_list.itemActivated.connect(lambda item: jump_to_event(*item.data(0x0100)))
+
+    def show_events(self, events):
+        """
+        Lists the given events.
+
+        Args:
+            events (list): (start_dmjd, end_dmjd) tuples.
+        """
+        self.events_label.setText(f"{len(events)} events found")
+        self.list_intervals(events)
+
+    def show_gaps(self, gap_index):
+        """
+        Lists the gaps in the data.
+
+        Args:
+            gap_index (dict): As returned by SamplerData.get_gap_index.
+        """
+        step = gap_index['step_seconds']
+        step_text = f", {step:.3g} s samples" if step else ''
+        self.events_label.setText(f"{len(gap_index['gaps'])} gaps found, data for {gap_index['coverage']:.1%} of the range{step_text}")
+        self.list_intervals(gap_index['gaps'])
+
+    def list_intervals(self, intervals):
+        "lists (start_dmjd, end_dmjd) intervals, keeping their datetimes with their items"
+        self.event_list.clear()
+        for start_mjd, end_mjd in intervals:
+            start_dt, end_dt = Time([start_mjd, end_mjd], format='mjd').datetime
+            duration = (end_dt - start_dt).total_seconds()
+            item = QListWidgetItem(f"{start_dt.strftime('%Y-%m-%d %H:%M:%S')} to {end_dt.strftime('%Y-%m-%d %H:%M:%S')} ({duration:.0f} s)")
+            item.setData(0x0100, (start_dt, end_dt))
+            self.event_list.addItem(item)
@@ -0,0 +1,144 @@
+"Module for reading the LogView configuration from sparrow files"
+
+import os
+import configparser
+import getpass
+from DerivedColumn import DerivedColumn
+
+# defaults for the settings that can be given in the [LogView] section of the sparrow file
+DEFAULT_SETTINGS = {
+    # how much memory the data loaded for one plot may use before it is decimated or summarized
+    'memory_budget_mb': 1024.0,
+    # how much disk space the cache of query results may use; 0 turns the cache off
+    'result_cache_mb': 2048.0,
+    # keep the times of loaded data as 'int32' or 'float32' offsets and the other columns at
+    # their FITS widths (see CompactSeries), rather than as float64; '' turns this off
+    'compact_time': '',
+    # how many hours the sparklines on the dashboard cover
+    'dashboard_hours': 24.0,
+    # how often the dashboard is refreshed when auto refresh is on
+    'dashboard_refresh_s': 60.0,
+    # how many plots back the history goes, and how much memory the most recent of them may
+    # use; the data of the older ones is moved to ~/.cache/logview/history
+    'history_length': 20,
+    'history_memory_mb': 64.0,
+    # how many files are read ahead of the one being decoded, e.g. for archive storage where
+    # every read pays a round trip, and how much memory they may use; 0 files turns this off
+    'read_ahead_files': 2,
+    'read_ahead_mb': 256.0,
+}
+
+def find_sparrow_file():
+    """
+    Returns the first sparrow file that we can find, or None
+    """
+    # first choice: users .sparrow file
+    username = getpass.getuser()
+    user_sparrow_file = os.path.join(os.path.expanduser(f"~{username}"), ".sparrow")
+    # second choice: release .sparrow file
+    # is the YGOR_TELESCOPE env var defined?
+    ygor_telescope = os.environ.get("YGOR_TELESCOPE", "/home/gbt")
+    global_sparrow_file = os.path.join(ygor_telescope, "sparrow", "sparrow.conf")
+    # third choice: a sparrow file right here in the code
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    local_sparrow_file = os.path.join(base_dir, "sparrow.conf")
+    filenames = [
+        user_sparrow_file,
+        global_sparrow_file,
+        local_sparrow_file,
+    ]
+    for filename in filenames:
+        if os.path.isfile(filename):
+            return filename
+    return None
+
+def load_aliases(filename):
+    """
+    Reads the given filename using configparser and returns a dictionary of items found in the
+    'Logs' section, along with the first of the root directories given there (or None)
+    """
+    config = configparser.ConfigParser(strict=False)
+    config.read(filename)
+    root_dir = None
+    if 'Logs' in config:
+        aliases = dict(config.items('Logs'))
+        aliases.pop('defaultlog', None)
+        roots = aliases.pop('roots', None)
+        if roots:
+            roots = [r.strip() for r in roots.split(' ')]
+            # just use the first one
+            root_dir = roots[0]
+        return aliases, root_dir
+    return {}, root_dir
+
+def load_settings(filename):
+    """
+    Reads the LogView settings from the 'LogView' section of the given filename, if there is
+    one; settings that aren't given keep their defaults.
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    config = configparser.ConfigParser(strict=False)
+    config.read(filename)
+    if 'LogView' in config:
+        for key, default in DEFAULT_SETTINGS.items():
+            if key in config['LogView']:
+                try:
+                    settings[key] = type(default)(config['LogView'][key])
+                except ValueError:
+                    print(f"Invalid value for LogView setting {key}: {config['LogView'][key]}")
+    return settings
+
+def load_derived_columns(filename):
+    """
+    Reads the derived column definitions from the given filename: the 'Derived' section
+    holds those for every sampler, and a 'Derived:<alias>' section those for one alias, e.g.
+
+        [Derived:weather2]
+        TEMP_DIFF = TEMP_1 - TEMP_2 [Celsius]
+
+    Returns a dictionary of lists of DerivedColumns, keyed by the (lower case) alias, or
+    None for the ones for every sampler.
+    """
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    # column names are case sensitive
+    config.optionxform = str
+    config.read(filename)
+    derived_columns = {}
+    for section in config.sections():
+        if section == 'Derived':
+            alias = None
+        elif section.startswith('Derived:'):
+            alias = section[len('Derived:'):].strip().lower()
+        else:
+            continue
+        for name, text in config.items(section):
+            try:
+                derived_columns.setdefault(alias, []).append(DerivedColumn.parse(name, text))
+            except ValueError as e:
+                print(f"Invalid derived column in {filename}: {e}")
+    return derived_columns
+
+def derived_columns_for(derived_columns, alias=None):
+    "returns the derived columns for an alias: those for every sampler, overridden by its own"
+    columns = {derived.name: derived for derived in derived_columns.get(None, [])}
+    if alias is not None:
+        columns.update({derived.name: derived for derived in derived_columns.get(alias.lower(), [])})
+    return list(columns.values())
+
+def load_dashboard(filename):
+    """
+    Reads the aliases and columns to show on the dashboard from the 'Dashboard' section of
+    the given filename, e.g.
+
+        [Dashboard]
+        Weather2 (At GBT) = WINDVEL TEMP_1
+
+    Returns a list of (lower case alias, list of columns) in the order given.
+    """
+    config = configparser.ConfigParser(strict=False, interpolation=None)
+    # column names are case sensitive
+    config.optionxform = str
+    config.read(filename)
+    if 'Dashboard' not in config:
+        return []
+    return [(alias.strip().lower(), text.split()) for alias, text in config.items('Dashboard') if text.split()]
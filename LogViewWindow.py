@@ -1,20 +1,42 @@
+import io
 import os
-import configparser
-import getpass
+from datetime import timedelta
 import numpy as np
 
 from PySide6.QtWidgets import QApplication
-from PySide6.QtWidgets import QWidget, QTabWidget, QVBoxLayout, QFileDialog, QMessageBox, QGroupBox, QHBoxLayout, QPushButton, QListWidgetItem
-from PySide6.QtGui import QGuiApplication
+from PySide6.QtWidgets import QWidget, QTabWidget, QVBoxLayout, QFileDialog, QMessageBox, QGroupBox, QHBoxLayout, QPushButton, QCheckBox, QLabel
+from PySide6.QtGui import QGuiApplication, QPixmap
+from PySide6.QtCore import QTimer, Qt
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas, NavigationToolbar2QT
+from matplotlib.dates import num2date
 from SamplerData import SamplerData
-from PlotData import PlotData
+from PlotData import PlotData, decimate_indices
+from CompactSeries import CompactSeries
 from TimeRangePanel import TimeRangePanel
 from DataSelectionPanel import DataSelectionPanel
 from StatusBarPanel import StatusBarPanel
+from StatisticsPanel import StatisticsPanel
+from EventsPanel import EventsPanel
+from SpectrumPanel import SpectrumPanel
+from OverlayPanel import OverlayPanel
+from DashboardPanel import DashboardPanel
+from DashboardFeed import DashboardFeed
 from MenuBar import MenuBar
+from ResultCache import ResultCache
+from PlotHistory import PlotHistory
+from LogViewConfig import DEFAULT_SETTINGS, find_sparrow_file, load_aliases, load_settings, load_derived_columns, derived_columns_for, load_dashboard
 
 DMJD = "DMJD"
+# decimated plots draw about this many points per line
+MAX_PLOT_POINTS = 4000
+# how long to wait after the plot's axis limits stop changing before re-reading the data
+ZOOM_DEBOUNCE_MS = 400
+# spectrograms average the segments into about this many time bins
+SPECTROGRAM_BINS = 200
+# overlays draw about this many points per period
+OVERLAY_POINTS = 1000
+# where sidecar files, such as the per file zone maps, and cached results are kept between sessions
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'logview')
 
 class LogViewWindow(QWidget):
 
@@ -47,7 +69,14 @@ class LogViewWindow(QWidget):
         base_dir = os.path.dirname(os.path.abspath(__file__))
 
         self.rootDir = '.' # default
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.derived_columns = {}
+        self.dashboard = []
         self.aliases = self.loadAliases()
+        result_cache_bytes = int(self.settings['result_cache_mb'] * 1024 * 1024)
+        self.result_cache = ResultCache(os.path.join(CACHE_DIR, 'results'), result_cache_bytes) if result_cache_bytes > 0 else None
+        # recent plots, for going back and forward between them without reading them again
+        self.history = PlotHistory(os.path.join(CACHE_DIR, 'history'), self.settings['history_length'], int(self.settings['history_memory_mb'] * 1024 * 1024))
         # self.aliases = {
         #     "Weather-Weather2-weather2": os.path.join(base_dir, 'Weather-Weather2-weather2'),
         #     "does not exist": None,
@@ -57,12 +86,24 @@ class LogViewWindow(QWidget):
         self.menubar = MenuBar(self, app, self.open_folder)
         self.plot_button = QPushButton('Plot')
         self.plot_button.setEnabled(False)
+        # progressive plotting shows a coarse preview of long time ranges first
+        self.progressive_checkbox = QCheckBox('Progressive')
+        self.stats_button = QPushButton('Statistics')
+        self.stats_button.setEnabled(False)
+        self.back_button = QPushButton('Back')
+        self.back_button.setEnabled(False)
+        self.forward_button = QPushButton('Forward')
+        self.forward_button.setEnabled(False)
         self.status_bar_panel = StatusBarPanel(self)
         self.time_range_panel = TimeRangePanel(self)
         self.data_selection_panel = DataSelectionPanel(self.aliases, self.loadSampler, parent=self, rootDir=self.rootDir)
         self.buttons_panel = QGroupBox('buttons')
         buttons_layout = QHBoxLayout()
         buttons_layout.addWidget(self.plot_button)
+        buttons_layout.addWidget(self.progressive_checkbox)
+        buttons_layout.addWidget(self.stats_button)
+        buttons_layout.addWidget(self.back_button)
+        buttons_layout.addWidget(self.forward_button)
         self.buttons_panel.setLayout(buttons_layout)
         self.tab_widget = QTabWidget(self)
         self.selection_tab = QWidget()
@@ -75,57 +116,56 @@ class LogViewWindow(QWidget):
         self.tab_widget.addTab(self.selection_tab, 'selection')
         self.graph_tab = QWidget()
         self.tab_widget.addTab(self.graph_tab, 'graph')
+        self.stats_panel = StatisticsPanel()
+        self.tab_widget.addTab(self.stats_panel, 'statistics')
+        self.events_panel = EventsPanel(self.on_find_events_clicked, self.jump_to_event, self.on_find_gaps_clicked)
+        self.tab_widget.addTab(self.events_panel, 'events')
+        self.spectrum_panel = SpectrumPanel(self.on_spectrum_clicked)
+        self.tab_widget.addTab(self.spectrum_panel, 'spectrum')
+        self.overlay_panel = OverlayPanel(self.on_overlay_clicked, max_points=OVERLAY_POINTS)
+        self.tab_widget.addTab(self.overlay_panel, 'overlay')
+        self.dashboard_panel = DashboardPanel(self.make_dashboard_feeds, self.settings['dashboard_refresh_s'])
+        self.tab_widget.addTab(self.dashboard_panel, 'dashboard')
         layout = QVBoxLayout(self)
         layout.setMenuBar(self.menubar)
         layout.addWidget(self.tab_widget)
         self.setLayout(layout)
         self.plot_button.clicked.connect(self.on_plot_clicked)
+        self.stats_button.clicked.connect(self.on_statistics_clicked)
+        self.back_button.clicked.connect(self.on_back_clicked)
+        self.forward_button.clicked.connect(self.on_forward_clicked)
         self._sampler = None
         self._col_units = None
+        # the plot being shown, and the columns it was read from, for re-querying on zoom
+        self.plot_data = None
+        self._plot_query = None
+        self.zoom_timer = QTimer(self)
+        self.zoom_timer.setSingleShot(True)
+        self.zoom_timer.setInterval(ZOOM_DEBOUNCE_MS)
+        self.zoom_timer.timeout.connect(self.on_zoom_timeout)
 
 
     def loadAliases(self):
         """
         Call loadAliasInfo using the first filename that we can find
         """
-        # first choice: users .sparrow file
-        username = getpass.getuser()
-        user_sparrow_file = os.path.join(os.path.expanduser(f"~{username}"), ".sparrow")
-        # second choice: release .sparrow file
-        # is the YGOR_TELESCOPE env var defined?
-        ygor_telescope = os.environ.get("YGOR_TELESCOPE", "/home/gbt")
-        global_sparrow_file = os.path.join(ygor_telescope, "sparrow", "sparrow.conf")
-        # third choice: a sparrow file right here in the code
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        local_sparrow_file = os.path.join(base_dir, "sparrow.conf")
-        filenames = [
-            user_sparrow_file,
-            global_sparrow_file,
-            local_sparrow_file,
-        ]
-        for filename in filenames:
-            if os.path.isfile(filename):
-                print("load aliases from", filename)
-                return self.loadAliasInfo(filename)
-        return {}
+        filename = find_sparrow_file()
+        if filename is None:
+            return {}
+        print("load aliases from", filename)
+        self.settings = load_settings(filename)
+        self.derived_columns = load_derived_columns(filename)
+        self.dashboard = load_dashboard(filename)
+        return self.loadAliasInfo(filename)
 
     def loadAliasInfo(self, filename):
         """
         Reads the given filename using configparser and returns a dictionary of items found in the 'Logs' section.
         """
-        config = configparser.ConfigParser(strict=False)
-        config.read(filename)
-        if 'Logs' in config:
-            aliases = dict(config.items('Logs'))
-            aliases.pop('defaultlog', None)
-            roots = aliases.pop('roots', None)
-            if roots:
-                roots = [r.strip() for r in roots.split(' ')]
-                # just use the first one
-                self.rootDir = roots[0]
-
-            return aliases
-        return {}
+        aliases, root_dir = load_aliases(filename)
+        if root_dir:
+            self.rootDir = root_dir
+        return aliases
 
     def open_folder(self):
         "called by the Open menu action: calls loadSampler function"
@@ -141,7 +181,7 @@ class LogViewWindow(QWidget):
         if not os.path.isdir(dir_path):
             QMessageBox.critical(self, 'Invalid Directory', f'The directory {dir_path} does not exist.')
             return
-        sampler = SamplerData(dir_path)
+        sampler = self.make_sampler(dir_path)
         # we use the youngest file to figure out the meta-data: columns and units
         youngest_file = sampler.find_youngest_fits()
         if not youngest_file:
@@ -164,103 +204,530 @@ class LogViewWindow(QWidget):
             self.plot_button.setEnabled(False)
             self._sampler = None
             return
-        # populate the data selection col widgets with the col and unit info
-        self.data_selection_panel.x_dropdown.clear()
-        self.data_selection_panel.y_list.clear()
-        # the x dropdown is simple enough
-        for i, col in enumerate(colnames):
-            display_text = f"{col} ({colunits[i]})" if colunits and i < len(colunits) else f"Column: {col}"
-            self.data_selection_panel.x_dropdown.addItem(display_text, userData=col)
-        self.data_selection_panel.x_dropdown.addItems(colnames)
-        # y dropdowns are more complicated: we want to display "col (units)", but return
-        # just the col value upon selection
-        for col in colnames:
-            display_text = f"{col} ({col_map[col]})"
-            item = QListWidgetItem(display_text)
-            item.setData(0x0100, col)
-            self.data_selection_panel.y_list.addItem(item)
-            item2 = QListWidgetItem(display_text)
-            item2.setData(0x0100, col)
-            self.data_selection_panel.y2_list.addItem(item2)
+        # populate the data selection col widgets with the col and unit info; they display
+        # "col (units)", but return just the col value upon selection
+        self.data_selection_panel.set_columns(colnames, colunits)
         self.plot_button.setEnabled(True)
+        self.stats_button.setEnabled(True)
+        self.events_panel.find_button.setEnabled(True)
+        self.events_panel.gaps_button.setEnabled(True)
+        self.spectrum_panel.compute_button.setEnabled(True)
+        self.overlay_panel.overlay_button.setEnabled(True)
         self._sampler = sampler
         self._col_units = col_map
 
-    def on_plot_clicked(self):
-        "called when the plot button is clicked - will determine data to plot and plot it"
-        sampler = getattr(self, '_sampler', None)
-        if not sampler:
-            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
-            return
+    def make_sampler(self, dir_path):
+        "creates a SamplerData for a directory, with the derived columns of its alias, if it has one"
+        alias = next((alias for alias, path in self.aliases.items() if os.path.normpath(os.path.join(self.rootDir, path)) == os.path.normpath(dir_path)), None)
+        return SamplerData(
+            dir_path,
+            cache_dir=CACHE_DIR,
+            result_cache=self.result_cache,
+            derived_columns=derived_columns_for(self.derived_columns, alias),
+            read_ahead=self.settings['read_ahead_files'],
+            read_ahead_bytes=int(self.settings['read_ahead_mb'] * 1024 * 1024),
+        )
+
+    def make_dashboard_feeds(self):
+        "creates a DashboardFeed for each alias in the dashboard configuration"
+        feeds = []
+        for alias, columns in self.dashboard:
+            if alias not in self.aliases:
+                print(f"Unknown dashboard alias: {alias}")
+                continue
+            dir_path = os.path.join(self.rootDir, self.aliases[alias])
+            if not os.path.isdir(dir_path):
+                print(f"Dashboard directory does not exist: {dir_path}")
+                continue
+            sampler = SamplerData(dir_path, cache_dir=CACHE_DIR, result_cache=self.result_cache, derived_columns=derived_columns_for(self.derived_columns, alias))
+            feeds.append(DashboardFeed(alias, sampler, columns, hours=self.settings['dashboard_hours']))
+        return feeds
+
+    def show_file_status(self, file_path, nfile, num_files):
+        "a function for updating the status bar with info on how we are loading data"
+        progress = int((nfile + 1) / num_files * 100) if num_files > 0 else 0
+        self.status_bar_panel.show_status(f"Opening: {os.path.basename(file_path)}", f"{nfile+1}/{num_files}", progress)
+        QApplication.processEvents()
+
+    def get_plot_selection(self):
+        """
+        Reads the time range, columns and row filter to plot from the panels, returning
+        (start_dt, end_dt, x_col, y_cols, y2_cols, predicates), or None if the selection is not valid
+        """
         # get the time range of the data to plot
         start_dt = self.time_range_panel.start_picker.dateTime().toPython()
         end_dt = self.time_range_panel.end_picker.dateTime().toPython()
         if start_dt > end_dt:
             QMessageBox.critical(self, 'Date Error', 'Start date must be before or equal to end date.')
-            return
+            return None
         # get the columns to plot
         x_col = self.data_selection_panel.x_dropdown.currentData()
-        y_selected_items = self.data_selection_panel.y_list.selectedItems()
-        if not y_selected_items:
+        y_cols = self.data_selection_panel.selected_columns('y')
+        if not y_cols:
             QMessageBox.critical(self, 'Selection Error', 'Please select at least one y column.')
+            return None
+        y2_cols = self.data_selection_panel.selected_columns('y2')
+        try:
+            predicates = self._sampler.parse_predicates(self.data_selection_panel.where_expr.toPlainText())
+        except ValueError as e:
+            QMessageBox.critical(self, 'Selection Error', str(e))
+            return None
+        unknown = [col for col in self._sampler.predicate_columns(predicates) if col not in self._col_units]
+        if unknown:
+            QMessageBox.critical(self, 'Selection Error', f'Unknown columns in where condition: {", ".join(unknown)}')
+            return None
+        return start_dt, end_dt, x_col, y_cols, y2_cols, predicates
+
+    def check_data(self, data):
+        "warns the user and returns False if the data collected can't be plotted"
+        if data.shape[0] == 0:
+            QMessageBox.critical(self, 'Data Error', 'No data returned for the selected time range.')
+            return False
+        if data.shape[1] < 2:
+            QMessageBox.critical(self, 'Data Error', 'Data does not have enough columns for x and y.')
+            return False
+        return True
+
+    def choose_strategy(self, sampler, cols, timestamp_range, files, compact=None):
+        """
+        Estimates the size of a query from the file headers before reading any data, and
+        returns the way of loading it that fits in the memory budget: all the rows ('full'),
+        the rows of each file decimated as they are read ('decimate'), or summary data, the
+        mean of each column over a fixed number of time buckets ('summary').  compact is the
+        time format of the CompactSeries the data will be kept in, if any.
+        """
+        estimate = sampler.estimate_query(cols, timestamp_range, files=files, compact=compact)
+        memory_budget = int(self.settings['memory_budget_mb'] * 1024 * 1024)
+        strategy = sampler.choose_load_strategy(estimate, memory_budget, MAX_PLOT_POINTS)
+        self.status_bar_panel.show_status(f"Loading ~{estimate['rows']} rows, {estimate['result_bytes'] / 2**20:.1f} MB ({strategy})", f"{estimate['files']} files")
+        QApplication.processEvents()
+        return strategy
+
+    def load_data(self, sampler, cols, timestamp_range, files, predicates, strategy=None, use_result_cache=True):
+        """
+        Loads a query in the way that fits in the memory budget (see choose_strategy),
+        unless the strategy is given.  Full loads use the result cache if use_result_cache.
+        Returns (data, strategy).
+        """
+        # the data can be kept compactly, with narrow times and columns (see CompactSeries),
+        # in a time format that can hold the whole range
+        compact = sampler.compact_time_format(self.settings['compact_time'] or None, timestamp_range, files)
+        if strategy is None:
+            strategy = self.choose_strategy(sampler, cols, timestamp_range, files, compact)
+        if strategy == 'full':
+            data = sampler.get_data(cols, timestamp_range, pre_open_hook=self.show_file_status, files=files, predicates=predicates, compact=compact, use_result_cache=use_result_cache)
+        elif strategy == 'decimate':
+            blocks = []
+            for block in sampler.iter_data(cols, timestamp_range, pre_open_hook=self.show_file_status, files=files, predicates=predicates, compact=compact):
+                blocks.append(block[decimate_indices([block[:, i] for i in range(1, block.shape[1])], MAX_PLOT_POINTS)])
+            if not blocks:
+                data = np.array([])
+            else:
+                data = CompactSeries.concatenate(blocks) if compact else np.concatenate(blocks)
+        else:
+            start_dt, end_dt = timestamp_range
+            bucket_seconds = max((end_dt - start_dt).total_seconds() / MAX_PLOT_POINTS, 0.001)
+            data = sampler.resample(cols, timestamp_range, bucket_seconds, pre_open_hook=self.show_file_status, files=files, predicates=predicates)
+            # drop the bucket start times, and the empty buckets
+            data = data[:, 1:]
+            data = data[~np.isnan(data[:, 0])]
+        return data, strategy
+
+    def get_expressions(self):
+        "returns the x, y and y2 expressions entered by the user"
+        return (
+            self.data_selection_panel.x_expr.toPlainText(),
+            self.data_selection_panel.y_expr.toPlainText(),
+            self.data_selection_panel.y2_expr.toPlainText(),
+        )
+
+    def make_plot_data(self, sampler, data, x_col, y_cols, y2_cols, max_points=None, expressions=None, col_units=None):
+        """
+        applies the expressions defined by users (or the given ones) to the data we collected,
+        returning a PlotData
+        """
+        x_expr, y_expr, y2_expr = expressions if expressions is not None else self.get_expressions()
+        return PlotData.from_data(
+            sampler,
+            data,
+            x_col,
+            y_cols,
+            y2_cols,
+            x_expr,
+            y_expr,
+            y2_expr,
+            col_units if col_units is not None else self._col_units,
+            max_points=max_points
+        )
+
+    def on_plot_clicked(self):
+        "called when the plot button is clicked - will determine data to plot and plot it"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
             return
-        y_cols = [item.data(0x0100) for item in y_selected_items]
-        y2_selected_items = self.data_selection_panel.y2_list.selectedItems()
-        y2_cols = [item.data(0x0100) for item in y2_selected_items]
+        selection = self.get_plot_selection()
+        if selection is None:
+            return
+        start_dt, end_dt, x_col, y_cols, y2_cols, predicates = selection
+        cols = [x_col] + y_cols + y2_cols
+        # the file holding the start of the range began before it
+        files = sampler.get_fits_files_from_names(start_dt, end_dt, before=True)
+        strategy = None
+        if self.progressive_checkbox.isChecked():
+            strategy = self.choose_strategy(sampler, cols, (start_dt, end_dt), files)
+            # summary data comes from one pass over all the files, so it can't be refined
+            if strategy != 'summary':
+                self.plot_progressive(sampler, cols, (start_dt, end_dt), x_col, y_cols, y2_cols, predicates, files, strategy)
+                return
         try:
-            num_y_cols = len(y_cols)
-            num_y2_cols = len(y2_cols)
-            cols = [x_col] + y_cols + y2_cols
-            def show_file_status(file_path, nfile, num_files):
-                "a function for updating the status bar with info on how we are loading data"
-                self.status_bar_panel.status_left.setText(f"Opening: {os.path.basename(file_path)}")
-                self.status_bar_panel.status_center.setText(f"{nfile+1}/{num_files}")
-                progress = int((nfile + 1) / num_files * 100) if num_files > 0 else 0
-                self.status_bar_panel.status_progress.setValue(progress)
-                QApplication.processEvents()
             # now that we know what data we want to plot and when, collect the data, updating
             # the status bar as we go, since it could take a while
-            data = sampler.get_data(cols, (start_dt, end_dt), pre_open_hook=show_file_status)
+            data, strategy = self.load_data(sampler, cols, (start_dt, end_dt), files, predicates, strategy)
             print(f"data.shape: {data.shape}")
-            if data.shape[0] == 0:
-                QMessageBox.critical(self, 'Data Error', 'No data returned for the selected time range.')
-                return
-            if data.shape[1] < 2:
-                QMessageBox.critical(self, 'Data Error', 'Data does not have enough columns for x and y.')
+            if not self.check_data(data):
                 return
             # we are done collecting data and are ready to plot, so update the status bar
-            self.status_bar_panel.status_left.setText("Plotting Data")
-            self.status_bar_panel.status_center.setText("")
-            self.status_bar_panel.status_progress.setValue(0)
+            self.status_bar_panel.show_status("Plotting Data")
             QApplication.processEvents()
-
-            # here we apply the expressions defined by users to the data we collected
-            x = data[:, 0]
-            apply_expr = self.data_selection_panel.x_expr.toPlainText().replace('x', 'data')
-            x = sampler.apply_expression_to_data(x, apply_expr)
-            ys = np.array([data[:, i] for i in range(1, num_y_cols+1)])
-            apply_expr = self.data_selection_panel.y_expr.toPlainText().replace('y', 'data')
-            ys = sampler.apply_expression_to_data(ys, apply_expr)
-            y_expr = apply_expr.replace('data', '')
-            ys2 = np.array([data[:, i] for i in range(num_y_cols+1, num_y_cols+1 + num_y2_cols)])
-            apply_expr = self.data_selection_panel.y2_expr.toPlainText().replace('y2', 'data')
-            ys2 = sampler.apply_expression_to_data(ys2, apply_expr)
-            y2_expr = apply_expr.replace('data', '')
+            plot_data = self.make_plot_data(sampler, data, x_col, y_cols, y2_cols, max_points=MAX_PLOT_POINTS)
+            plot_data.gaps = self.find_plot_gaps(sampler, (start_dt, end_dt), files)
         except Exception as e:
             QMessageBox.critical(self, 'Plot Error', f'Error retrieving data: {e}')
             return
         # finally, we are ready to create a plot figure
-        plot_data = PlotData(x, ys, x_col, y_cols, y_expr, sampler.sampler_name, self._col_units, y2_list=ys2, y2_cols=y2_cols, y2_expr=y2_expr, date_plot=x_col == DMJD)
         fig, ax = plot_data.plot_data()
-        # and we update the graph tab to show this plot
-        if hasattr(self, 'canvas'):
-            self.canvas.setParent(None)
-            del self.canvas
-        if hasattr(self, 'toolbar'):
-            self.toolbar.setParent(None)
-            del self.toolbar
-        self.canvas = FigureCanvas(fig)
-        self.toolbar = NavigationToolbar2QT(self.canvas, self.graph_tab)
+        self.show_figure(fig)
+        self.status_bar_panel.show_status("Ready", f"{data.shape[0]} rows ({strategy})")
+        self.watch_zoom(sampler, plot_data, cols, x_col, y_cols, y2_cols, predicates)
+        self.add_to_history(sampler, (start_dt, end_dt), x_col, y_cols, y2_cols, predicates, plot_data, files)
+
+    def on_statistics_clicked(self):
+        "called when the statistics button is clicked - summarizes the selected y and y2 columns"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
+            return
+        selection = self.get_plot_selection()
+        if selection is None:
+            return
+        start_dt, end_dt, x_col, y_cols, y2_cols, predicates = selection
+        cols = list(dict.fromkeys(y_cols + y2_cols))
+        try:
+            files = sampler.get_fits_files_from_names(start_dt, end_dt, before=True)
+            stats = sampler.get_column_statistics(cols, (start_dt, end_dt), progress_hook=self.show_file_status, predicates=predicates, files=files)
+        except Exception as e:
+            QMessageBox.critical(self, 'Statistics Error', f'Error computing statistics: {e}')
+            return
+        self.status_bar_panel.show_status("Ready")
+        if all(col_stats.count == 0 for col_stats in stats.values()):
+            QMessageBox.critical(self, 'Data Error', 'No data returned for the selected time range.')
+            return
+        self.stats_panel.show_statistics(stats, self._col_units)
+        self.tab_widget.setCurrentWidget(self.stats_panel)
+
+    def on_find_events_clicked(self):
+        "called when the find events button is clicked - lists when the condition held"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
+            return
+        start_dt = self.time_range_panel.start_picker.dateTime().toPython()
+        end_dt = self.time_range_panel.end_picker.dateTime().toPython()
+        try:
+            predicates = sampler.parse_predicates(self.events_panel.condition_expr.toPlainText())
+        except ValueError as e:
+            QMessageBox.critical(self, 'Condition Error', str(e))
+            return
+        unknown = [col for col in sampler.predicate_columns(predicates) if col not in self._col_units]
+        if not predicates or unknown:
+            QMessageBox.critical(self, 'Condition Error', 'Please enter a condition on known columns, e.g. WINDVEL > 15')
+            return
+        try:
+            events = sampler.find_events(predicates, (start_dt, end_dt), progress_hook=self.show_file_status)
+        except Exception as e:
+            QMessageBox.critical(self, 'Events Error', f'Error finding events: {e}')
+            return
+        self.status_bar_panel.show_status("Ready")
+        self.events_panel.show_events(events)
+
+    def on_find_gaps_clicked(self):
+        "called when the find gaps button is clicked - lists where there is no data in the time range"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
+            return
+        start_dt = self.time_range_panel.start_picker.dateTime().toPython()
+        end_dt = self.time_range_panel.end_picker.dateTime().toPython()
+        try:
+            gap_index = sampler.get_gap_index((start_dt, end_dt), progress_hook=self.show_file_status)
+        except Exception as e:
+            QMessageBox.critical(self, 'Gaps Error', f'Error finding gaps: {e}')
+            return
+        self.status_bar_panel.show_status("Ready")
+        self.events_panel.show_gaps(gap_index)
+
+    def find_plot_gaps(self, sampler, timestamp_range, files):
+        "returns the (start, end) DMJDs of the gaps in the time range, for breaking the plotted lines"
+        try:
+            return np.array(sampler.get_gap_index(timestamp_range, files=files)['gaps'])
+        except Exception as e:
+            print(f"Error finding gaps: {e}")
+            return None
+
+    def on_spectrum_clicked(self):
+        "called when the compute spectrum button is clicked - analyzes the selected y columns"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
+            return
+        selection = self.get_plot_selection()
+        if selection is None:
+            return
+        start_dt, end_dt, x_col, y_cols, y2_cols, predicates = selection
+        spectra = {}
+        try:
+            files = sampler.get_fits_files_from_names(start_dt, end_dt, before=True)
+            for col in y_cols:
+                spectrum = sampler.spectrum(
+                    col,
+                    (start_dt, end_dt),
+                    segment_seconds=self.spectrum_panel.segment_seconds.value(),
+                    overlap=self.spectrum_panel.overlap.value(),
+                    window=self.spectrum_panel.window.currentText(),
+                    spectrogram_bins=SPECTROGRAM_BINS,
+                    pre_open_hook=self.show_file_status,
+                    files=files,
+                )
+                if spectrum is not None and spectrum.num_segments > 0:
+                    spectra[col] = spectrum
+        except Exception as e:
+            QMessageBox.critical(self, 'Spectrum Error', f'Error computing spectrum: {e}')
+            return
+        self.status_bar_panel.show_status("Ready")
+        if not spectra:
+            QMessageBox.critical(self, 'Data Error', 'Not enough data in the selected time range for one segment.')
+            return
+        self.spectrum_panel.show_spectra(spectra, self._col_units)
+        self.tab_widget.setCurrentWidget(self.spectrum_panel)
+
+    def on_overlay_clicked(self):
+        "called when the overlay button is clicked - overlays the same hours of several periods of the selected y columns"
+        sampler = getattr(self, '_sampler', None)
+        if not sampler:
+            QMessageBox.warning(self, 'No Data', 'No FITS data loaded.')
+            return
+        selection = self.get_plot_selection()
+        if selection is None:
+            return
+        start_dt, end_dt, x_col, y_cols, y2_cols, predicates = selection
+        try:
+            overlay = sampler.overlay_periods(
+                y_cols,
+                (start_dt, end_dt),
+                period_days=self.overlay_panel.period_days(),
+                num_periods=self.overlay_panel.num_periods.value(),
+                progress_hook=self.show_file_status,
+                predicates=predicates,
+            )
+        except Exception as e:
+            QMessageBox.critical(self, 'Overlay Error', f'Error overlaying periods: {e}')
+            return
+        self.status_bar_panel.show_status("Ready")
+        if overlay is None or not overlay.series():
+            QMessageBox.critical(self, 'Data Error', 'No data found in the selected hours of any period.')
+            return
+        self.overlay_panel.show_overlay(overlay, self._col_units)
+        self.tab_widget.setCurrentWidget(self.overlay_panel)
+
+    def jump_to_event(self, start_dt, end_dt):
+        "plots the time around the given event, using the columns selected for plotting"
+        margin = max((end_dt - start_dt) / 10, timedelta(minutes=1))
+        self.time_range_panel.start_picker.setDateTime(start_dt - margin)
+        self.time_range_panel.end_picker.setDateTime(end_dt + margin)
+        self.on_plot_clicked()
+
+    def plot_progressive(self, sampler, cols, timestamp_range, x_col, y_cols, y2_cols, predicates=None, files=None, strategy='full'):
+        """
+        Draws a coarse preview of the whole time range from a sparse subset of the files,
+        then refines the plotted lines in place as the rest of the files are read.
+        Every partial result is decimated, so that the redraws stay cheap; with the
+        'decimate' strategy, the rows of each file are also decimated as they are read, so
+        that only the decimated rows are kept.  The lines are broken at the gaps once all
+        the files have been read.
+        """
+        reduce_block = None
+        if strategy == 'decimate':
+            reduce_block = lambda block: decimate_indices([block[:, i] for i in range(1, block.shape[1])], MAX_PLOT_POINTS)
+        plot_data = None
+        try:
+            for data, files_read, num_files in sampler.iter_data_progressive(cols, timestamp_range, pre_open_hook=self.show_file_status, predicates=predicates, files=files, reduce_block=reduce_block):
+                if data.shape[0] == 0:
+                    continue
+                refined = self.make_plot_data(sampler, data, x_col, y_cols, y2_cols, max_points=MAX_PLOT_POINTS)
+                if plot_data is None:
+                    plot_data = refined
+                    fig, ax = plot_data.plot_data()
+                    self.show_figure(fig)
+                else:
+                    plot_data.update_data(refined.x, refined.y_list, refined.y2_list)
+                    self.canvas.draw_idle()
+                self.status_bar_panel.show_status("Refining Plot", f"{files_read}/{num_files}", int(files_read / num_files * 100))
+                QApplication.processEvents()
+        except Exception as e:
+            QMessageBox.critical(self, 'Plot Error', f'Error retrieving data: {e}')
+            return
+        if plot_data is None:
+            QMessageBox.critical(self, 'Data Error', 'No data returned for the selected time range.')
+            return
+        # finding the gaps reads the times of every file, so it waits until they are all read
+        plot_data.gaps = self.find_plot_gaps(sampler, timestamp_range, files)
+        plot_data.update_data(plot_data.x, plot_data.y_list, plot_data.y2_list, rescale=False)
+        self.canvas.draw_idle()
+        self.status_bar_panel.show_status("Ready", f"{len(plot_data.x)} rows ({strategy})")
+        self.watch_zoom(sampler, plot_data, cols, x_col, y_cols, y2_cols, predicates)
+        self.add_to_history(sampler, timestamp_range, x_col, y_cols, y2_cols, predicates, plot_data, files)
+
+    def add_to_history(self, sampler, timestamp_range, x_col, y_cols, y2_cols, predicates, plot_data, files):
+        "adds the plot just shown to the history"
+        if files is None:
+            files = sampler.get_fits_files_from_names(*timestamp_range, before=True)
+        query = {
+            'directory': sampler.directory,
+            'start': timestamp_range[0],
+            'end': timestamp_range[1],
+            'x_col': x_col,
+            'y_cols': y_cols,
+            'y2_cols': y2_cols,
+            'predicates': predicates,
+            'expressions': self.get_expressions(),
+            'col_units': self._col_units,
+        }
+        self.history.add(query, *self.history_data(sampler, plot_data, files))
+        self.update_history_buttons()
+
+    def history_data(self, sampler, plot_data, files):
+        """
+        Returns what the plot history keeps of the plot being shown: the other arguments for
+        a PlotData, the arrays drawn (decimated, but not yet broken at the gaps) and the
+        gaps, a PNG of the figure and the fingerprints of the files
+        """
+        x, y_list, y2_list = plot_data.plotted_arrays(break_gaps=False)
+        plot = {
+            'x_col': plot_data.x_col,
+            'y_cols': plot_data.y_cols,
+            'y_expr': plot_data.y_expr,
+            'sampler_name': plot_data.sampler_name,
+            'col_units': plot_data.col_units,
+            'y2_cols': plot_data.y2_cols,
+            'y2_expr': plot_data.y2_expr,
+            'date_plot': plot_data.date_plot,
+        }
+        # the gaps are kept in x values, like the arrays
+        gaps = plot_data.gap_x_values()
+        gaps = np.empty((0, 2)) if gaps is None else gaps
+        arrays = {'x': np.asarray(x), 'y': np.array(y_list), 'y2': np.array(y2_list), 'gaps': gaps}
+        image = io.BytesIO()
+        self.canvas.figure.savefig(image, format='png')
+        return plot, arrays, image.getvalue(), [sampler.file_fingerprint(f) for f in files]
+
+    def update_history_buttons(self):
+        self.back_button.setEnabled(self.history.can_go_back())
+        self.forward_button.setEnabled(self.history.can_go_forward())
+
+    def on_back_clicked(self):
+        "called when the back button is clicked - shows the previous plot in the history"
+        entry = self.history.back()
+        if entry is not None:
+            self.show_history_entry(entry)
+
+    def on_forward_clicked(self):
+        "called when the forward button is clicked - shows the next plot in the history"
+        entry = self.history.forward()
+        if entry is not None:
+            self.show_history_entry(entry)
+
+    def show_history_entry(self, entry):
+        """
+        Shows a plot from the history: its image straight away, then the plot itself, from
+        the data kept with it.  If any of the files it came from have changed since, or its
+        data was dropped, the query is run again instead.
+        """
+        self.update_history_buttons()
+        query = entry['query']
+        self.time_range_panel.start_picker.setDateTime(query['start'])
+        self.time_range_panel.end_picker.setDateTime(query['end'])
+        x_col, y_cols, y2_cols, predicates = query['x_col'], query['y_cols'], query['y2_cols'], query['predicates']
+        cols = [x_col] + y_cols + y2_cols
+        try:
+            sampler = self._sampler if self._sampler is not None and self._sampler.directory == query['directory'] else self.make_sampler(query['directory'])
+            files = sampler.get_fits_files_from_names(query['start'], query['end'], before=True)
+            fresh = entry['arrays'] is not None and [sampler.file_fingerprint(f) for f in files] == entry['fingerprints']
+            if fresh:
+                self.show_image(entry['image'])
+                QApplication.processEvents()
+                arrays = entry['arrays']
+                # the arrays are already decimated, so they are drawn as they are
+                plot_data = PlotData(arrays['x'], list(arrays['y']), y2_list=list(arrays['y2']), **entry['plot'])
+                plot_data.gaps = arrays['gaps']
+            else:
+                data, strategy = self.load_data(sampler, cols, (query['start'], query['end']), files, predicates)
+                if not self.check_data(data):
+                    return
+                plot_data = self.make_plot_data(sampler, data, x_col, y_cols, y2_cols, max_points=MAX_PLOT_POINTS, expressions=query['expressions'], col_units=query['col_units'])
+                plot_data.gaps = self.find_plot_gaps(sampler, (query['start'], query['end']), files)
+        except Exception as e:
+            QMessageBox.critical(self, 'Plot Error', f'Error retrieving data: {e}')
+            return
+        fig, ax = plot_data.plot_data()
+        self.show_figure(fig)
+        if not fresh:
+            self.history.update(entry, *self.history_data(sampler, plot_data, files))
+        self.status_bar_panel.show_status("Ready", "from history" if fresh else "files changed, re-read")
+        self.watch_zoom(sampler, plot_data, cols, x_col, y_cols, y2_cols, predicates, query['expressions'])
+
+    def watch_zoom(self, sampler, plot_data, cols, x_col, y_cols, y2_cols, predicates=None, expressions=None):
+        """
+        Listens for changes to the x limits of a plot against time, so that when the user
+        zooms or pans, the visible time range can be re-read at the resolution it deserves
+        """
+        self.plot_data = plot_data
+        self._plot_query = (sampler, cols, x_col, y_cols, y2_cols, predicates, expressions if expressions is not None else self.get_expressions())
+        if not plot_data.date_plot:
+            return
+        # drawing the plot first applies its autoscaled limits, which aren't a zoom
+        self.canvas.draw()
+        for ax in self.canvas.figure.axes:
+            ax.callbacks.connect('xlim_changed', lambda ax: self.zoom_timer.start())
+
+    def on_zoom_timeout(self):
+        "re-reads just the visible time range of the plot, and swaps the new data into its lines"
+        if self.plot_data is None or self._plot_query is None or not self.plot_data.lines:
+            return
+        sampler, cols, x_col, y_cols, y2_cols, predicates, expressions = self._plot_query
+        ax = self.plot_data.lines[0].axes
+        start_num, end_num = ax.get_xlim()
+        start_dt = num2date(start_num).replace(tzinfo=None)
+        end_dt = num2date(end_num).replace(tzinfo=None)
+        # the file holding the start of the visible range began before it
+        files = sampler.get_fits_files_from_names(start_dt, end_dt, before=True)
+        try:
+            # the views zoomed and panned through are read again from the block cache, and
+            # would only push the useful results out of the result cache
+            data, _ = self.load_data(sampler, cols, (start_dt, end_dt), files, predicates, use_result_cache=False)
+            if data.shape[0] == 0:
+                self.status_bar_panel.show_status("No data in visible range")
+                return
+            visible = self.make_plot_data(sampler, data, x_col, y_cols, y2_cols, max_points=MAX_PLOT_POINTS, expressions=expressions, col_units=self.plot_data.col_units)
+        except Exception as e:
+            self.status_bar_panel.show_status(f"Error retrieving data: {e}")
+            return
+        self.plot_data.update_data(visible.x, visible.y_list, visible.y2_list, rescale=False)
+        self.canvas.draw_idle()
+        self.status_bar_panel.show_status("Ready", f"{data.shape[0]} rows")
+
+    def clear_graph(self):
+        "removes whatever the graph tab is showing"
         if not hasattr(self, 'graph_layout'):
             self.graph_layout = QVBoxLayout(self.graph_tab)
             self.graph_tab.setLayout(self.graph_layout)
@@ -270,6 +737,29 @@ class LogViewWindow(QWidget):
                 widget = item.widget()
                 if widget:
                     widget.setParent(None)
+
+    def show_image(self, image):
+        "updates the graph tab to show the given PNG, e.g. while the plot it is of is rebuilt"
+        pixmap = QPixmap()
+        pixmap.loadFromData(image, 'PNG')
+        label = QLabel()
+        label.setPixmap(pixmap)
+        label.setAlignment(Qt.AlignCenter)
+        self.clear_graph()
+        self.graph_layout.addWidget(label)
+        self.tab_widget.setCurrentWidget(self.graph_tab)
+
+    def show_figure(self, fig):
+        "updates the graph tab to show the given figure"
+        if hasattr(self, 'canvas'):
+            self.canvas.setParent(None)
+            del self.canvas
+        if hasattr(self, 'toolbar'):
+            self.toolbar.setParent(None)
+            del self.toolbar
+        self.canvas = FigureCanvas(fig)
+        self.toolbar = NavigationToolbar2QT(self.canvas, self.graph_tab)
+        self.clear_graph()
         self.graph_layout.addWidget(self.toolbar)
         self.graph_layout.addWidget(self.canvas)
         self.tab_widget.setCurrentWidget(self.graph_tab)
@@ -0,0 +1,111 @@
+"Module for OverlayPanel class"
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QSpinBox, QDoubleSpinBox, QCheckBox
+from matplotlib.figure import Figure
+from matplotlib.dates import DateFormatter
+from matplotlib import cm
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from astropy.time import Time
+import numpy as np
+from PlotData import decimate_indices
+from PeriodOverlay import PERIOD_DAYS
+
+class OverlayPanel(QWidget):
+
+    """
+    This class creates a panel for overlaying the same hours of consecutive days or weeks:
+    the selected time range gives the hours of the last period, and the same hours of the
+    periods before it are drawn over them, one line per period, on the last period's time
+    axis.  A band of percentiles across the periods, around their median, can be added.
+    """
+
+    def __init__(self, compute_overlay, max_points=1000, band_bins=288, parent=None):
+        super().__init__(parent)
+        self.overlay = None
+        self.col_units = {}
+        # each period's line is decimated to about this many points
+        self.max_points = max_points
+        # how many bins the band divides the window into
+        self.band_bins = band_bins
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel('period:'))
+        self.period = QComboBox()
+        self.period.addItems(list(PERIOD_DAYS))
+        controls_layout.addWidget(self.period)
+        controls_layout.addWidget(QLabel('periods:'))
+        self.num_periods = QSpinBox()
+        self.num_periods.setRange(2, 366)
+        self.num_periods.setValue(7)
+        controls_layout.addWidget(self.num_periods)
+        self.band = QCheckBox('median band')
+        controls_layout.addWidget(self.band)
+        controls_layout.addWidget(QLabel('lower percentile:'))
+        self.band_percentile = QDoubleSpinBox()
+        self.band_percentile.setRange(0.0, 49.0)
+        self.band_percentile.setValue(25.0)
+        controls_layout.addWidget(self.band_percentile)
+        self.overlay_button = QPushButton('Overlay')
+        self.overlay_button.setEnabled(False)
+        controls_layout.addWidget(self.overlay_button)
+        self.overlay_label = QLabel('')
+        self.figure = Figure(figsize=(4, 3))
+        self.canvas = FigureCanvas(self.figure)
+        layout = QVBoxLayout()
+        layout.addLayout(controls_layout)
+        layout.addWidget(self.overlay_label)
+        layout.addWidget(NavigationToolbar(self.canvas, self))
+        layout.addWidget(self.canvas, stretch=1)
+        self.setLayout(layout)
+        self.overlay_button.clicked.connect(compute_overlay)
+        self.band.toggled.connect(lambda checked: self.plot_overlay())
+        self.band_percentile.valueChanged.connect(lambda value: self.plot_overlay() if self.band.isChecked() else None)
+
+    def period_days(self):
+        "returns the length of the chosen period in days"
+        return PERIOD_DAYS[self.period.currentText()]
+
+    def show_overlay(self, overlay, col_units=None):
+        """
+        Draws the given overlay.
+
+        Args:
+            overlay (PeriodOverlay): The folded data.
+            col_units (dict): Units for each column.
+        """
+        self.overlay = overlay
+        self.col_units = col_units if col_units is not None else {}
+        self.overlay_label.setText(f"{len(overlay.series())} of {overlay.num_periods} periods with data, {overlay.num_samples} samples")
+        self.plot_overlay()
+
+    def plot_overlay(self):
+        "draws a line for each period, and the band if it is checked, for each column"
+        self.figure.clear()
+        if self.overlay is not None and self.overlay.series():
+            overlay = self.overlay
+            series = overlay.series()
+            # every period is drawn at the times of the last one
+            last_start = overlay.period_start(overlay.num_periods - 1)
+            colors = cm.get_cmap('viridis')(np.linspace(0.0, 0.9, overlay.num_periods))
+            # periods longer than a day are labelled with the day of the week too
+            date_format = '%a %H:%M' if overlay.period_days > 1 else '%H:%M'
+            ax = None
+            for i, col in enumerate(overlay.columns):
+                ax = self.figure.add_subplot(len(overlay.columns), 1, i + 1, sharex=ax)
+                for period, phases, values in series:
+                    indices = decimate_indices([values[:, i]], self.max_points)
+                    x = Time(last_start + phases[indices] / 86400.0, format='mjd').datetime
+                    label = Time(overlay.period_start(period), format='mjd').datetime.strftime('%Y-%m-%d')
+                    ax.plot(x, values[indices, i], '-', linewidth=0.8, color=colors[period], label=label)
+                if self.band.isChecked():
+                    lower = self.band_percentile.value()
+                    centres, (low, median, high) = overlay.band(i, bins=self.band_bins, percentiles=(lower, 50, 100 - lower))
+                    x = Time(last_start + centres / 86400.0, format='mjd').datetime
+                    ax.fill_between(x, low, high, color='grey', alpha=0.3, label=f"{lower:g}-{100 - lower:g}%")
+                    ax.plot(x, median, '-', color='black', linewidth=2, label='median')
+                ax.set_ylabel(f"{col} ({self.col_units.get(col, '')})")
+                ax.xaxis.set_major_formatter(DateFormatter(date_format))
+            self.figure.autofmt_xdate()
+            # a legend of more than a couple of weeks of dates would hide the data
+            if len(series) <= 14:
+                self.figure.axes[0].legend(fontsize='small')
+        self.canvas.draw_idle()
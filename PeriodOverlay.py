@@ -0,0 +1,139 @@
+"Module for PeriodOverlay class"
+
+import warnings
+import numpy as np
+
+# the periods data can be overlaid over, in days
+PERIOD_DAYS = {
+    'day': 1.0,
+    'week': 7.0,
+}
+
+
+def fold_times(dmjd, origin_mjd, period_days):
+    """
+    Folds times onto one period: returns the index of the period each time falls in,
+    counting from the one starting at origin_mjd, and the seconds since that period began.
+    """
+    offsets = np.asarray(dmjd, dtype=np.float64) - origin_mjd
+    periods = np.floor(offsets / period_days).astype(np.int64)
+    phases = (offsets - periods * period_days) * 86400.0
+    return periods, phases
+
+
+class PeriodOverlay:
+
+    """
+    Data folded onto a time of day (or time of week) axis, to compare the same hours over
+    several consecutive periods, e.g. to spot diurnal effects on temperatures.  The window
+    of each period that is kept starts at the same time of day as the first, origin_mjd,
+    and lasts window_days; rows outside the windows, or outside the num_periods periods,
+    are dropped as they are added.  Chunks of data can be added in any order, e.g. as the
+    files are read in parallel, and samples repeated where files overlap are dropped.
+    """
+
+    def __init__(self, columns, origin_mjd, period_days=1.0, num_periods=7, window_days=None):
+        if period_days <= 0:
+            raise ValueError(f"The period must be positive, not {period_days}")
+        self.columns = list(columns)
+        self.origin_mjd = float(origin_mjd)
+        self.period_days = float(period_days)
+        self.num_periods = int(num_periods)
+        self.window_days = min(self.period_days, window_days) if window_days else self.period_days
+        self.num_samples = 0
+        self._times = []
+        self._values = []
+        # the folded series, computed from the chunks when first asked for
+        self._series = None
+
+    def __repr__(self):
+        return f"PeriodOverlay(columns={self.columns}, period_days={self.period_days}, num_periods={self.num_periods}, samples={self.num_samples})"
+
+    def add(self, times, values):
+        """
+        Adds a chunk of data, keeping the rows that fall in the windows.
+
+        Args:
+            times (array_like): The times of the samples, in MJD (e.g. the DMJD column).
+            values (array_like): 2D array with one column per column of the overlay.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64).reshape(len(times), -1)
+        periods, phases = fold_times(times, self.origin_mjd, self.period_days)
+        keep = (periods >= 0) & (periods < self.num_periods) & (phases <= self.window_days * 86400.0)
+        if keep.any():
+            self._times.append(times[keep])
+            self._values.append(values[keep])
+            self.num_samples += int(keep.sum())
+            self._series = None
+
+    def period_start(self, period):
+        "returns the MJD of the start of the window of the given period"
+        return self.origin_mjd + period * self.period_days
+
+    def folded(self):
+        "returns the period indices, phases (in seconds) and values of all the rows, in time order"
+        if not self._times:
+            return np.array([], dtype=np.int64), np.array([]), np.empty((0, len(self.columns)))
+        times = np.concatenate(self._times)
+        values = np.concatenate(self._values)
+        order = np.argsort(times, kind='stable')
+        times, values = times[order], values[order]
+        keep = np.concatenate([[True], np.diff(times) > 0])
+        # the chunks are combined, so that sorting them again is cheap next time
+        self._times, self._values = [times[keep]], [values[keep]]
+        periods, phases = fold_times(self._times[0], self.origin_mjd, self.period_days)
+        return periods, phases, self._values[0]
+
+    def series(self):
+        """
+        Splits the data into one series per period.
+
+        Returns:
+            list: (period, phases, values) for each period with data, where phases are the
+            seconds since the start of the period's window, and values is a 2D array with
+            one column per column of the overlay.
+        """
+        if self._series is None:
+            periods, phases, values = self.folded()
+            splits = np.flatnonzero(np.diff(periods)) + 1
+            self._series = [
+                (int(period[0]), period_phases, period_values)
+                for period, period_phases, period_values in zip(np.split(periods, splits), np.split(phases, splits), np.split(values, splits))
+                if len(period)
+            ]
+        return self._series
+
+    def band(self, column=0, bins=288, percentiles=(25, 50, 75)):
+        """
+        Computes percentiles across the periods, e.g. a median and the band around it that
+        holds half of the days.  Each period is first averaged into bins of its window, so
+        that every period counts the same however many samples it has.
+
+        Args:
+            column (int): The index of the column.
+            bins (int): How many bins to divide the window into.
+            percentiles (tuple): The percentiles to compute.
+
+        Returns:
+            tuple: (centres, values), the seconds at the centre of each bin, and a 2D array
+            of each percentile (rows) in each bin (columns), NaN where no period has data.
+        """
+        periods, phases, values = self.folded()
+        window_seconds = self.window_days * 86400.0
+        bin_seconds = window_seconds / bins
+        centres = (np.arange(bins) + 0.5) * bin_seconds
+        column_values = values[:, column] if len(values) else np.array([])
+        good = ~np.isnan(column_values)
+        bin_index = np.minimum((phases[good] // bin_seconds).astype(np.int64), bins - 1)
+        cells = periods[good] * bins + bin_index
+        size = self.num_periods * bins
+        sums = np.bincount(cells, weights=column_values[good], minlength=size)
+        counts = np.bincount(cells, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = (sums / counts).reshape(self.num_periods, bins)
+        with warnings.catch_warnings():
+            # bins that no period has data in are NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            result = np.nanpercentile(means, percentiles, axis=0)
+        return centres, np.asarray(result).reshape(len(percentiles), bins)
@@ -2,6 +2,67 @@
 from matplotlib.figure import Figure
 from matplotlib import cm
 from astropy.time import Time
+import numpy as np
+
+
+def decimate_indices(ys, max_points):
+    """
+    Min/max decimation: splits the samples into buckets and keeps, for every bucket, the
+    samples holding the smallest and largest value of each series, along with the first
+    and last samples.  Lines drawn through the kept samples look the same as lines through
+    all of them, but cost far less to draw.
+
+    Args:
+        ys (list): The y arrays, all the same length, that share one x array.
+        max_points (int): Roughly how many samples to keep per series.
+
+    Returns:
+        np.ndarray: The sorted indices of the samples to keep.
+    """
+    num = len(ys[0]) if len(ys) > 0 else 0
+    if num <= max_points:
+        return np.arange(num)
+    num_buckets = max(1, max_points // 2)
+    bucket_size = int(np.ceil(num / num_buckets))
+    num_buckets = int(np.ceil(num / bucket_size))
+    keep = [np.array([0, num - 1])]
+    starts = np.arange(num_buckets) * bucket_size
+    for y in ys:
+        padded = np.full(num_buckets * bucket_size, np.nan)
+        padded[:num] = y
+        padded = padded.reshape(num_buckets, bucket_size)
+        missing = np.isnan(padded)
+        keep.append(starts + np.where(missing, np.inf, padded).argmin(axis=1))
+        keep.append(starts + np.where(missing, -np.inf, padded).argmax(axis=1))
+    indices = np.unique(np.concatenate(keep))
+    return indices[indices < num]
+
+def insert_gap_breaks(x, ys, gaps):
+    """
+    Inserts a NaN sample into each series in the middle of each gap, so that lines are
+    broken there instead of drawn straight across.  Gaps no longer than the typical step
+    between the samples, e.g. those hidden inside the time buckets of summary data, are
+    left alone.
+
+    Args:
+        x (np.ndarray): The sorted x values shared by the series.
+        ys (list): The y arrays.
+        gaps (np.ndarray): (n, 2) array of the x values at the start and end of each gap.
+
+    Returns:
+        tuple: (x, ys) with the breaks inserted.
+    """
+    x = np.asarray(x)
+    gaps = np.asarray(gaps, dtype=float).reshape(-1, 2)
+    if len(gaps) == 0 or len(x) < 2:
+        return x, ys
+    gaps = gaps[gaps[:, 1] - gaps[:, 0] > np.median(np.diff(x))]
+    middles = gaps.mean(axis=1)
+    middles = middles[(middles > x[0]) & (middles < x[-1])]
+    positions = np.searchsorted(x, middles)
+    x = np.insert(x.astype(float), positions, middles)
+    ys = [np.insert(np.asarray(y, dtype=float), positions, np.nan) for y in ys]
+    return x, ys
 
 class PlotData:
     """
@@ -19,7 +80,8 @@ class PlotData:
         y2_list=None,
         y2_cols=None,
         y2_expr=None,
-        date_plot=False
+        date_plot=False,
+        max_points=None
     ):
         self.x = x
         self.y_list = y_list  # list of y arrays
@@ -33,16 +95,86 @@ class PlotData:
         self.y2_list = y2_list if y2_list is not None else []  # list of second y arrays
         self.y2_cols = y2_cols if y2_cols is not None else []   # list of second y column names
         self.y2_expr = y2_expr
+        # if set, the data is decimated down to about this many points per line before plotting
+        self.max_points = max_points
+        # the (start, end) DMJDs of gaps in the data, where the lines of date plots are broken
+        self.gaps = None
+        # maps DMJDs to x values, as the x expression maps the x column; None if they're the same
+        self.gaps_to_x = None
+        # the matplotlib lines drawn by plot_data, so that their data can be updated later
+        self.lines = []
+        self.lines2 = []
 
     def __repr__(self):
         return f"PlotData(x={self.x}, y_list={self.y_list})"
 
+    @classmethod
+    def from_data(cls, sampler, data, x_col, y_cols, y2_cols, x_expr, y_expr, y2_expr, col_units, max_points=None):
+        """
+        Creates a PlotData from the columns returned by SamplerData.get_data, applying the
+        user's expressions (in terms of x, y and y2) to each axis.
+
+        Args:
+            sampler (SamplerData): The sampler the data came from.
+            data (np.ndarray): 2D array of the x column, then the y columns, then the y2 columns.
+            x_col (str), y_cols (list), y2_cols (list): The names of the columns.
+            x_expr (str), y_expr (str), y2_expr (str): The expressions, e.g. 'y*1'.
+            col_units (dict): Units for each column.
+            max_points (int): If set, lines are decimated to about this many points.
+        """
+        num_y_cols = len(y_cols)
+        num_y2_cols = len(y2_cols)
+        x = data[:, 0]
+        x_apply_expr = x_expr.replace('x', 'data')
+        x = sampler.apply_expression_to_data(x, x_apply_expr)
+        ys = np.array([data[:, i] for i in range(1, num_y_cols+1)])
+        apply_expr = y_expr.replace('y', 'data')
+        ys = sampler.apply_expression_to_data(ys, apply_expr)
+        y_label_expr = apply_expr.replace('data', '')
+        ys2 = np.array([data[:, i] for i in range(num_y_cols+1, num_y_cols+1 + num_y2_cols)])
+        apply_expr = y2_expr.replace('y2', 'data')
+        ys2 = sampler.apply_expression_to_data(ys2, apply_expr)
+        y2_label_expr = apply_expr.replace('data', '')
+        plot_data = cls(x, ys, x_col, y_cols, y_label_expr, sampler.sampler_name, col_units, y2_list=ys2, y2_cols=y2_cols, y2_expr=y2_label_expr, date_plot=x_col == 'DMJD', max_points=max_points)
+        plot_data.gaps_to_x = lambda gaps: sampler.apply_expression_to_data(gaps, x_apply_expr)
+        return plot_data
+
+
+    def gap_x_values(self):
+        "returns the gaps as (start, end) x values, mapped through the x expression, or None"
+        if self.gaps is None:
+            return None
+        gaps = np.asarray(self.gaps, dtype=float).reshape(-1, 2)
+        if self.gaps_to_x is not None:
+            # an expression that reverses the axis swaps the ends of the gaps
+            gaps = np.sort(np.asarray(self.gaps_to_x(gaps), dtype=float).reshape(-1, 2), axis=1)
+        return gaps
+
+    def plotted_arrays(self, break_gaps=True):
+        """
+        returns the x, y_list and y2_list to draw, decimated if max_points is set, and
+        (unless break_gaps is False) broken at the gaps in date plots
+        """
+        x, y_list, y2_list = self.x, self.y_list, self.y2_list
+        if self.max_points:
+            indices = decimate_indices(list(self.y_list) + list(self.y2_list), self.max_points)
+            x = np.asarray(self.x)[indices]
+            y_list = [np.asarray(y)[indices] for y in self.y_list]
+            y2_list = [np.asarray(y2)[indices] for y2 in self.y2_list]
+        if break_gaps and self.date_plot and self.gaps is not None:
+            num_y = len(y_list)
+            x, ys = insert_gap_breaks(x, list(y_list) + list(y2_list), self.gap_x_values())
+            y_list, y2_list = ys[:num_y], ys[num_y:]
+        return x, y_list, y2_list
 
     def plot_data(self):
         "plots the data contained in the member vars"
         fig = Figure(figsize=(4, 3))
         ax = fig.add_subplot(111)
         ax2 = None
+        x, y_list, y2_list = self.plotted_arrays()
+        self.lines = []
+        self.lines2 = []
 
         # Generate distinct colors for all plots
         num_plots = len(self.y_list) + len(self.y2_list)
@@ -51,18 +183,18 @@ class PlotData:
 
         # plot x vs y, including managing colors and labels
         if self.date_plot:
-            x_mjd = Time(self.x, format='mjd').datetime
-            for y, y_col in zip(self.y_list, self.y_cols):
+            x_mjd = Time(x, format='mjd').datetime
+            for y, y_col in zip(y_list, self.y_cols):
                 color = next(color_iter)
                 label = f"{y_col} ({self.col_units.get(y_col, '')})"
-                ax.plot_date(x_mjd, y, '-', label=label, color=color)
+                self.lines.extend(ax.plot_date(x_mjd, y, '-', label=label, color=color))
             ax.set_xlabel(x_mjd[0].strftime('%Y-%m-%d %H:%M:%S'))
         else:
             ax.set_xlabel(self.x_col)
-            for y, y_col in zip(self.y_list, self.y_cols):
+            for y, y_col in zip(y_list, self.y_cols):
                 color = next(color_iter)
                 label = f"{y_col} ({self.col_units.get(y_col, '')})"
-                ax.plot(self.x, y, label=label, color=color)
+                self.lines.extend(ax.plot(x, y, label=label, color=color))
         label = ", ".join(self.y_cols)
         label = f"({label}){self.y_expr}" if self.y_expr else label
         ax.set_ylabel(label)
@@ -71,15 +203,15 @@ class PlotData:
         if len(self.y2_list) >0 and self.y2_cols:
             ax2 = ax.twinx()
             if self.date_plot:
-                for y2, y2_col in zip(self.y2_list, self.y2_cols):
+                for y2, y2_col in zip(y2_list, self.y2_cols):
                     color = next(color_iter)
                     label = f"{y2_col} ({self.col_units.get(y2_col, '')})"
-                    ax2.plot_date(x_mjd, y2, '--', label=label, color=color)
+                    self.lines2.extend(ax2.plot_date(x_mjd, y2, '--', label=label, color=color))
             else:
-                for y2, y2_col in zip(self.y2_list, self.y2_cols):
+                for y2, y2_col in zip(y2_list, self.y2_cols):
                     color = next(color_iter)
                     label = f"{y2_col} ({self.col_units.get(y2_col, '')})"
-                    ax2.plot(self.x, y2, '--', label=label, color=color)
+                    self.lines2.extend(ax2.plot(x, y2, '--', label=label, color=color))
             # ax2.set_ylabel(', '.join(self.y2_cols))
             label = ", ".join(self.y2_cols)
             label = f"({label}){self.y2_expr}" if self.y2_expr else label
@@ -93,3 +225,25 @@ class PlotData:
 
         ax.set_title(self.sampler_name)
         return fig, ax2 if ax2 else ax
+
+    def update_data(self, x, y_list, y2_list=None, rescale=True):
+        """
+        Replaces the data being plotted and updates the lines drawn by plot_data in place,
+        which is much cheaper than building a new figure.  The caller is responsible for
+        redrawing the canvas.
+        """
+        self.x = x
+        self.y_list = y_list
+        self.y2_list = y2_list if y2_list is not None else []
+        x, y_list, y2_list = self.plotted_arrays()
+        if self.date_plot:
+            x = Time(x, format='mjd').datetime
+        for line, y in zip(self.lines, y_list):
+            line.set_data(x, y)
+        for line, y2 in zip(self.lines2, y2_list):
+            line.set_data(x, y2)
+        if rescale:
+            for lines in (self.lines, self.lines2):
+                if lines:
+                    lines[0].axes.relim()
+                    lines[0].axes.autoscale_view()
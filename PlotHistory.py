@@ -0,0 +1,163 @@
+"Module for PlotHistory class"
+import os
+import shutil
+import tempfile
+import weakref
+import numpy as np
+
+class PlotHistory:
+
+    """
+    A bounded back/forward history of the plots made, so that going back to a recent plot
+    doesn't mean reading and decimating its data again.  Each entry holds the query, the
+    decimated arrays that were drawn, a PNG of the rendered figure, and the (path, size,
+    mtime) fingerprints of the files the data came from, which the caller compares with
+    the files' current ones to decide whether the entry is still good.  Only the most
+    recent entries keep their arrays and image in memory, up to max_bytes; older ones are
+    moved to files in cache_dir (or, without a cache_dir, dropped) and read back when they
+    are returned to.  At most max_entries entries are kept.
+    """
+
+    def __init__(self, cache_dir=None, max_entries=20, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = []
+        self.index = -1
+        self.spill_dir = None
+        if cache_dir is not None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # each window gets its own directory, removed when the history goes away
+                self.spill_dir = tempfile.mkdtemp(prefix='history-', dir=cache_dir)
+                weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+            except OSError as e:
+                print(f"Could not create plot history directory in {cache_dir}: {e}")
+
+    def __repr__(self):
+        return f"PlotHistory(entries={len(self.entries)}, index={self.index}, bytes={self.memory_bytes()})"
+
+    @property
+    def current(self):
+        "the entry being shown, or None"
+        return self.entries[self.index] if 0 <= self.index < len(self.entries) else None
+
+    def can_go_back(self):
+        return self.index > 0
+
+    def can_go_forward(self):
+        return self.index < len(self.entries) - 1
+
+    def entry_bytes(self, entry):
+        "the memory used by the arrays and image of an entry"
+        if entry['arrays'] is None:
+            return 0
+        return sum(a.nbytes for a in entry['arrays'].values()) + len(entry['image'] or b'')
+
+    def memory_bytes(self):
+        return sum(self.entry_bytes(entry) for entry in self.entries)
+
+    def add(self, query, plot, arrays, image, fingerprints):
+        """
+        Adds a plot after the current one, dropping any entries that could have been gone
+        forward to, and makes it the current one.
+
+        Args:
+            query (dict): What was plotted, e.g. the directory, time range and columns.
+            plot (dict): The other arguments for a PlotData of the arrays.
+            arrays (dict): The arrays drawn: 'x', and 2D 'y' and 'y2', and any others
+                needed to draw them again, e.g. the gaps the lines are broken at.
+            image (bytes): A PNG of the rendered figure.
+            fingerprints (list): The fingerprints of the files the data came from.
+
+        Returns:
+            dict: The new entry.
+        """
+        for entry in self.entries[self.index + 1:]:
+            self.remove_files(entry)
+        self.entries = self.entries[:self.index + 1]
+        entry = {'query': query, 'plot': plot, 'arrays': arrays, 'image': image, 'fingerprints': fingerprints, 'path': None}
+        self.entries.append(entry)
+        while len(self.entries) > self.max_entries:
+            self.remove_files(self.entries.pop(0))
+        self.index = len(self.entries) - 1
+        self.limit_memory()
+        return entry
+
+    def update(self, entry, plot, arrays, image, fingerprints):
+        "replaces the data of an entry whose files have changed with that of a new query"
+        self.remove_files(entry)
+        entry.update(plot=plot, arrays=arrays, image=image, fingerprints=fingerprints, path=None)
+        self.limit_memory()
+
+    def back(self):
+        "makes the previous entry the current one, and returns it with its data, or None"
+        if not self.can_go_back():
+            return None
+        return self.go_to(self.index - 1)
+
+    def forward(self):
+        "makes the next entry the current one, and returns it with its data, or None"
+        if not self.can_go_forward():
+            return None
+        return self.go_to(self.index + 1)
+
+    def go_to(self, index):
+        """
+        Makes the given entry the current one, reading its data back from its file if it
+        had been moved out of memory; its arrays are None if they were dropped.
+        """
+        self.index = index
+        entry = self.entries[index]
+        if entry['arrays'] is None and entry['path'] is not None:
+            try:
+                with np.load(entry['path'] + '.npz') as saved:
+                    entry['arrays'] = {name: saved[name] for name in saved.files}
+                with open(entry['path'] + '.png', 'rb') as f:
+                    entry['image'] = f.read()
+            except (OSError, ValueError) as e:
+                print(f"Could not read plot history entry {entry['path']}: {e}")
+                entry['arrays'] = entry['image'] = None
+            self.remove_files(entry)
+            self.limit_memory()
+        return entry
+
+    def limit_memory(self):
+        """
+        Moves the data of the entries furthest from the current one out of memory until
+        the rest fit in max_bytes; the current entry always stays
+        """
+        by_distance = sorted(range(len(self.entries)), key=lambda i: abs(i - self.index), reverse=True)
+        total = self.memory_bytes()
+        for i in by_distance:
+            if total <= self.max_bytes:
+                break
+            if i == self.index or self.entries[i]['arrays'] is None:
+                continue
+            total -= self.entry_bytes(self.entries[i])
+            self.spill(self.entries[i])
+
+    def spill(self, entry):
+        "moves the data of an entry to files in spill_dir, or drops it if they can't be written"
+        if self.spill_dir is not None:
+            fd, path = tempfile.mkstemp(dir=self.spill_dir)
+            os.close(fd)
+            entry['path'] = path
+            try:
+                np.savez(path + '.npz', **entry['arrays'])
+                with open(path + '.png', 'wb') as f:
+                    f.write(entry['image'] or b'')
+            except OSError as e:
+                print(f"Could not write plot history entry {path}: {e}")
+                self.remove_files(entry)
+        entry['arrays'] = entry['image'] = None
+
+    def remove_files(self, entry):
+        "deletes the files an entry's data was moved to, if any"
+        if entry['path'] is None:
+            return
+        for suffix in ('', '.npz', '.png'):
+            try:
+                os.remove(entry['path'] + suffix)
+            except OSError:
+                pass
+        entry['path'] = None
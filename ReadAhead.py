@@ -0,0 +1,121 @@
+"Module for ReadAhead class"
+import io
+import threading
+import time
+
+class ReadAhead:
+
+    """
+    Reads a sequence of files into memory on a background thread, ahead of the one being
+    decoded, so that on high latency storage (such as the archive under /home/archive) the
+    I/O of the next files overlaps the decoding of the current one.  Each file is read
+    sequentially in large requests of chunk_bytes.  At most depth files are read ahead of
+    the one last taken with get, and no more than max_bytes are held at once, although one
+    file is always read, however large it is.  The time spent reading, and the time the
+    consumer spent waiting for files that weren't read yet, are recorded.
+    """
+
+    def __init__(self, files, depth=2, max_bytes=256 * 1024 * 1024, chunk_bytes=8 * 1024 * 1024):
+        self.files = list(files)
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self.chunk_bytes = chunk_bytes
+        # the position of each file, and of the next one the consumer will take
+        self._positions = {file_path: i for i, file_path in enumerate(self.files)}
+        self._next = 0
+        # the files read but not yet taken, and the bytes they hold
+        self._ready = {}
+        self._ready_bytes = 0
+        self._closed = False
+        self._condition = threading.Condition()
+        self.files_read = 0
+        self.bytes_read = 0
+        self.io_seconds = 0.0
+        self.wait_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __repr__(self):
+        return f"ReadAhead(files={len(self.files)}, depth={self.depth}, read={self.files_read}, buffered={len(self._ready)})"
+
+    def _run(self):
+        "reads the files in order, waiting whenever it is too far ahead of the consumer"
+        for i, file_path in enumerate(self.files):
+            with self._condition:
+                while not self._closed and (i >= self._next + self.depth or (self._ready and self._ready_bytes >= self.max_bytes)):
+                    self._condition.wait()
+                if self._closed:
+                    return
+                # the consumer has skipped this file
+                if i < self._next:
+                    continue
+            start = time.perf_counter()
+            try:
+                data = self.read(file_path)
+            except OSError as e:
+                print(f"Error reading ahead {file_path}: {e}")
+                data = None
+            with self._condition:
+                self.io_seconds += time.perf_counter() - start
+                if self._closed:
+                    return
+                if data is not None:
+                    self.files_read += 1
+                    self.bytes_read += len(data)
+                    self._ready_bytes += len(data)
+                self._ready[file_path] = data
+                self._condition.notify_all()
+
+    def read(self, file_path):
+        "reads a whole file in chunks, returning its bytes, or None if closed meanwhile"
+        chunks = []
+        with open(file_path, 'rb', buffering=0) as f:
+            while not self._closed:
+                chunk = f.read(self.chunk_bytes)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        return None
+
+    def get(self, file_path):
+        """
+        Waits for a file to be read and returns a file object of its bytes, or None if it
+        could not be read (or is not one of the files), so that the caller can open the file
+        itself.  Files must be taken in order, and any skipped are dropped.
+        """
+        position = self._positions.get(file_path)
+        if position is None:
+            return None
+        start = time.perf_counter()
+        with self._condition:
+            # dropping the files skipped makes room for the reader to get on to this one
+            for skipped in self.files[self._next:position]:
+                self._ready_bytes -= len(self._ready.pop(skipped, None) or b'')
+            self._next = max(self._next, position)
+            self._condition.notify_all()
+            while file_path not in self._ready and not self._closed and self._thread.is_alive():
+                self._condition.wait()
+            self.wait_seconds += time.perf_counter() - start
+            data = self._ready.pop(file_path, None)
+            self._ready_bytes -= len(data or b'')
+            self._next = position + 1
+            self._condition.notify_all()
+        return io.BytesIO(data) if data is not None else None
+
+    def close(self):
+        "stops reading ahead, and drops whatever was read but not taken"
+        with self._condition:
+            self._closed = True
+            self._ready.clear()
+            self._ready_bytes = 0
+            self._condition.notify_all()
+        self._thread.join()
+
+    def stats(self):
+        "returns the files and bytes read, and the seconds spent reading and waiting"
+        return {
+            'files': self.files_read,
+            'bytes': self.bytes_read,
+            'io_seconds': self.io_seconds,
+            'wait_seconds': self.wait_seconds,
+        }
@@ -0,0 +1,112 @@
+"Module for ResultCache class"
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+from CompactSeries import CompactSeries
+
+class ResultCache:
+
+    """
+    A persistent, on disk cache of query results, so that re-opening a plot of archive data
+    after a restart doesn't mean reading all of its FITS files again.  Each result is a
+    .npy file, stored column by column so that it can be memory mapped and each column read
+    contiguously.  The keys should include the (path, size, mtime) fingerprints of the files
+    a result came from; then a file that changes, such as the youngest file of a sampler
+    that is still being written, simply leads to a different key, and the stale result is
+    never reused.  CompactSeries results are stored as .npz files, which are read back
+    whole.  The least recently used results are deleted to keep the total size of the
+    cache under max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def make_key(self, *parts):
+        "returns a key for a result from the JSON serializable parts of its query"
+        return hashlib.sha1(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def path(self, key, suffix='.npy'):
+        "the file that holds the result for the key"
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def get(self, key):
+        """
+        Returns the cached result for the key, memory mapped (and so read-only) if it is
+        an array, or None
+        """
+        for suffix in ('.npy', '.npz'):
+            path = self.path(key, suffix)
+            try:
+                if suffix == '.npy':
+                    result = np.load(path, mmap_mode='r').T
+                else:
+                    result = CompactSeries.load(path)
+                # the modification time records when the result was last used
+                os.utime(path)
+            except (OSError, ValueError, KeyError):
+                continue
+            return result
+        return None
+
+    def put(self, key, result):
+        "stores a 2D array or CompactSeries for the key, then evicts old results if the cache is too big"
+        if result.nbytes > self.max_bytes:
+            return
+        compact = isinstance(result, CompactSeries)
+        suffix = '.npz' if compact else '.npy'
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self.path(key, suffix)
+            # write to a temporary file first, so that readers never see a partial result;
+            # each writer gets its own, so threads storing the same result don't collide
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=f"{key}.", suffix=f".tmp{suffix}")
+            with os.fdopen(fd, 'wb') as f:
+                if compact:
+                    result.save(f)
+                else:
+                    np.save(f, np.ascontiguousarray(np.asarray(result).T))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Error caching result {key}: {e}")
+            return
+        self.evict()
+
+    def entries(self):
+        "returns (last used, bytes, path) of each cached result, least recently used first"
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(('.npy', '.npz')) or '.tmp.' in name:
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return sorted(entries)
+
+    def evict(self):
+        "deletes the least recently used results until the cache fits in max_bytes"
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        "deletes every cached result"
+        for _, _, path in self.entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,23 +1,147 @@
 "Module for SamplerData class"
 
 import os
-from datetime import datetime
+import hashlib
+import json
+import operator
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from astropy.io import fits
 from astropy.time import Time
 from isort import file
 import numpy as np
+from ColumnStatistics import ColumnStatistics
+from BlockCache import BlockCache
+from WelchSpectrum import WelchSpectrum
+from CompactSeries import CompactSeries, choose_time_format
+from ReadAhead import ReadAhead
+from PeriodOverlay import PeriodOverlay, fold_times
 
+# the comparisons that can be used in row predicates, e.g. ('WINDVEL', '>', 10)
+PREDICATE_OPERATORS = {
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+# bytes per element of each FITS binary table format code (X is bits)
+FITS_FORMAT_BYTES = {'L': 1, 'X': 1, 'B': 1, 'I': 2, 'J': 4, 'K': 8, 'A': 1, 'E': 4, 'D': 8, 'C': 8, 'M': 16, 'P': 8, 'Q': 16}
+
+# how a query can be loaded, in order of preference: all the rows, the rows of each file
+# decimated as they are read, or a fixed number of time buckets of summary data
+LOAD_STRATEGIES = ('full', 'decimate', 'summary')
+
+# the ways the rows falling in each time bucket can be combined by SamplerData.resample
+RESAMPLE_AGGREGATORS = ('mean', 'min', 'max', 'first', 'last', 'count')
+
+# a step between samples more than this many times a sampler's nominal step is a gap
+GAP_FACTOR = 3.0
+
+def ordered_mask(dmjd, last_mjd=-np.inf):
+    """
+    Returns a mask of the samples that come after every sample before them, and after
+    last_mjd (e.g. the last sample of the previous file), which drops the duplicated and
+    out of order samples where consecutive files overlap
+    """
+    if len(dmjd) == 0:
+        return np.ones(0, dtype=bool)
+    before = np.maximum.accumulate(np.concatenate([[last_mjd], dmjd[:-1]]))
+    return dmjd > before
+
+def find_gaps(dmjd, step_seconds=None, gap_factor=GAP_FACTOR):
+    """
+    Finds the gaps in sorted DMJDs: the steps between consecutive samples that are longer
+    than gap_factor times the nominal step.
+
+    Args:
+        dmjd (np.ndarray): The sorted DMJDs.
+        step_seconds (float): The nominal step; defaults to the median step.
+        gap_factor (float): How many nominal steps long a gap is at least.
+
+    Returns:
+        tuple: (gaps, step_seconds), where gaps is an (n, 2) array of the DMJDs of the
+        samples before and after each gap.
+    """
+    steps = np.diff(dmjd) * 86400.0
+    if step_seconds is None:
+        step_seconds = float(np.median(steps)) if len(steps) else None
+    if not step_seconds or step_seconds <= 0:
+        return np.empty((0, 2)), step_seconds
+    after = np.flatnonzero(steps > gap_factor * step_seconds) + 1
+    return np.column_stack([dmjd[after - 1], dmjd[after]]), step_seconds
+
+def read_table_columns(file_path):
+    "returns the column names of the second table of a FITS file, which contains the data, or []"
+    try:
+        with fits.open(file_path) as hdul:
+            if len(hdul) < 2 or not hasattr(hdul[1], 'columns'):
+                return []
+            return list(hdul[1].columns.names)
+    except Exception:
+        return []
+
+def read_table_units(file_path):
+    "returns the column units of the second table of a FITS file, which contains the data, or []"
+    try:
+        with fits.open(file_path) as hdul:
+            if len(hdul) < 2 or not hasattr(hdul[1], 'columns'):
+                return []
+            return list(hdul[1].columns.units)
+    except Exception:
+        return []
 
 class SamplerData:
 
     """
     A class for reading data in FITS files that were created by the GBT program sampler2log
+
+    Thread safety: a SamplerData is a handle on one directory, and its queries (get_data,
+    iter_data, find_column_info, get_column_statistics, find_events, resample,
+    estimate_query, etc.) don't change it, so one SamplerData can serve queries from many
+    threads at once.  The caches it shares between queries guard themselves, and keep
+    one entry per file (and column), replacing those of a file once it changes.  The only
+    methods that change its state are the older find_youngest_fits, get_second_table_columns
+    and get_second_table_units, which remember the file and columns they found in
+    youngest_file, colnames and colunits; threads should use read_table_columns and
+    read_table_units instead.
     """
 
-    def __init__(self, directory):
+    def __init__(self, directory, cache_bytes=256 * 1024 * 1024, cache_dir=None, result_cache=None, derived_columns=None, read_ahead=0, read_ahead_bytes=256 * 1024 * 1024):
         self.directory = directory
+        # how many files iter_data reads ahead of the one it is decoding (0 for none), and
+        # how many bytes those files may hold (see ReadAhead)
+        self.read_ahead = read_ahead
+        self.read_ahead_bytes = read_ahead_bytes
+        # virtual columns computed from the FITS columns, keyed by name
+        self.derived_columns = {derived.name: derived for derived in derived_columns or []}
+        # an optional ResultCache, that get_data results are kept in between sessions
+        self.result_cache = result_cache
+        # where sidecar files, such as the zone maps, are kept; None keeps them in memory only
+        self.cache_dir = cache_dir
         self.youngest_file = None
         self.colnames = []
+        self.colunits = []
+        # guards the zone maps, which are updated by the threads of find_events
+        self._lock = threading.Lock()
+        # per file column statistics, keyed by (file path, column), with the fingerprint of
+        # the file they were computed from
+        self._stats_cache = {}
+        # decoded columns of recently read files, keyed by (file fingerprint, column)
+        self._block_cache = BlockCache(cache_bytes)
+        # per file column min/max/NaN counts, keyed by file path; loaded lazily from the sidecar
+        self._zone_maps = None
+        # per file sample steps and gaps, keyed by file path; loaded lazily from the sidecar
+        self._gap_index = None
+        # per file column names and units, keyed by file path; loaded lazily from the sidecar
+        self._schemas = None
+        # the headers of the data tables, keyed by file path, with the file's fingerprint
+        self._header_cache = {}
         self.sampler_name = os.path.basename(os.path.normpath(self.directory))
         if not os.path.isdir(self.directory):
             raise Exception(f"Directory does not exist: {self.directory}")
@@ -36,13 +160,18 @@ class SamplerData:
         youngest_file = files[0]
         oldest_files = files[-1]
 
-        cols1 = self.get_second_table_columns(file=youngest_file)
-        cols2 = self.get_second_table_columns(file=oldest_files)
+        cols1, _ = self.get_table_schema(youngest_file)
+        cols2, units = self.get_table_schema(oldest_files)
+        self.save_schemas()
         if cols1 != cols2:
             # raise Exception("Column names do not match between the youngest and oldest files. Choose a date range where the columns do not change")
             msg = f"Column names do not match for files between {startStr} and {endStr}. Choose a date range where the columns do not change"
             return None, None, msg
-        units = self.get_second_table_units(file=oldest_files)
+        # the derived columns that can be computed from these columns follow them
+        for derived in self.derived_columns.values():
+            if derived.name not in cols1 and all(col in cols1 for col in derived.inputs):
+                cols1 = cols1 + [derived.name]
+                units = units + [derived.units]
         return cols1, units, None
 
 
@@ -62,14 +191,10 @@ class SamplerData:
                 return []
         else:
             self.youngest_file = file
-        try:
-            with fits.open(self.youngest_file) as hdul:
-                if len(hdul) < 2 or not hasattr(hdul[1], 'columns'):
-                    return []
-                self.colnames = hdul[1].columns.names
-                return self.colnames
-        except Exception:
-            return []
+        colnames = read_table_columns(self.youngest_file)
+        if colnames:
+            self.colnames = colnames
+        return colnames
 
     def get_second_table_units(self, file=None):
         "The second table in these FITS files contains the data, including unit info"
@@ -78,15 +203,10 @@ class SamplerData:
                 return []
         else:
             self.youngest_file = file
-
-        try:
-            with fits.open(self.youngest_file) as hdul:
-                if len(hdul) < 2 or not hasattr(hdul[1], 'columns'):
-                    return []
-                self.colnames = hdul[1].columns.units
-                return self.colnames
-        except Exception:
-            return []
+        colunits = read_table_units(self.youngest_file)
+        if colunits:
+            self.colunits = colunits
+        return colunits
 
     def datetime_to_mjd(self, dt):
         """
@@ -164,7 +284,232 @@ class SamplerData:
 
 
 
-    def get_data(self, columns, timestamp_range, pre_open_hook=None):
+    def parse_predicates(self, text):
+        """
+        Parses row predicates from text like 'WINDVEL > 10 and HUMIDITY_1 >= 0.9'.
+
+        Args:
+            text (str): Comparisons of a column with a number, joined by 'and'.
+
+        Returns:
+            list: List of (column, operator, value) tuples; empty if the text is blank.
+
+        Raises:
+            ValueError: If a comparison can't be parsed.
+        """
+        predicates = []
+        if not text.strip():
+            return predicates
+        for term in re.split(r'\s+and\s+', text.strip(), flags=re.IGNORECASE):
+            match = re.fullmatch(r'\s*(\w+)\s*(>=|<=|==|!=|>|<)\s*(\S+)\s*', term)
+            if not match:
+                raise ValueError(f"Can not parse condition '{term}'; expected e.g. 'WINDVEL > 10'")
+            col, op, value = match.groups()
+            try:
+                predicates.append((col, op, float(value)))
+            except ValueError:
+                raise ValueError(f"Condition '{term}' must compare {col} with a number")
+        return predicates
+
+    def predicate_columns(self, predicates):
+        "the columns referenced by the given row predicates"
+        return [col for col, _, _ in predicates] if predicates else []
+
+    def column_key(self, col):
+        "identifies a column in the caches: derived columns by their definition, so editing one invalidates them"
+        derived = self.derived_columns.get(col)
+        return derived.key if derived is not None else col
+
+    def read_file_data(self, file_path, columns, start_mjd, end_mjd, predicates=None):
+        """
+        Reads the specified columns from the second table of a single FITS file, keeping only
+        the rows whose DMJD falls within the given range (see read_file_columns).
+
+        Returns:
+            np.ndarray: 2D array with one column per requested column, or None if the file
+            does not contain a data table with all the requested columns.
+        """
+        arrays = self.read_file_columns(file_path, columns, start_mjd, end_mjd, predicates=predicates)
+        if arrays is None:
+            return None
+        # Extract the data for the specified columns
+        return np.column_stack([arrays[col] for col in columns])
+
+    def is_cached(self, file_path, columns, predicates=None):
+        "whether all the columns a read of a file would need are in the block cache"
+        fingerprint = self.file_fingerprint(file_path)
+        for col in dict.fromkeys(['DMJD'] + list(columns) + self.predicate_columns(predicates)):
+            if self._block_cache.get((fingerprint, self.column_key(col))) is not None:
+                continue
+            inputs = self.derived_columns[col].inputs if col in self.derived_columns else [col]
+            if any(self._block_cache.get((fingerprint, input_col)) is None for input_col in inputs):
+                return False
+        return True
+
+    def read_file_columns(self, file_path, columns, start_mjd, end_mjd, predicates=None, source=None):
+        """
+        Reads the specified columns from the second table of a single FITS file, keeping only
+        the rows whose DMJD falls within the given range.  Columns that were read recently
+        are taken from the block cache, as long as the file hasn't changed since.  Derived
+        columns are computed from their input columns for the whole file, and then cached
+        like the columns read from it.
+
+        Args:
+            file_path (str): The FITS file to read.
+            columns (list): List of column names to extract.
+            start_mjd (float): Start of the DMJD range (inclusive).
+            end_mjd (float): End of the DMJD range (inclusive).
+            predicates (list): (column, operator, value) tuples that rows must all satisfy;
+                the columns need not be among those returned.
+            source (file): The bytes of the file already read into memory, e.g. by a
+                ReadAhead, to decode instead of opening the file.
+
+        Returns:
+            dict: The array of each requested column, and of DMJD, in the dtype of the FITS
+            column, or None if the file does not contain a data table with all the columns.
+        """
+        fingerprint = self.file_fingerprint(file_path)
+        needed = list(dict.fromkeys(['DMJD'] + list(columns) + self.predicate_columns(predicates)))
+        arrays = {col: self._block_cache.get((fingerprint, self.column_key(col))) for col in needed}
+        # derived columns that aren't cached need their inputs
+        to_derive = [col for col in needed if arrays[col] is None and col in self.derived_columns]
+        for col in to_derive:
+            for input_col in self.derived_columns[col].inputs:
+                if input_col not in arrays:
+                    arrays[input_col] = self._block_cache.get((fingerprint, input_col))
+        missing = [col for col in arrays if arrays[col] is None and col not in self.derived_columns]
+        if missing:
+            with fits.open(source if source is not None else file_path) as hdul:
+                if len(hdul) < 2 or not hasattr(hdul[1], 'data'):
+                    # Skipping file: no second table HDU or data.
+                    return None
+                data = hdul[1].data
+                # Ensure all requested columns and 'DMJD' exist
+                if not all(col in data.names for col in missing):
+                    # Skipping file: not all requested columns or 'DMJD' exist.
+                    return None
+                for col in missing:
+                    arrays[col] = np.array(data[col])
+                    self._block_cache.put((fingerprint, col), arrays[col])
+        for col in to_derive:
+            derived = self.derived_columns[col]
+            arrays[col] = derived.evaluate(arrays)
+            self._block_cache.put((fingerprint, derived.key), arrays[col])
+        dmjd = arrays['DMJD']
+        mask = (dmjd >= start_mjd) & (dmjd <= end_mjd)
+        # the predicates are applied here, file by file, so only matching rows are kept
+        for col, op, value in predicates or []:
+            mask &= PREDICATE_OPERATORS[op](arrays[col], value)
+        return {col: arrays[col][mask] for col in dict.fromkeys(['DMJD'] + list(columns))}
+
+    def read_rows(self, file_path, columns, first_row=0):
+        """
+        Reads the specified columns of the rows of a FITS file from first_row on, e.g. the
+        rows appended to the youngest file since it was last read.  The file is memory
+        mapped, so the rows before first_row are not read at all; nor is anything cached.
+
+        Args:
+            file_path (str): The FITS file to read.
+            columns (list): List of column names to extract, which may be derived.
+            first_row (int): The first row to read.
+
+        Returns:
+            tuple: (data, num_rows), where data is a 2D array with one column per requested
+            column, and num_rows the number of rows in the file; data is None if the file
+            does not contain a data table with all the requested columns.
+        """
+        raw = list(dict.fromkeys(input_col for col in columns for input_col in (self.derived_columns[col].inputs if col in self.derived_columns else [col])))
+        with fits.open(file_path, memmap=True) as hdul:
+            if len(hdul) < 2 or not hasattr(hdul[1], 'data') or hdul[1].data is None:
+                return None, 0
+            data = hdul[1].data
+            if not all(col in data.names for col in raw):
+                return None, 0
+            num_rows = len(data)
+            arrays = {col: np.array(data[col][first_row:]) for col in raw}
+        for col in columns:
+            if col in self.derived_columns:
+                arrays[col] = self.derived_columns[col].evaluate(arrays)
+        return np.column_stack([arrays[col] for col in columns]), num_rows
+
+    def iter_data(self, columns, timestamp_range, pre_open_hook=None, files=None, predicates=None, compact=None, failed=None, read_stats=None):
+        """
+        A generator that reads the data for the specified columns one file at a time, so
+        that callers can process a long time range without holding all of it in memory.
+        Samples that are out of order, such as those repeated where one file overlaps the
+        last, are dropped.
+
+        Args:
+            columns (list): List of column names to extract.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            pre_open_hook (callable): Called as hook(file_path, ifile, num_files) before
+                each file is opened.
+            files (list): The FITS files to read; defaults to those in the time range.
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+            compact (str): If one of COMPACT_TIME_FORMATS, yield CompactSeries, with their
+                times stored in that format relative to the start of the range.
+            failed (list): If given, the files that could not be read are appended to it.
+            read_stats (dict): If given, updated once the files have been read ahead with
+                the files and bytes read ahead, and the seconds spent reading them, waiting
+                for them and decoding them.
+
+        Yields:
+            np.ndarray: 2D array of the rows from each file within the time range, or a
+            CompactSeries of them.
+        """
+        start, end = timestamp_range
+        start_mjd = self.datetime_to_mjd(start)
+        end_mjd = self.datetime_to_mjd(end)
+        if start_mjd is None or end_mjd is None:
+            return
+        if files is None:
+            files = self.get_fits_files_from_names(start, end)
+        compact = self.compact_time_format(compact, timestamp_range, files)
+        # the files that aren't cached can be read ahead while the current one is decoded
+        read_ahead = None
+        if self.read_ahead > 0 and len(files) > 1:
+            read_ahead = ReadAhead([f for f in files if not self.is_cached(f, columns, predicates)], self.read_ahead, self.read_ahead_bytes)
+        decode_seconds = 0.0
+        # the last sample yielded, so that samples repeated by the next file are dropped
+        last_mjd = -np.inf
+        try:
+            for ifile, file_path in enumerate(files):
+                try:
+                    # an example of a pre_open_hook might be a method for updating the status
+                    # bar of an application using this class
+                    if pre_open_hook is not None:
+                        pre_open_hook(file_path, ifile, len(files))
+                    source = read_ahead.get(file_path) if read_ahead is not None else None
+                    decode_start = time.perf_counter()
+                    arrays = self.read_file_columns(file_path, columns, start_mjd, end_mjd, predicates=predicates, source=source)
+                    if arrays is not None:
+                        keep = ordered_mask(arrays['DMJD'], last_mjd)
+                        if not keep.all():
+                            arrays = {col: values[keep] for col, values in arrays.items()}
+                        if len(arrays['DMJD']) > 0:
+                            last_mjd = float(arrays['DMJD'][-1])
+                except Exception as e:
+                    print(f"Error processing {file_path}: {e}")
+                    if failed is not None:
+                        failed.append(file_path)
+                    continue
+                # this is outside the try, so that an error here is never taken for a bad file
+                if arrays is None:
+                    block = None
+                elif compact:
+                    block = CompactSeries.from_columns(arrays['DMJD'], arrays, columns, start_mjd, compact)
+                else:
+                    block = np.column_stack([arrays[col] for col in columns])
+                decode_seconds += time.perf_counter() - decode_start
+                if block is not None and len(block) > 0:
+                    yield block
+        finally:
+            if read_ahead is not None:
+                read_ahead.close()
+                if read_stats is not None:
+                    read_stats.update(read_ahead.stats(), decode_seconds=decode_seconds)
+
+    def get_data(self, columns, timestamp_range, pre_open_hook=None, files=None, predicates=None, compact=None, use_result_cache=True):
         """
         Extracts data for specified columns within a given timestamp range from the second
         table of all FITS files in the specified timestamp range.
@@ -172,42 +517,950 @@ class SamplerData:
         Args:
             columns (list): List of column names to extract.
             timestamp_range (tuple): (start, end) timestamps (inclusive).
+            files (list): The FITS files to read; defaults to those in the time range.
+            predicates (list): (column, operator, value) tuples, e.g. ('WINDVEL', '>', 10),
+                that rows must all satisfy to be returned.
+            compact (str): If one of COMPACT_TIME_FORMATS, return a CompactSeries, with its
+                times stored in that format relative to the start of the range.
+            use_result_cache (bool): Whether to look the result up in, and keep it in, the
+                result_cache; passing views, such as those zoomed through, aren't worth keeping.
 
         Returns:
             np.ndarray: Array of tuples with values for the specified columns within the
-            timestamp range from all relevant files.
+            timestamp range from all relevant files, or a CompactSeries of them.  Array
+            results from the result_cache are memory mapped, and so read-only.
+        """
+        key = None
+        if compact:
+            if files is None:
+                files = self.get_fits_files_from_names(*timestamp_range)
+            compact = self.compact_time_format(compact, timestamp_range, files)
+        if self.result_cache is not None and use_result_cache:
+            start, end = timestamp_range
+            if files is None:
+                files = self.get_fits_files_from_names(start, end)
+            # the fingerprints make a result from files that have since changed unreachable
+            parts = [
+                os.path.abspath(self.directory),
+                [self.column_key(col) for col in columns],
+                self.datetime_to_mjd(start),
+                self.datetime_to_mjd(end),
+                [self.file_fingerprint(f) for f in files],
+                [(self.column_key(col), op, value) for col, op, value in predicates] if predicates else predicates,
+            ]
+            # compact results are kept apart from the arrays of the same query
+            if compact:
+                parts.append(compact)
+            key = self.result_cache.make_key(*parts)
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                return cached
+        failed = []
+        blocks = list(self.iter_data(columns, timestamp_range, pre_open_hook=pre_open_hook, files=files, predicates=predicates, compact=compact, failed=failed))
+        if not blocks:
+            if compact:
+                start_mjd = self.datetime_to_mjd(timestamp_range[0])
+                return CompactSeries.from_columns(np.array([]), {col: np.array([]) for col in columns}, columns, start_mjd, compact)
+            return np.array([])
+        result = CompactSeries.concatenate(blocks) if compact else np.concatenate(blocks)
+        # a result missing files that failed to read, e.g. on a network glitch, isn't kept
+        if key is not None and not failed:
+            self.result_cache.put(key, result)
+        return result
+
+    def iter_data_progressive(self, columns, timestamp_range, pre_open_hook=None, preview_files=8, refinements=10, predicates=None, files=None, reduce_block=None):
+        """
+        A generator for drawing long time ranges progressively: it first reads a sparse
+        subset of the files spread evenly over the range, so that the overall shape of the
+        data can be shown quickly, then reads the remaining files in order, yielding the
+        refined data set as it goes.
+
+        Args:
+            columns (list): List of column names to extract.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            pre_open_hook (callable): Called as hook(file_path, ifile, num_files) before
+                each file is opened.
+            preview_files (int): How many files make up the coarse preview.
+            refinements (int): Roughly how many refined results to yield after the preview.
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+            files (list): The FITS files to read; defaults to those in the time range.
+            reduce_block (callable): Called on the rows of each file as they are read, e.g.
+                to decimate them; returns the indices of the rows to keep.
+
+        Yields:
+            tuple: (data, files_read, num_files), where data is the 2D array of all rows
+            read so far (as reduced), in time order, without the samples repeated where
+            files overlap.
         """
         start, end = timestamp_range
+        if files is None:
+            files = self.get_fits_files_from_names(start, end)
+        num_files = len(files)
+        if num_files == 0:
+            return
+        preview = sorted(set(np.linspace(0, num_files - 1, min(preview_files, num_files)).round().astype(int)))
+        preview_set = set(preview)
+        remaining = [i for i in range(num_files) if i not in preview_set]
+        # the DMJD of each row is kept with the blocks, to drop the samples repeated where
+        # files overlap once the files on either side have been read
+        read_columns = list(columns) if 'DMJD' in columns else list(columns) + ['DMJD']
+        dmjd_index = read_columns.index('DMJD')
+        blocks = {}
+        last_mjds = {}
+        def read(indices, files_read):
+            "reads the given files into blocks, reporting progress over all files"
+            for k, i in enumerate(indices):
+                def hook(file_path, ifile, num, k=k):
+                    if pre_open_hook is not None:
+                        pre_open_hook(file_path, files_read + k, num_files)
+                for block in self.iter_data(read_columns, timestamp_range, pre_open_hook=hook, files=[files[i]], predicates=predicates):
+                    dmjd, block = block[:, dmjd_index], block[:, :len(columns)]
+                    last_mjds[i] = dmjd[-1]
+                    if reduce_block is not None:
+                        keep = reduce_block(block)
+                        dmjd, block = dmjd[keep], block[keep]
+                    blocks[i] = (dmjd, block)
+        def combined():
+            "the blocks read so far, in time order"
+            if not blocks:
+                return np.array([])
+            kept = []
+            last_mjd = -np.inf
+            for i in sorted(blocks):
+                dmjd, block = blocks[i]
+                kept.append(block[ordered_mask(dmjd, last_mjd)])
+                last_mjd = max(last_mjd, last_mjds[i])
+            return np.concatenate(kept)
+
+        read(preview, 0)
+        files_read = len(preview)
+        yield combined(), files_read, num_files
+        step = max(1, int(np.ceil(len(remaining) / max(1, refinements))))
+        for i in range(0, len(remaining), step):
+            batch = remaining[i:i + step]
+            read(batch, files_read)
+            files_read += len(batch)
+            yield combined(), files_read, num_files
+
+    def resample(self, columns, timestamp_range, bucket_seconds, aggregator='mean', pre_open_hook=None, files=None, predicates=None):
+        """
+        Resamples the specified columns onto a regular time grid, combining the rows that
+        fall in each bucket with the given aggregator.  The files are streamed one at a
+        time, and each is reduced into the buckets with vectorized numpy reductions, so
+        memory use is proportional to the number of buckets rather than the number of rows.
+        NaNs are ignored by all the aggregators except first and last.
+
+        Args:
+            columns (list): List of column names to resample.
+            timestamp_range (tuple): (start, end) datetimes; the grid starts at start.
+            bucket_seconds (float): Width of each bucket, in seconds.
+            aggregator (str): One of 'mean', 'min', 'max', 'first', 'last' or 'count'.
+            pre_open_hook (callable): Called as hook(file_path, ifile, num_files) before
+                each file is opened.
+            files (list): The FITS files to read; defaults to those in the time range.
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+
+        Returns:
+            np.ndarray: 2D array with one row per bucket: the DMJD of the start of the
+            bucket followed by the aggregated value of each column (NaN, or 0 for count,
+            where a bucket has no data).
+        """
+        if aggregator not in RESAMPLE_AGGREGATORS:
+            raise ValueError(f"Unknown aggregator '{aggregator}'; expected one of {', '.join(RESAMPLE_AGGREGATORS)}")
+        if bucket_seconds <= 0:
+            raise ValueError("The bucket width must be positive")
+        start, end = timestamp_range
         start_mjd = self.datetime_to_mjd(start)
         end_mjd = self.datetime_to_mjd(end)
         if start_mjd is None or end_mjd is None:
             return np.array([])
-        files_in_range = self.get_fits_files_from_names(start, end)
-        # print('Files in range:', files_in_range)
-        result = []
-        for ifile, file_path in enumerate(files_in_range):
+        width = bucket_seconds / 86400.0
+        # (allowing for the rounding of the MJDs when the range is a whole number of buckets)
+        num_buckets = max(1, int(np.ceil((end_mjd - start_mjd) / width - 1e-6)))
+        num_cols = len(columns)
+        counts = np.zeros((num_buckets, num_cols))
+        totals = np.zeros((num_buckets, num_cols)) if aggregator == 'mean' else None
+        values_seen = np.full((num_buckets, num_cols), np.nan)
+        bucket_seen = np.zeros(num_buckets, dtype=bool)
+        for block in self.iter_data(['DMJD'] + list(columns), timestamp_range, pre_open_hook=pre_open_hook, files=files, predicates=predicates):
+            buckets = ((block[:, 0] - start_mjd) / width).astype(np.int64)
+            np.clip(buckets, 0, num_buckets - 1, out=buckets)
+            values = block[:, 1:]
+            valid = ~np.isnan(values)
+            # count (and sum) every column at once by giving each (bucket, column) its own bin
+            bins = (buckets[:, np.newaxis] * num_cols + np.arange(num_cols)).ravel()
+            counts += np.bincount(bins, weights=valid.ravel(), minlength=num_buckets * num_cols).reshape(num_buckets, num_cols)
+            if totals is not None:
+                totals += np.bincount(bins, weights=np.where(valid, values, 0.0).ravel(), minlength=num_buckets * num_cols).reshape(num_buckets, num_cols)
+            if aggregator in ('min', 'max', 'first', 'last'):
+                # rows are in time order, so each bucket is a run of rows
+                run_starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+                run_buckets = buckets[run_starts]
+                if aggregator == 'min':
+                    np.fmin.at(values_seen, run_buckets, np.fmin.reduceat(values, run_starts, axis=0))
+                elif aggregator == 'max':
+                    np.fmax.at(values_seen, run_buckets, np.fmax.reduceat(values, run_starts, axis=0))
+                elif aggregator == 'first':
+                    unique_buckets, first_runs = np.unique(run_buckets, return_index=True)
+                    new = ~bucket_seen[unique_buckets]
+                    values_seen[unique_buckets[new]] = values[run_starts[first_runs[new]]]
+                else:
+                    run_ends = np.r_[run_starts[1:], len(buckets)] - 1
+                    unique_buckets, last_runs = np.unique(run_buckets[::-1], return_index=True)
+                    values_seen[unique_buckets] = values[run_ends[len(run_buckets) - 1 - last_runs]]
+                bucket_seen[run_buckets] = True
+        if aggregator == 'mean':
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result = np.where(counts > 0, totals / counts, np.nan)
+        elif aggregator == 'count':
+            result = counts
+        else:
+            result = values_seen
+        bucket_mjd = start_mjd + np.arange(num_buckets) * width
+        return np.column_stack([bucket_mjd, result])
+
+    def spectrum(self, column, timestamp_range, segment_seconds=10.0, overlap=0.5, window='hann', spectrogram_bins=None, pre_open_hook=None, files=None):
+        """
+        Computes the power spectral density of a column by Welch's method, streaming the
+        files one at a time, e.g. to look for oscillations in the data of the 50 Hz samplers.
+        The sample rate is estimated from the first file read.
+
+        Args:
+            column (str): The column to analyze.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            segment_seconds (float): Length of the segments the data is cut into; this sets
+                the frequency resolution.
+            overlap (float): Fraction of each segment that overlaps the next.
+            window (str): The window applied to each segment (see SPECTRUM_WINDOWS).
+            spectrogram_bins (int): If given, also compute a spectrogram with about this many
+                time bins over the range (but none shorter than a segment).
+            pre_open_hook (callable): Called as hook(file_path, ifile, num_files) before
+                each file is opened.
+            files (list): The FITS files to read; defaults to those in the time range.
+
+        Returns:
+            WelchSpectrum: The spectrum, or None if there was no data to analyze.
+        """
+        start, end = timestamp_range
+        spectrogram_seconds = None
+        if spectrogram_bins:
+            spectrogram_seconds = max(segment_seconds, (end - start).total_seconds() / spectrogram_bins)
+        spectrum = None
+        for block in self.iter_data(['DMJD', column], timestamp_range, pre_open_hook=pre_open_hook, files=files):
+            if spectrum is None:
+                steps = np.diff(block[:, 0]) * 86400.0
+                steps = steps[steps > 0]
+                if len(steps) == 0:
+                    continue
+                sample_rate = 1.0 / np.median(steps)
+                nperseg = max(2, int(round(segment_seconds * sample_rate)))
+                spectrum = WelchSpectrum(sample_rate, nperseg, overlap=overlap, window=window, spectrogram_seconds=spectrogram_seconds)
+            spectrum.add(block[:, 0], block[:, 1])
+        return spectrum
+
+    def overlay_periods(self, columns, timestamp_range, period_days=1.0, num_periods=7, progress_hook=None, max_workers=4, predicates=None):
+        """
+        Reads the same hours of several consecutive days (or weeks) in one pass, and folds
+        them onto one time of day (or week) axis, e.g. to compare the temperatures of each
+        afternoon of the last week.  The time range gives the hours of the last period, and
+        the same hours of the num_periods - 1 periods before it are read with them; a range
+        longer than a period is cut down to the period before its end.  Files that hold none
+        of those hours are skipped, and the rest are read in parallel.
+
+        Args:
+            columns (list): List of column names.
+            timestamp_range (tuple): (start, end) datetimes of the last period's window.
+            period_days (float): The length of a period, e.g. 1 or 7 (see PERIOD_DAYS).
+            num_periods (int): How many periods to overlay.
+            progress_hook (callable): Called as hook(file_path, ifile, num_files) in the
+                calling thread as each file is finished.
+            max_workers (int): Number of files to read at once.
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+
+        Returns:
+            PeriodOverlay: The folded data, or None if the range is invalid.
+        """
+        start, end = timestamp_range
+        period = timedelta(days=period_days)
+        window = min(end - start, period)
+        origin = end - window - (num_periods - 1) * period
+        origin_mjd = self.datetime_to_mjd(origin)
+        end_mjd = self.datetime_to_mjd(end)
+        if origin_mjd is None or end_mjd is None:
+            return None
+        overlay = PeriodOverlay(columns, origin_mjd, period_days, num_periods, window.total_seconds() / 86400.0)
+        files = self.get_fits_files_from_names(origin, end, before=True)
+        if files:
+            # each file holds the data from the time in its name up to the next file's; the
+            # files are kept whose data begins inside a window or runs on into the next one
+            file_starts = np.array([self.datetime_to_mjd(self.get_datetime_from_filename(f)) for f in files], dtype=np.float64)
+            file_ends = np.append(file_starts[1:], end_mjd)
+            periods, phases = fold_times(file_starts, origin_mjd, period_days)
+            next_window = origin_mjd + (periods + 1) * period_days
+            wanted = (phases <= overlay.window_days * 86400.0) | (file_ends > next_window)
+            files = [f for f, keep in zip(files, wanted) if keep]
+        def read(file_path):
             try:
-                # an example of a pre_open_hook might be a method for updating the status
-                # bar of an application using this class
-                if pre_open_hook is not None:
-                    pre_open_hook(file_path, ifile, len(files_in_range))
-                with fits.open(file_path) as hdul:
-                    if len(hdul) < 2 or not hasattr(hdul[1], 'data'):
-                        # Skipping file: no second table HDU or data.
-                        continue
-                    data = hdul[1].data
-                    # Ensure all requested columns and 'DMJD' exist
-                    if not all(col in data.names for col in columns) or 'DMJD' not in data.names:
-                        # Skipping file: not all requested columns or 'DMJD' exist.
-                        continue
-                    mask = (data['DMJD'] >= start_mjd) & (data['DMJD'] <= end_mjd)
-                    # Extract the data for the specified columns
-                    rows = zip(*(data[col][mask] for col in columns))
-                    result.extend(rows)
+                return list(self.iter_data(['DMJD'] + list(columns), (origin, end), files=[file_path], predicates=predicates))
             except Exception as e:
                 print(f"Error processing {file_path}: {e}")
+                return []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(read, file_path): file_path for file_path in files}
+            for ifile, future in enumerate(as_completed(futures)):
+                if progress_hook is not None:
+                    progress_hook(futures[future], ifile, len(files))
+                for block in future.result():
+                    overlay.add(block[:, 0], block[:, 1:])
+        return overlay
+
+    def get_table_header(self, file_path):
+        "returns the header of the data table of a file, cached until the file changes"
+        fingerprint = self.file_fingerprint(file_path)
+        cached = self._header_cache.get(file_path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        header = fits.getheader(file_path, 1)
+        # this replaces the header of the file from before it last changed
+        self._header_cache[file_path] = (fingerprint, header)
+        return header
+
+    def column_width(self, tform):
+        "returns the width in bytes of a binary table column with the given TFORM, e.g. '1D'"
+        match = re.match(r'\s*(\d*)([A-Z])', tform)
+        if not match:
+            return 0
+        repeat = int(match.group(1)) if match.group(1) else 1
+        if match.group(2) == 'X':
+            return (repeat + 7) // 8
+        return repeat * FITS_FORMAT_BYTES.get(match.group(2), 0)
+
+    def estimate_step_seconds(self, files):
+        "estimates the step between samples from the first and last rows of the first of the files with two, or returns None"
+        for file_path in files:
+            try:
+                with fits.open(file_path, memmap=True) as hdul:
+                    dmjd = hdul[1].data['DMJD']
+                    if len(dmjd) > 1:
+                        return float(dmjd[-1] - dmjd[0]) * 86400.0 / (len(dmjd) - 1)
+            except Exception:
                 continue
-        return np.array(result)
+        return None
+
+    def compact_time_format(self, compact, timestamp_range, files):
+        """
+        Returns the time format the CompactSeries of a query over the given range and files
+        can use (see choose_time_format), or None if the times have to be kept as float64,
+        e.g. for long ranges of high rate data; a change from the format asked for is reported.
+        """
+        if not compact:
+            return None
+        start, end = timestamp_range
+        span_seconds = max((end - start).total_seconds(), 0.0)
+        chosen = choose_time_format(compact, span_seconds)
+        # whether float32 times are precise enough depends on the step between samples,
+        # which is only looked up when they would be used
+        if chosen == 'float32':
+            chosen = choose_time_format(compact, span_seconds, self.estimate_step_seconds(files))
+        if chosen != compact:
+            print(f"{compact} times can't hold {span_seconds / 86400.0:.1f} days of {self.sampler_name} without losing samples; using {chosen or 'float64'}")
+        return chosen
+
+    def estimate_query(self, columns, timestamp_range, files=None, compact=None):
+        """
+        Estimates the size of a query from the headers of the files alone, without reading
+        any data.  The row count (NAXIS2) of files only partly inside the time range is
+        scaled by the fraction of the file's time span that overlaps the range.
+
+        Args:
+            columns (list): List of column names.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            files (list): The FITS files to read; defaults to those in the time range.
+            compact (str): If one of COMPACT_TIME_FORMATS, estimate the size of the
+                CompactSeries get_data would return.
+
+        Returns:
+            dict: 'files', 'columns', 'rows' (within the range), 'read_bytes' (of the
+            column data that will be read from disk), 'row_bytes' and 'result_bytes' (of
+            what get_data would return) and 'max_file_bytes' (of the largest single file's
+            result).
+        """
+        start, end = timestamp_range
+        if files is None:
+            files = self.get_fits_files_from_names(start, end)
+        compact = self.compact_time_format(compact, timestamp_range, files)
+        file_starts = [self.get_datetime_from_filename(f) for f in files]
+        known_starts = [dt for dt in file_starts if dt is not None]
+        spans = [(b - a).total_seconds() for a, b in zip(known_starts, known_starts[1:])]
+        # the last file is assumed to span as long as files typically do
+        typical_span = float(np.median(spans)) if spans else 3600.0
+        # derived columns are computed from their inputs, which are what is read
+        needed = list(dict.fromkeys(['DMJD'] + [input_col for col in columns for input_col in (self.derived_columns[col].inputs if col in self.derived_columns else [col])]))
+        rows = 0
+        read_bytes = 0
+        max_file_rows = 0
+        # get_data returns float64 values; compact results keep the FITS column widths
+        row_bytes = len(columns) * 8
+        if compact:
+            # derived columns are computed as float64
+            row_bytes = 4 + sum(8 for col in set(columns) if col in self.derived_columns)
+            native = [col for col in set(columns) if col != 'DMJD' and col not in self.derived_columns]
+        for i, file_path in enumerate(files):
+            try:
+                header = self.get_table_header(file_path)
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                continue
+            widths = {header.get(f"TTYPE{j}"): self.column_width(header.get(f"TFORM{j}", ''))
+                      for j in range(1, header.get('TFIELDS', 0) + 1)}
+            if not all(col in widths for col in needed):
+                continue
+            num_rows = header.get('NAXIS2', 0)
+            fraction = 1.0
+            if file_starts[i] is not None:
+                file_start = file_starts[i]
+                next_start = file_starts[i + 1] if i + 1 < len(files) else None
+                span = (next_start - file_start).total_seconds() if next_start else typical_span
+                if span > 0:
+                    overlap = min((end - file_start).total_seconds(), span) - max((start - file_start).total_seconds(), 0.0)
+                    fraction = min(max(overlap / span, 0.0), 1.0)
+            file_rows = int(round(num_rows * fraction))
+            rows += file_rows
+            max_file_rows = max(max_file_rows, num_rows)
+            read_bytes += num_rows * sum(widths[col] for col in needed)
+            if compact and native is not None:
+                row_bytes += sum(widths[col] for col in native)
+                native = None
+        return {
+            'files': len(files),
+            'columns': len(columns),
+            'rows': rows,
+            'read_bytes': read_bytes,
+            'row_bytes': row_bytes,
+            'result_bytes': rows * row_bytes,
+            'max_file_bytes': max_file_rows * row_bytes,
+        }
+
+    def choose_load_strategy(self, estimate, memory_budget, points_per_file):
+        """
+        Picks one of LOAD_STRATEGIES for a query, given its estimate and a memory budget:
+        'full' if all the rows fit, 'decimate' if the rows of each file decimated down to
+        points_per_file fit, and otherwise 'summary', whose size does not depend on the
+        number of rows at all.
+
+        Args:
+            estimate (dict): As returned by estimate_query.
+            memory_budget (int): Bytes that the loaded data may use.
+            points_per_file (int): Points kept per file when decimating.
+
+        Returns:
+            str: The strategy.
+        """
+        if estimate['result_bytes'] <= memory_budget:
+            return 'full'
+        decimated_bytes = estimate['files'] * points_per_file * estimate.get('row_bytes', estimate['columns'] * 8)
+        if decimated_bytes + estimate['max_file_bytes'] <= memory_budget:
+            return 'decimate'
+        return 'summary'
+
+    def file_fingerprint(self, file_path):
+        "identifies the contents of a file by its path, size and modification time"
+        stat = os.stat(file_path)
+        return (file_path, stat.st_size, stat.st_mtime)
+
+    def get_file_statistics(self, file_path, columns, start_mjd, end_mjd, predicates=None, after_mjd=-np.inf):
+        """
+        Computes the statistics of the specified columns for the rows of a single FITS file
+        within the given DMJD range.  Statistics covering a whole file are cached, and
+        reused for any range that covers the file, until the file changes.  Statistics of
+        rows filtered by predicates are not cached.
+
+        Args:
+            file_path (str): The FITS file to read.
+            columns (list): List of column names.
+            start_mjd (float): Start of the DMJD range (inclusive).
+            end_mjd (float): End of the DMJD range (inclusive).
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+            after_mjd (float): The last sample of the file before (see known_last_mjd); the
+                samples repeating it, and out of order ones, are left out.
+
+        Returns:
+            tuple: (stats, first_mjd, last_mjd), the ColumnStatistics for each column, or
+            None if the file does not contain a data table with all the requested columns,
+            the first sample of the file that wasn't left out, and the last sample of the
+            file, which bounds the samples the next file repeats.
+        """
+        fingerprint = self.file_fingerprint(file_path)
+        file_stats = {}
+        first_mjd, last_mjd = np.inf, -np.inf
+        for col in columns if not predicates else []:
+            cached = self._stats_cache.get((file_path, self.column_key(col)))
+            if cached is not None and cached[0] == fingerprint and cached[1] == after_mjd and start_mjd <= cached[2] and cached[3] <= end_mjd:
+                file_stats[col] = cached[4]
+                first_mjd, last_mjd = cached[2], cached[3]
+        missing = [col for col in columns if col not in file_stats]
+        if not missing:
+            return file_stats, first_mjd, last_mjd
+        # read the whole file, to know whether the range covers it
+        needed = list(dict.fromkeys(['DMJD'] + missing + self.predicate_columns(predicates)))
+        block = self.read_file_data(file_path, needed, -np.inf, np.inf)
+        if block is None:
+            return None, np.inf, -np.inf
+        data = {col: block[:, i] for i, col in enumerate(needed)}
+        ordered = ordered_mask(data['DMJD'], after_mjd)
+        dmjd = data['DMJD'][ordered]
+        if len(block) > 0:
+            last_mjd = float(np.max(data['DMJD']))
+        if len(dmjd) > 0:
+            first_mjd = float(dmjd[0])
+        data = {col: values[ordered] for col, values in data.items()}
+        mask = (dmjd >= start_mjd) & (dmjd <= end_mjd)
+        whole_file = len(dmjd) > 0 and bool(mask.all()) and not predicates
+        for col, op, value in predicates or []:
+            mask &= PREDICATE_OPERATORS[op](data[col], value)
+        for col in missing:
+            stats = ColumnStatistics()
+            stats.add(data[col][mask])
+            file_stats[col] = stats
+            if whole_file:
+                self._stats_cache[(file_path, self.column_key(col))] = (fingerprint, after_mjd, dmjd.min(), dmjd.max(), stats)
+        return file_stats, first_mjd, last_mjd
+
+    def get_column_statistics(self, columns, timestamp_range, progress_hook=None, max_workers=4, predicates=None, files=None):
+        """
+        Computes summary statistics (count, NaNs, min, max, mean, std, approximate quantiles
+        and histogram) for the specified columns in one streaming pass over the FITS files
+        in the time range, without holding the data in memory.  The files are read in
+        parallel, and their partial results merged.  The samples a file repeats where it
+        overlaps the one before are left out.
+
+        Args:
+            columns (list): List of column names.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            progress_hook (callable): Called as hook(file_path, ifile, num_files) in the
+                calling thread as each file is finished.
+            max_workers (int): Number of files to read at once.
+            predicates (list): (column, operator, value) tuples that rows must all satisfy.
+            files (list): The FITS files to read; defaults to those in the time range.
+
+        Returns:
+            dict: ColumnStatistics for each column.
+        """
+        start, end = timestamp_range
+        start_mjd = self.datetime_to_mjd(start)
+        end_mjd = self.datetime_to_mjd(end)
+        result = {col: ColumnStatistics() for col in columns}
+        if start_mjd is None or end_mjd is None:
+            return result
+        if files is None:
+            files = self.get_fits_files_from_names(start, end)
+        def read(ifile, after_mjd):
+            try:
+                return self.get_file_statistics(files[ifile], columns, start_mjd, end_mjd, predicates=predicates, after_mjd=after_mjd)
+            except Exception as e:
+                print(f"Error processing {files[ifile]}: {e}")
+                return None, np.inf, -np.inf
+        # the last sample of the file before each one, where it is known without reading it
+        bounds = [-np.inf] + [self.known_last_mjd(file_path, columns) for file_path in files[:-1]]
+        file_results = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(read, i, bound if bound is not None else -np.inf): i for i, bound in enumerate(bounds)}
+            for ifile, future in enumerate(as_completed(futures)):
+                if progress_hook is not None:
+                    progress_hook(files[futures[future]], ifile, len(files))
+                file_results[futures[future]] = future.result()
+        # the files that turn out to repeat samples of the file before are read again, from
+        # the block cache, leaving those samples out
+        for i in range(1, len(files)):
+            last_mjd = file_results[i - 1][2]
+            if bounds[i] is None and file_results[i][1] <= last_mjd:
+                file_results[i] = read(i, last_mjd)
+        for file_stats, _, _ in file_results:
+            if file_stats:
+                for col in columns:
+                    result[col].merge(file_stats[col])
+        return result
+
+    def known_last_mjd(self, file_path, columns=()):
+        """
+        Returns the last DMJD of a file if it is known without reading the file, from its
+        gap index entry or the cached statistics of one of the columns, or None
+        """
+        try:
+            _, size, mtime = fingerprint = self.file_fingerprint(file_path)
+        except OSError:
+            return None
+        gap_index = self.load_gap_index()
+        with self._lock:
+            entry = gap_index.get(file_path)
+        if entry is not None and entry['size'] == size and entry['mtime'] == mtime:
+            return entry['last']
+        for col in columns:
+            cached = self._stats_cache.get((file_path, self.column_key(col)))
+            if cached is not None and cached[0] == fingerprint:
+                return cached[3]
+        return None
+
+    def cache_path(self, suffix):
+        "returns the path of a sidecar file for this directory in the cache_dir, or None"
+        if not self.cache_dir:
+            return None
+        digest = hashlib.md5(os.path.abspath(self.directory).encode()).hexdigest()[:8]
+        return os.path.join(self.cache_dir, f"{self.sampler_name}-{digest}{suffix}")
+
+    def read_sidecar(self, suffix):
+        "returns the dictionary in a JSON sidecar file, or an empty one"
+        path = self.cache_path(suffix)
+        if path and os.path.isfile(path):
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Error reading {path}: {e}")
+        return {}
+
+    def write_sidecar(self, suffix, contents):
+        "writes a dictionary to a JSON sidecar file, if there is a cache_dir"
+        path = self.cache_path(suffix)
+        if not path or contents is None:
+            return
+        with self._lock:
+            text = json.dumps(contents)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # write to a temporary file first, so that readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error writing {path}: {e}")
+
+    def load_zone_maps(self):
+        "returns the zone maps, reading them from the sidecar file the first time"
+        with self._lock:
+            if self._zone_maps is None:
+                self._zone_maps = self.read_sidecar('.zonemaps.json')
+            return self._zone_maps
+
+    def save_zone_maps(self):
+        "writes the zone maps to the sidecar file, if there is a cache_dir"
+        self.write_sidecar('.zonemaps.json', self._zone_maps)
+
+    def get_zone_map(self, file_path, columns):
+        """
+        Returns the zone map of a file: the [min, max, NaN count] of each of the given
+        columns over the whole file.  Zone maps are computed once per file and kept until
+        the file's size or modification time changes.
+
+        Args:
+            file_path (str): The FITS file.
+            columns (list): List of column names.
+
+        Returns:
+            dict: [min, max, nan_count] for each column, or None if the file does not
+            contain a data table with all the columns.
+        """
+        zone_maps = self.load_zone_maps()
+        _, size, mtime = self.file_fingerprint(file_path)
+        with self._lock:
+            entry = zone_maps.get(file_path)
+            if entry is None or entry['size'] != size or entry['mtime'] != mtime:
+                entry = {'size': size, 'mtime': mtime, 'columns': {}}
+                zone_maps[file_path] = entry
+            known = dict(entry['columns'])
+        missing = [col for col in columns if self.column_key(col) not in known]
+        if missing:
+            block = self.read_file_data(file_path, missing, -np.inf, np.inf)
+            if block is None:
+                return None
+            for i, col in enumerate(missing):
+                values = block[:, i]
+                nans = int(np.isnan(values).sum())
+                if nans == len(values):
+                    known[self.column_key(col)] = [np.nan, np.nan, nans]
+                else:
+                    known[self.column_key(col)] = [float(np.nanmin(values)), float(np.nanmax(values)), nans]
+            with self._lock:
+                entry['columns'].update({self.column_key(col): known[self.column_key(col)] for col in missing})
+        return {col: known[self.column_key(col)] for col in columns}
+
+    def zone_may_match(self, zone_map, predicates):
+        "returns False if the zone map shows that no row can satisfy all of the predicates"
+        for col, op, value in predicates:
+            low, high, nans = zone_map[col]
+            # NaN is != every value, as it is in the row masks
+            if op == '!=':
+                if nans == 0 and low == high == value:
+                    return False
+                continue
+            if np.isnan(low):
+                return False
+            if op == '>' and not high > value:
+                return False
+            if op == '>=' and not high >= value:
+                return False
+            if op == '<' and not low < value:
+                return False
+            if op == '<=' and not low <= value:
+                return False
+            if op == '==' and not low <= value <= high:
+                return False
+        return True
+
+    def get_file_events(self, file_path, predicates, start_mjd, end_mjd):
+        """
+        Finds the runs of consecutive rows of a file within the DMJD range where all the
+        predicates hold, skipping the file without reading its data if its zone map shows
+        that no row can match.  Out of order samples are left out.
+
+        Returns:
+            tuple: (intervals, at_start, at_end, last_mjd), where intervals is a list of
+            [start_dmjd, end_dmjd] pairs, at_start and at_end tell whether the first and
+            last runs touch the first and last rows in range, so that runs can be joined
+            across file boundaries, and last_mjd is the last sample of the file (from its
+            zone map), so that the samples the next file repeats can be dropped.
+        """
+        pred_cols = list(dict.fromkeys(self.predicate_columns(predicates)))
+        zone_map = self.get_zone_map(file_path, ['DMJD'] + pred_cols)
+        if zone_map is None:
+            return [], False, False, -np.inf
+        dmjd_low, dmjd_high, _ = zone_map['DMJD']
+        if not self.zone_may_match(zone_map, predicates) or dmjd_high < start_mjd or dmjd_low > end_mjd:
+            return [], False, False, dmjd_high
+        block = self.read_file_data(file_path, ['DMJD'] + pred_cols, start_mjd, end_mjd)
+        if block is not None:
+            block = block[ordered_mask(block[:, 0])]
+        if block is None or len(block) == 0:
+            return [], False, False, dmjd_high
+        mask = np.ones(len(block), dtype=bool)
+        for col, op, value in predicates:
+            mask &= PREDICATE_OPERATORS[op](block[:, 1 + pred_cols.index(col)], value)
+        # the runs of True in the mask begin where it rises and end where it falls
+        edges = np.diff(np.concatenate([[False], mask, [False]]).astype(np.int8))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        dmjd = block[:, 0]
+        intervals = [[dmjd[i], dmjd[j]] for i, j in zip(starts, ends)]
+        return intervals, bool(mask[0]), bool(mask[-1]), dmjd_high
+
+    def find_events(self, predicates, timestamp_range, progress_hook=None, max_workers=4):
+        """
+        Finds the time intervals within the range where all of the predicates held, e.g.
+        every time the wind speed exceeded 15 m/s.  Per file zone maps (see get_zone_map)
+        let files that can not match be skipped without reading their data, and the rest
+        are scanned in parallel.  Runs of matching rows that continue across file
+        boundaries are merged into one interval, unless there is a gap between the files,
+        and the runs of samples repeated where files overlap are dropped.
+
+        Args:
+            predicates (list): (column, operator, value) tuples that must all hold.
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            progress_hook (callable): Called as hook(file_path, ifile, num_files) in the
+                calling thread as each file is finished.
+            max_workers (int): Number of files to scan at once.
+
+        Returns:
+            list: (start_dmjd, end_dmjd) tuples, in time order.
+        """
+        start, end = timestamp_range
+        start_mjd = self.datetime_to_mjd(start)
+        end_mjd = self.datetime_to_mjd(end)
+        if start_mjd is None or end_mjd is None or not predicates:
+            return []
+        # the file that holds the start of the range began before it
+        files = self.get_fits_files_from_names(start, end, before=True)
+        def scan(file_path):
+            try:
+                return self.get_file_events(file_path, predicates, start_mjd, end_mjd)
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                return [], False, False, -np.inf
+        file_events = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(scan, file_path): i for i, file_path in enumerate(files)}
+            for ifile, future in enumerate(as_completed(futures)):
+                if progress_hook is not None:
+                    progress_hook(files[futures[future]], ifile, len(files))
+                file_events[futures[future]] = future.result()
+        self.save_zone_maps()
+        events = []
+        continues = False
+        # the last sample of the files so far; the files are scanned independently, so the
+        # runs of the samples a file repeats where it overlaps the one before are dropped here
+        last_mjd = -np.inf
+        for ifile, (intervals, at_start, at_end, file_last_mjd) in enumerate(file_events):
+            for i, interval in enumerate(intervals):
+                if interval[1] <= last_mjd:
+                    continue
+                if events and interval[0] <= last_mjd:
+                    # the run started in the repeated samples, so it continues the last one
+                    events[-1] = (events[-1][0], interval[1])
+                elif i == 0 and at_start and continues and not self.is_gap_between(files[ifile - 1], files[ifile], events[-1][1], interval[0]):
+                    events[-1] = (events[-1][0], interval[1])
+                else:
+                    events.append((interval[0], interval[1]))
+            continues = at_end
+            last_mjd = max(last_mjd, file_last_mjd)
+        self.save_gap_index()
+        return events
+
+    def is_gap_between(self, file_before, file_after, end_mjd, start_mjd):
+        """
+        Returns whether the time between the last sample of one file, end_mjd, and the first
+        of the next, start_mjd, is a gap, i.e. longer than GAP_FACTOR times the nominal step
+        of the files (see get_file_gaps).  Without a known step, it isn't taken for one.
+        """
+        steps = [entry['step'] for entry in (self.get_file_gaps(file_before), self.get_file_gaps(file_after)) if entry is not None and entry['step']]
+        return bool(steps) and (start_mjd - end_mjd) * 86400.0 > GAP_FACTOR * max(steps)
+
+    def load_gap_index(self):
+        "returns the gap index, reading it from the sidecar file the first time"
+        with self._lock:
+            if self._gap_index is None:
+                self._gap_index = self.read_sidecar('.gaps.json')
+            return self._gap_index
+
+    def save_gap_index(self):
+        "writes the gap index to the sidecar file, if there is a cache_dir"
+        self.write_sidecar('.gaps.json', self._gap_index)
+
+    def load_schemas(self):
+        "returns the schemas, reading them from the sidecar file the first time"
+        with self._lock:
+            if self._schemas is None:
+                self._schemas = self.read_sidecar('.schema.json')
+            return self._schemas
+
+    def save_schemas(self):
+        "writes the schemas to the sidecar file, if there is a cache_dir"
+        self.write_sidecar('.schema.json', self._schemas)
+
+    def get_table_schema(self, file_path):
+        """
+        Returns the column names and units of the data table of a file, read from its header
+        rather than by building the table's columns, which for samplers with thousands of
+        columns takes far longer.  Schemas are kept until the file's size or modification
+        time changes, and are saved with save_schemas.
+
+        Returns:
+            tuple: (names, units), or ([], []) if the file has no data table.
+        """
+        schemas = self.load_schemas()
+        try:
+            _, size, mtime = self.file_fingerprint(file_path)
+        except OSError:
+            return [], []
+        with self._lock:
+            entry = schemas.get(file_path)
+        if entry is not None and entry['size'] == size and entry['mtime'] == mtime:
+            return list(entry['names']), list(entry['units'])
+        try:
+            header = self.get_table_header(file_path)
+        except Exception:
+            return [], []
+        num = header.get('TFIELDS', 0)
+        names = [header.get(f'TTYPE{i}', '') for i in range(1, num + 1)]
+        units = [header.get(f'TUNIT{i}', '') for i in range(1, num + 1)]
+        with self._lock:
+            schemas[file_path] = {'size': size, 'mtime': mtime, 'names': names, 'units': units}
+        return list(names), list(units)
+
+    def get_file_gaps(self, file_path):
+        """
+        Returns the gap index entry of a file: its first and last DMJDs, number of rows,
+        nominal (median) step in seconds, and the [start, end] DMJDs of the gaps in it.
+        Entries are computed once per file and kept until the file's size or modification
+        time changes.
+
+        Returns:
+            dict: The entry, or None if the file has no data.
+        """
+        gap_index = self.load_gap_index()
+        _, size, mtime = self.file_fingerprint(file_path)
+        with self._lock:
+            entry = gap_index.get(file_path)
+        if entry is not None and entry['size'] == size and entry['mtime'] == mtime:
+            return entry
+        arrays = self.read_file_columns(file_path, [], -np.inf, np.inf)
+        if arrays is None or len(arrays['DMJD']) == 0:
+            return None
+        dmjd = arrays['DMJD'][ordered_mask(arrays['DMJD'])]
+        gaps, step_seconds = find_gaps(dmjd)
+        entry = {
+            'size': size,
+            'mtime': mtime,
+            'first': float(dmjd[0]),
+            'last': float(dmjd[-1]),
+            'rows': len(dmjd),
+            'step': step_seconds,
+            'gaps': gaps.tolist(),
+        }
+        with self._lock:
+            gap_index[file_path] = entry
+        return entry
+
+    def get_gap_index(self, timestamp_range, files=None, progress_hook=None, max_workers=4):
+        """
+        Finds where data is missing in a time range, from the per file gap index (see
+        get_file_gaps), so that availability can be shown before any data is loaded.  Gaps
+        within files, between files, and at either end of the range are all found, as
+        steps longer than GAP_FACTOR times the sampler's nominal step.  Files whose
+        entries aren't known yet are scanned in parallel.
+
+        Args:
+            timestamp_range (tuple): (start, end) datetimes (inclusive).
+            files (list): The FITS files to scan; defaults to those in the time range.
+            progress_hook (callable): Called as hook(file_path, ifile, num_files) in the
+                calling thread as each file is finished.
+            max_workers (int): Number of files to scan at once.
+
+        Returns:
+            dict: 'gaps', a list of (start_dmjd, end_dmjd) tuples clipped to the range,
+            'step_seconds', the nominal step, 'coverage', the fraction of the range not in
+            a gap, and 'rows', the number of rows in the files.
+        """
+        start, end = timestamp_range
+        start_mjd = self.datetime_to_mjd(start)
+        end_mjd = self.datetime_to_mjd(end)
+        if start_mjd is None or end_mjd is None:
+            return {'gaps': [], 'step_seconds': None, 'coverage': 0.0, 'rows': 0}
+        if files is None:
+            files = self.get_fits_files_from_names(start, end, before=True)
+        def scan(file_path):
+            try:
+                return self.get_file_gaps(file_path)
+            except Exception as e:
+                print(f"Error processing {file_path}: {e}")
+                return None
+        entries = [None] * len(files)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(scan, file_path): i for i, file_path in enumerate(files)}
+            for ifile, future in enumerate(as_completed(futures)):
+                if progress_hook is not None:
+                    progress_hook(files[futures[future]], ifile, len(files))
+                entries[futures[future]] = future.result()
+        self.save_gap_index()
+        entries = [e for e in entries if e is not None and e['last'] >= start_mjd and e['first'] <= end_mjd]
+        steps = [e['step'] for e in entries if e['step']]
+        step_seconds = float(np.median(steps)) if steps else None
+        if not entries or step_seconds is None:
+            return {'gaps': [(start_mjd, end_mjd)], 'step_seconds': step_seconds, 'coverage': 0.0, 'rows': 0}
+        # the gaps in the files, then between them and at the ends of the range
+        gaps = [tuple(gap) for e in entries for gap in e['gaps']]
+        edges = [start_mjd] + [mjd for e in entries for mjd in (e['first'], e['last'])] + [end_mjd]
+        edges = np.array(edges).reshape(-1, 2)
+        longest = GAP_FACTOR * step_seconds / 86400.0
+        gaps += [tuple(edge) for edge in edges if edge[1] - edge[0] > longest]
+        gaps = sorted((float(max(a, start_mjd)), float(min(b, end_mjd))) for a, b in gaps)
+        gaps = [(a, b) for a, b in gaps if b > a]
+        missing = sum(b - a for a, b in gaps)
+        return {
+            'gaps': gaps,
+            'step_seconds': step_seconds,
+            'coverage': float(1.0 - missing / (end_mjd - start_mjd)) if end_mjd > start_mjd else 1.0,
+            'rows': sum(e['rows'] for e in entries),
+        }
 
     def apply_expression_to_data(self, data, expression):
         """
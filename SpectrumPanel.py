@@ -0,0 +1,94 @@
+"Module for SpectrumPanel class"
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QComboBox, QDoubleSpinBox
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.backends.backend_qt5agg import NavigationToolbar2QT as NavigationToolbar
+from astropy.time import Time
+import numpy as np
+from WelchSpectrum import SPECTRUM_WINDOWS
+
+class SpectrumPanel(QWidget):
+
+    """
+    This class creates a panel for the spectral analysis of the selected y columns: the
+    segment length, overlap and window for Welch's method are chosen here, and either the
+    power spectral densities of the columns or the spectrogram of the first is drawn.
+    """
+
+    def __init__(self, compute_spectrum, parent=None):
+        super().__init__(parent)
+        self.spectra = {}
+        self.col_units = {}
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel('segment (s):'))
+        self.segment_seconds = QDoubleSpinBox()
+        self.segment_seconds.setRange(0.1, 86400.0)
+        self.segment_seconds.setValue(10.0)
+        controls_layout.addWidget(self.segment_seconds)
+        controls_layout.addWidget(QLabel('overlap:'))
+        self.overlap = QDoubleSpinBox()
+        self.overlap.setRange(0.0, 0.95)
+        self.overlap.setSingleStep(0.05)
+        self.overlap.setValue(0.5)
+        controls_layout.addWidget(self.overlap)
+        controls_layout.addWidget(QLabel('window:'))
+        self.window = QComboBox()
+        self.window.addItems(list(SPECTRUM_WINDOWS))
+        controls_layout.addWidget(self.window)
+        self.mode = QComboBox()
+        self.mode.addItems(['PSD', 'spectrogram'])
+        controls_layout.addWidget(self.mode)
+        self.compute_button = QPushButton('Compute Spectrum')
+        self.compute_button.setEnabled(False)
+        controls_layout.addWidget(self.compute_button)
+        self.spectrum_label = QLabel('')
+        self.figure = Figure(figsize=(4, 3))
+        self.canvas = FigureCanvas(self.figure)
+        layout = QVBoxLayout()
+        layout.addLayout(controls_layout)
+        layout.addWidget(self.spectrum_label)
+        layout.addWidget(NavigationToolbar(self.canvas, self))
+        layout.addWidget(self.canvas, stretch=1)
+        self.setLayout(layout)
+        self.compute_button.clicked.connect(compute_spectrum)
+        self.mode.currentIndexChanged.connect(lambda index: self.plot_spectra())
+
+    def show_spectra(self, spectra, col_units=None):
+        """
+        Draws the given spectra.
+
+        Args:
+            spectra (dict): WelchSpectrum for each column.
+            col_units (dict): Units for each column.
+        """
+        self.spectra = spectra
+        self.col_units = col_units if col_units is not None else {}
+        spectrum = next(iter(spectra.values()), None)
+        if spectrum is not None:
+            self.spectrum_label.setText(f"{spectrum.sample_rate:.4g} Hz sampling, {spectrum.num_segments} segments of {spectrum.nperseg} samples, {spectrum.num_gaps} gaps")
+        self.plot_spectra()
+
+    def plot_spectra(self):
+        "draws the PSDs of all the columns, or the spectrogram of the first, depending on the mode"
+        self.figure.clear()
+        if self.spectra:
+            ax = self.figure.add_subplot(111)
+            if self.mode.currentText() == 'PSD':
+                for col, spectrum in self.spectra.items():
+                    # the DC bin is left out, since the mean of each segment is removed
+                    ax.semilogy(spectrum.frequencies[1:], spectrum.psd[1:], label=col)
+                ax.set_xlabel('frequency (Hz)')
+                units = {self.col_units.get(col, '') for col in self.spectra}
+                ax.set_ylabel(f"PSD ({units.pop()}**2/Hz)" if len(units) == 1 else 'PSD (units**2/Hz)')
+                ax.legend()
+            else:
+                col, spectrum = next(iter(self.spectra.items()))
+                times, frequencies, power = spectrum.spectrogram()
+                if len(times):
+                    dates = Time(times, format='mjd').datetime
+                    mesh = ax.pcolormesh(dates, frequencies[1:], np.log10(power[:, 1:].T), shading='nearest')
+                    self.figure.colorbar(mesh, ax=ax, label=f"log10 PSD of {col}")
+                    self.figure.autofmt_xdate()
+                ax.set_ylabel('frequency (Hz)')
+                ax.set_title(col)
+        self.canvas.draw_idle()
@@ -0,0 +1,70 @@
+"Module for StatisticsPanel class"
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTableWidget, QTableWidgetItem, QAbstractItemView
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+class StatisticsPanel(QWidget):
+
+    """
+    This class creates a panel showing summary statistics of columns: a table with one row
+    per column, and a histogram of the column selected in the table.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stats = {}
+        self.col_units = {}
+        self.table = QTableWidget()
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.itemSelectionChanged.connect(self.on_selection_changed)
+        self.figure = Figure(figsize=(4, 2))
+        self.canvas = FigureCanvas(self.figure)
+        layout = QVBoxLayout()
+        layout.addWidget(self.table, stretch=1)
+        layout.addWidget(self.canvas, stretch=2)
+        self.setLayout(layout)
+
+    def show_statistics(self, stats, col_units=None):
+        """
+        Fills the table with the given statistics, and shows the histogram of the first column
+
+        Args:
+            stats (dict): ColumnStatistics for each column.
+            col_units (dict): Units for each column.
+        """
+        self.stats = stats
+        self.col_units = col_units if col_units is not None else {}
+        summaries = {col: col_stats.summary() for col, col_stats in stats.items()}
+        headers = list(next(iter(summaries.values())).keys()) if summaries else []
+        self.table.clear()
+        self.table.setRowCount(len(summaries))
+        self.table.setColumnCount(len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setVerticalHeaderLabels([f"{col} ({self.col_units.get(col, '')})" for col in summaries])
+        for row, summary in enumerate(summaries.values()):
+            for column, value in enumerate(summary.values()):
+                text = str(value) if isinstance(value, int) else f"{value:.6g}"
+                self.table.setItem(row, column, QTableWidgetItem(text))
+        self.table.resizeColumnsToContents()
+        if summaries:
+            self.table.selectRow(0)
+        self.plot_histogram(next(iter(summaries), None))
+
+    def on_selection_changed(self):
+        "shows the histogram of the column selected in the table"
+        rows = self.table.selectionModel().selectedRows()
+        if rows:
+            self.plot_histogram(list(self.stats)[rows[0].row()])
+
+    def plot_histogram(self, col):
+        "draws the histogram of the given column"
+        self.figure.clear()
+        if col is not None:
+            counts, edges = self.stats[col].histogram()
+            ax = self.figure.add_subplot(111)
+            ax.stairs(counts, edges, fill=True)
+            ax.set_xlabel(f"{col} ({self.col_units.get(col, '')})")
+            ax.set_ylabel('count')
+        self.canvas.draw_idle()
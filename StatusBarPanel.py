@@ -34,3 +34,9 @@ class StatusBarPanel(QStatusBar):
         status_layout.addWidget(self.status_progress, stretch=15)
         status_container.setLayout(status_layout)
         self.addPermanentWidget(status_container, 1)
+
+    def show_status(self, left, center='', progress=0):
+        "sets the text of the left and center sections and the progress bar percentage"
+        self.status_left.setText(left)
+        self.status_center.setText(center)
+        self.status_progress.setValue(progress)
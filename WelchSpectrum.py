@@ -0,0 +1,154 @@
+"Module for WelchSpectrum class"
+
+import numpy as np
+
+# the windows that can be applied to each segment, as functions of the segment length;
+# they are periodic, like scipy.signal.get_window's, which suits spectral analysis
+SPECTRUM_WINDOWS = {
+    'hann': lambda n: np.hanning(n + 1)[:-1],
+    'hamming': lambda n: np.hamming(n + 1)[:-1],
+    'blackman': lambda n: np.blackman(n + 1)[:-1],
+    'bartlett': lambda n: np.bartlett(n + 1)[:-1],
+    'boxcar': np.ones,
+}
+
+
+class WelchSpectrum:
+
+    """
+    A power spectral density estimate, by Welch's method, that is computed as the data
+    streams in a chunk at a time.  The data is cut into overlapping segments, each segment
+    has its mean removed and a window applied, and the periodograms of the segments are
+    averaged.  The segments are transformed in batches with numpy's FFT, so memory use
+    depends on the batch and segment sizes, not on how much data is added.
+
+    Segments never span a gap in the data: a jump in time of more than max_gap samples, or
+    a NaN value, ends the current run of data, and the samples left over at the end of the
+    run are dropped.  The samples left over at the end of a chunk are kept, so that
+    segments can span the boundary between chunks (e.g. between FITS files).
+
+    If spectrogram_seconds is given, the periodograms are also averaged into time bins of
+    that many seconds, by the time of the middle of each segment, to make a spectrogram.
+    """
+
+    def __init__(self, sample_rate, nperseg, overlap=0.5, window='hann', spectrogram_seconds=None, max_gap=1.5, batch_segments=256):
+        if window not in SPECTRUM_WINDOWS:
+            raise ValueError(f"Unknown window: {window}; use one of {', '.join(SPECTRUM_WINDOWS)}")
+        if nperseg < 2:
+            raise ValueError(f"Segments must have at least 2 samples, not {nperseg}")
+        if not 0 <= overlap < 1:
+            raise ValueError(f"The overlap must be at least 0 and less than 1, not {overlap}")
+        self.sample_rate = float(sample_rate)
+        self.nperseg = int(nperseg)
+        self.step = max(1, self.nperseg - int(round(self.nperseg * overlap)))
+        self.window_name = window
+        self.window = SPECTRUM_WINDOWS[window](self.nperseg)
+        # scales the periodograms to a density, in units**2 / Hz
+        self.scale = 1.0 / (self.sample_rate * np.sum(self.window ** 2))
+        self.frequencies = np.fft.rfftfreq(self.nperseg, 1.0 / self.sample_rate)
+        self.spectrogram_seconds = spectrogram_seconds
+        self.max_gap = max_gap
+        self.batch_segments = batch_segments
+        self.num_segments = 0
+        self.num_samples = 0
+        self.num_gaps = 0
+        self._psd_sum = np.zeros(len(self.frequencies))
+        # the samples after the last segment, which may begin the next one; times are in MJD
+        self._tail_times = np.array([])
+        self._tail_values = np.array([])
+        # spectrogram bin index -> [sum of periodograms, number of segments]
+        self._bins = {}
+
+    def __repr__(self):
+        return f"WelchSpectrum(sample_rate={self.sample_rate}, nperseg={self.nperseg}, window={self.window_name}, segments={self.num_segments})"
+
+    @property
+    def psd(self):
+        "the one sided power spectral density at each of the frequencies"
+        if self.num_segments == 0:
+            return np.full(len(self.frequencies), np.nan)
+        return self._psd_sum / self.num_segments
+
+    def add(self, times, values):
+        """
+        Adds a chunk of data, which must follow the data added before it in time.
+
+        Args:
+            times (array_like): The times of the samples, in MJD (e.g. the DMJD column).
+            values (array_like): The values of the samples.
+        """
+        times = np.concatenate([self._tail_times, np.asarray(times, dtype=np.float64)])
+        values = np.concatenate([self._tail_values, np.asarray(values, dtype=np.float64)])
+        self.num_samples += len(values) - len(self._tail_values)
+        if len(values) == 0:
+            return
+        # split the chunk into runs of evenly sampled data at gaps and NaNs
+        good = ~np.isnan(values)
+        seconds = np.diff(times) * 86400.0
+        breaks = (seconds > self.max_gap / self.sample_rate) | (seconds <= 0)
+        breaks |= ~good[1:] | ~good[:-1]
+        starts = np.concatenate([[0], np.flatnonzero(breaks) + 1])
+        ends = np.concatenate([starts[1:], [len(values)]])
+        self.num_gaps += int(np.sum(breaks & good[1:] & good[:-1]))
+        for i, (start, end) in enumerate(zip(starts, ends)):
+            if not good[start]:
+                continue
+            next_start = self._add_run(times[start:end], values[start:end])
+            if i == len(starts) - 1:
+                self._tail_times = times[start + next_start:end].copy()
+                self._tail_values = values[start + next_start:end].copy()
+                return
+        self._tail_times = np.array([])
+        self._tail_values = np.array([])
+
+    def _add_run(self, times, values):
+        """
+        Adds the periodograms of every segment of a run of evenly sampled data, returning
+        the index at which the next segment would start
+        """
+        num_segments = (len(values) - self.nperseg) // self.step + 1 if len(values) >= self.nperseg else 0
+        if num_segments == 0:
+            return 0
+        segments = np.lib.stride_tricks.sliding_window_view(values, self.nperseg)[::self.step][:num_segments]
+        centers = times[np.arange(num_segments) * self.step + self.nperseg // 2]
+        for i in range(0, num_segments, self.batch_segments):
+            batch = segments[i:i + self.batch_segments]
+            batch = (batch - batch.mean(axis=1, keepdims=True)) * self.window
+            power = np.abs(np.fft.rfft(batch, axis=1)) ** 2 * self.scale
+            # fold in the negative frequencies, which aren't there for DC and Nyquist
+            if self.nperseg % 2:
+                power[:, 1:] *= 2
+            else:
+                power[:, 1:-1] *= 2
+            self._psd_sum += power.sum(axis=0)
+            self.num_segments += len(power)
+            if self.spectrogram_seconds:
+                self._add_to_bins(centers[i:i + self.batch_segments], power)
+        return num_segments * self.step
+
+    def _add_to_bins(self, centers, power):
+        "averages the periodograms into spectrogram time bins by the times of their middles"
+        indices = np.floor(centers * 86400.0 / self.spectrogram_seconds).astype(np.int64)
+        for index in np.unique(indices):
+            rows = power[indices == index]
+            entry = self._bins.setdefault(int(index), [np.zeros(len(self.frequencies)), 0])
+            entry[0] += rows.sum(axis=0)
+            entry[1] += len(rows)
+
+    def spectrogram(self):
+        """
+        Returns the spectrogram, with a row of NaNs for each time bin without any segments
+
+        Returns:
+            tuple: (times, frequencies, power), where times are the MJDs of the middles of
+            the time bins, and power is a 2D array with a row per time bin and a column per
+            frequency.
+        """
+        if not self._bins:
+            return np.array([]), self.frequencies, np.zeros((0, len(self.frequencies)))
+        first, last = min(self._bins), max(self._bins)
+        power = np.full((last - first + 1, len(self.frequencies)), np.nan)
+        for index, (total, count) in self._bins.items():
+            power[index - first] = total / count
+        times = (np.arange(first, last + 1) + 0.5) * self.spectrogram_seconds / 86400.0
+        return times, self.frequencies, power
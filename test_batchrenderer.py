@@ -0,0 +1,64 @@
+import unittest
+import os
+import json
+import shutil
+import tempfile
+from datetime import datetime
+from BatchRenderer import BatchRenderer, main, group_overlapping
+
+
+class TestBatchRenderer(unittest.TestCase):
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.aliases = {'Weather2': 'Weather-Weather2-weather2'}
+        self.now = datetime(2025, 7, 7, 21, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_render(self):
+        renderer = BatchRenderer(self.aliases, root_dir='.', output_dir=self.output_dir, max_workers=2)
+        jobs = [
+            {'alias': 'weather2', 'y': ['WINDVEL'], 'y2': ['TEMP_1'], 'hours': 6, 'output': 'wind.png'},
+            {'alias': 'Weather2', 'y': 'TEMP_2', 'y_expr': 'y*10', 'start': '2025-07-07T18:30:00', 'end': '2025-07-07T19:00:00'},
+            {'alias': 'no such alias', 'y': ['A']},
+            {'alias': 'weather2', 'y': ['NOT_A_COLUMN'], 'hours': 6, 'output': 'bad.png'},
+            {'alias': 'weather2', 'y': ['WINDVEL'], 'start': '2025-06-01T00:00:00', 'end': '2025-06-01T06:00:00', 'output': 'old.png'},
+        ]
+        results = renderer.render(jobs, now=self.now)
+        self.assertEqual(len(results), 5)
+        self.assertIsNone(results[0]['error'])
+        self.assertEqual(results[0]['rows'], 3600 + 3600 + 1343)
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, 'wind.png')))
+        self.assertIsNone(results[1]['error'])
+        self.assertEqual(results[1]['rows'], 1800)
+        self.assertEqual(results[1]['output'], 'Weather2_TEMP_2.png')
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, 'Weather2_TEMP_2.png')))
+        # the jobs on the same sampler shared one read
+        self.assertEqual(results[0]['read_seconds'], results[1]['read_seconds'])
+        self.assertGreater(results[0]['render_seconds'], 0.0)
+        self.assertIn('Unknown alias', results[2]['error'])
+        self.assertIsNotNone(results[3]['error'])
+        # a job long before the others is read on its own, not with the files in between
+        self.assertIn('No FITS files', results[4]['error'])
+
+    def test_group_overlapping(self):
+        jobs = [
+            {'start': datetime(2025, 7, 7, 18), 'end': datetime(2025, 7, 7, 19)},
+            {'start': datetime(2025, 7, 1, 0), 'end': datetime(2025, 7, 1, 6)},
+            {'start': datetime(2025, 7, 7, 19), 'end': datetime(2025, 7, 7, 21)},
+            {'start': datetime(2025, 7, 7, 17), 'end': datetime(2025, 7, 7, 18, 30)},
+        ]
+        self.assertEqual(group_overlapping(jobs), [[1], [3, 0, 2]])
+        self.assertEqual(group_overlapping([]), [])
+
+    def test_main(self):
+        jobs_file = os.path.join(self.output_dir, 'jobs.json')
+        with open(jobs_file, 'w') as f:
+            json.dump([{'directory': 'Weather-Weather2-weather2', 'y': ['WINDVEL'], 'start': '2025-07-07T18:00:00', 'end': '2025-07-07T19:00:00', 'output': 'main.png'}], f)
+        self.assertEqual(main([jobs_file, '--output-dir', self.output_dir, '--workers', '1']), 0)
+        self.assertTrue(os.path.isfile(os.path.join(self.output_dir, 'main.png')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import numpy as np
+from BlockCache import BlockCache
+
+
+class TestBlockCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        cache = BlockCache(max_bytes=3 * 800)
+        for key in 'abc':
+            cache.put(key, np.zeros(100))
+        self.assertEqual(cache.nbytes, 2400)
+        # using 'a' makes 'b' the least recently used
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', np.zeros(100))
+        self.assertNotIn('b', cache)
+        self.assertIn('a', cache)
+        self.assertEqual(len(cache), 3)
+        self.assertEqual(cache.nbytes, 2400)
+
+    def test_replace_and_too_big(self):
+        cache = BlockCache(max_bytes=1000)
+        cache.put('a', np.zeros(10))
+        cache.put('a', np.zeros(20))
+        self.assertEqual(cache.nbytes, 160)
+        cache.put('big', np.zeros(1000))
+        self.assertNotIn('big', cache)
+        self.assertIsNone(cache.get('big'))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.nbytes, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
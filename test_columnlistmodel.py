@@ -0,0 +1,23 @@
+import unittest
+from PySide6.QtCore import Qt
+from ColumnListModel import ColumnListModel
+
+
+class TestColumnListModel(unittest.TestCase):
+    def test_set_columns(self):
+        model = ColumnListModel()
+        self.assertEqual(model.rowCount(), 0)
+        model.set_columns(['DMJD', 'WINDVEL'], ['d', 'MetersPerSec'])
+        self.assertEqual(model.rowCount(), 2)
+        self.assertEqual(model.index(1).data(), 'WINDVEL (MetersPerSec)')
+        self.assertEqual(model.index(1).data(Qt.UserRole), 'WINDVEL')
+        self.assertIsNone(model.index(5).data())
+        self.assertEqual(model.row_of('WINDVEL'), 1)
+        self.assertEqual(model.row_of('missing'), -1)
+        # units are optional
+        model.set_columns(['A'])
+        self.assertEqual(model.index(0).data(), 'A ()')
+
+
+if __name__ == '__main__':
+    unittest.main()
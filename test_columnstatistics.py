@@ -0,0 +1,70 @@
+import unittest
+import numpy as np
+from ColumnStatistics import ColumnStatistics
+
+
+class TestColumnStatistics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.values = rng.normal(1.0e6, 3.0, size=200000)
+
+    def test_moments(self):
+        stats = ColumnStatistics()
+        for chunk in np.array_split(self.values, 37):
+            stats.add(chunk)
+        self.assertEqual(stats.count, len(self.values))
+        self.assertAlmostEqual(stats.mean, self.values.mean(), places=6)
+        self.assertAlmostEqual(stats.std, self.values.std(), places=6)
+        self.assertEqual(stats.min, self.values.min())
+        self.assertEqual(stats.max, self.values.max())
+
+    def test_merge(self):
+        chunks = np.array_split(self.values, 8)
+        partials = []
+        for chunk in chunks:
+            partial = ColumnStatistics()
+            partial.add(chunk)
+            partials.append(partial)
+        merged = ColumnStatistics()
+        for partial in reversed(partials):
+            merged.merge(partial)
+        self.assertEqual(merged.count, len(self.values))
+        self.assertAlmostEqual(merged.mean, self.values.mean(), places=6)
+        self.assertAlmostEqual(merged.variance, self.values.var(), places=4)
+        # merging doesn't change the partial results, so they can be cached
+        self.assertEqual(partials[0].count, len(chunks[0]))
+
+    def test_quantiles_and_histogram(self):
+        stats = ColumnStatistics()
+        for chunk in np.array_split(self.values, 10):
+            stats.add(chunk)
+        qs = np.array([0.0, 0.01, 0.25, 0.5, 0.75, 0.99, 1.0])
+        approx = stats.quantile(qs)
+        exact = np.quantile(self.values, qs)
+        # rank error of the sketch should be around a percent
+        ranks = np.searchsorted(np.sort(self.values), approx) / len(self.values)
+        np.testing.assert_allclose(ranks, qs, atol=0.02)
+        self.assertEqual(approx[0], exact[0])
+        self.assertEqual(approx[-1], exact[-1])
+        self.assertIsInstance(stats.quantile(0.5), float)
+        counts, edges = stats.histogram(bins=20)
+        self.assertEqual(len(counts), 20)
+        self.assertAlmostEqual(counts.sum(), len(self.values))
+        exact_counts, _ = np.histogram(self.values, bins=edges)
+        np.testing.assert_allclose(counts, exact_counts, atol=0.02 * len(self.values))
+
+    def test_nans_and_empty(self):
+        stats = ColumnStatistics()
+        stats.add(np.array([np.nan, 1.0, 2.0, np.nan]))
+        self.assertEqual(stats.count, 2)
+        self.assertEqual(stats.nan_count, 2)
+        self.assertEqual(stats.mean, 1.5)
+        empty = ColumnStatistics()
+        summary = empty.summary()
+        self.assertEqual(summary['count'], 0)
+        self.assertTrue(np.isnan(summary['mean']))
+        self.assertTrue(np.isnan(summary['p50']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import unittest
+import numpy as np
+from CompactSeries import CompactSeries, choose_time_format
+
+
+class TestCompactSeries(unittest.TestCase):
+    def setUp(self):
+        # a day of 50 Hz data, with the DMJD of each row as sampler2log writes it
+        self.epoch = 60863.0
+        self.dmjd = self.epoch + np.arange(50 * 86400) / 50.0 / 86400.0
+        self.values = np.random.default_rng(1).normal(size=len(self.dmjd)).astype(np.float32)
+        self.names = ['DMJD', 'WINDVEL']
+
+    def test_round_trip_int32(self):
+        series = CompactSeries.from_columns(self.dmjd, {'WINDVEL': self.values}, self.names, self.epoch)
+        self.assertEqual(series.time_format, 'int32')
+        # exact to half a tick
+        error = np.abs(series.dmjd - self.dmjd) * 86400.0
+        self.assertLessEqual(error.max(), 0.0005 + 1e-6)
+        self.assertIs(series.column('WINDVEL'), self.values)
+        # a third of the memory of the float64 array
+        self.assertEqual(series.nbytes, len(self.dmjd) * 8)
+        self.assertEqual(series.to_array().nbytes, len(self.dmjd) * 16)
+
+    def test_round_trip_float32(self):
+        series = CompactSeries.from_columns(self.dmjd, {'WINDVEL': self.values}, self.names, self.epoch, time_format='float32')
+        self.assertEqual(series.time_format, 'float32')
+        error = np.abs(series.dmjd - self.dmjd) * 86400.0
+        self.assertLessEqual(error.max(), 0.004)
+        # the times still increase
+        self.assertTrue(np.all(np.diff(series.dmjd) > 0))
+
+    def test_indexing(self):
+        series = CompactSeries.from_columns(self.dmjd[:100], {'WINDVEL': self.values[:100]}, ['WINDVEL', 'DMJD'], self.epoch)
+        self.assertEqual(series.shape, (100, 2))
+        array = series.to_array()
+        np.testing.assert_array_equal(series[:, 0], self.values[:100])
+        np.testing.assert_array_equal(series[:, 1], array[:, 1])
+        selected = series[np.array([0, 5, 99])]
+        self.assertIsInstance(selected, CompactSeries)
+        np.testing.assert_array_equal(selected.to_array(), array[[0, 5, 99]])
+        np.testing.assert_array_equal(series[series[:, 0] > 0].to_array(), array[array[:, 0] > 0])
+
+    def test_concatenate(self):
+        first = CompactSeries.from_columns(self.dmjd[:10], {'WINDVEL': self.values[:10]}, self.names, self.epoch)
+        second = CompactSeries.from_columns(self.dmjd[10:30], {'WINDVEL': self.values[10:30]}, self.names, self.epoch)
+        joined = CompactSeries.concatenate([first, second])
+        self.assertEqual(len(joined), 30)
+        np.testing.assert_array_equal(joined.to_array(), np.concatenate([first.to_array(), second.to_array()]))
+        other = CompactSeries.from_columns(self.dmjd[:10], {'WINDVEL': self.values[:10]}, self.names, self.epoch + 1)
+        with self.assertRaises(ValueError):
+            CompactSeries.concatenate([first, other])
+
+    def test_save_load(self):
+        series = CompactSeries.from_columns(self.dmjd[:1000], {'WINDVEL': self.values[:1000]}, self.names, self.epoch)
+        f = io.BytesIO()
+        series.save(f)
+        f.seek(0)
+        loaded = CompactSeries.load(f)
+        self.assertEqual(loaded.names, self.names)
+        self.assertEqual(loaded.column('WINDVEL').dtype, np.float32)
+        np.testing.assert_array_equal(loaded.to_array(), series.to_array())
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            CompactSeries.from_columns(self.dmjd[:10], {}, ['DMJD'], self.epoch, time_format='int16')
+        # int32 milliseconds reach about 24 days from the epoch
+        with self.assertRaises(ValueError):
+            CompactSeries.from_columns(self.dmjd[:10] + 30, {}, ['DMJD'], self.epoch)
+
+    def test_choose_time_format(self):
+        day = 86400.0
+        self.assertEqual(choose_time_format('int32', 24 * day), 'int32')
+        self.assertEqual(choose_time_format('int32', 30 * day), 'float32')
+        self.assertEqual(choose_time_format('int32', 30 * day, step_seconds=1.0), 'float32')
+        # float32 seconds can't tell 50 Hz samples apart for long
+        self.assertEqual(choose_time_format('float32', day, step_seconds=0.02), 'float32')
+        self.assertIsNone(choose_time_format('float32', 3 * day, step_seconds=0.02))
+        self.assertIsNone(choose_time_format('int32', 30 * day, step_seconds=0.02))
+        with self.assertRaises(ValueError):
+            choose_time_format('int16', day)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from astropy.io import fits
+import numpy as np
+from SamplerData import SamplerData
+from DashboardFeed import DashboardFeed, refresh_feeds
+
+
+class TestDashboardFeed(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.sampler = SamplerData(self.test_dir)
+        self.start = datetime(2025, 7, 7, 10, 0, 0)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def write_file(self, file_start, seconds, step=10):
+        "writes (or rewrites) a file with a row every step seconds, with A the seconds since self.start"
+        # the rows are clear of the bucket edges
+        offsets = np.arange(step / 2, seconds, step, dtype=float)
+        start_offset = (file_start - self.start).total_seconds()
+        dmjd = self.sampler.datetime_to_mjd(file_start) + offsets / 86400.0
+        cols = fits.ColDefs([
+            fits.Column(name='DMJD', array=dmjd, format='D'),
+            fits.Column(name='A', array=start_offset + offsets, format='E', unit='Seconds'),
+        ])
+        file_path = os.path.join(self.test_dir, file_start.strftime('%Y_%m_%d_%H:%M:%S.fits'))
+        fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(file_path, overwrite=True)
+        return file_path
+
+    def test_load_and_refresh(self):
+        self.write_file(self.start, 3600)
+        second = self.start + timedelta(hours=1)
+        self.write_file(second, 1200)
+        # the window ends half way through a one minute bucket
+        now = second + timedelta(minutes=20, seconds=30)
+        feed = DashboardFeed('test', self.sampler, ['A'], hours=2, points=120)
+        self.assertEqual(feed.load(now), 360 + 120)
+        self.assertEqual(feed.units['A'], 'Seconds')
+        mjd, means = feed.series()
+        self.assertEqual(len(mjd), 80)
+        # each one minute bucket averages the six rows in it
+        np.testing.assert_allclose(means[:, 0], np.arange(80) * 60 + 30)
+
+        # the youngest file grows by 10 minutes, and only the new rows are read
+        last_file = self.write_file(second, 1800)
+        now = second + timedelta(minutes=30, seconds=30)
+        self.assertEqual(feed.refresh(now), 60)
+        self.assertEqual(feed.last_file, last_file)
+        self.assertEqual(feed.rows_read, 180)
+        fresh = DashboardFeed('test', self.sampler, ['A'], hours=2, points=120)
+        fresh.load(now)
+        for incremental, full in zip(feed.series(), fresh.series()):
+            np.testing.assert_allclose(incremental, full)
+
+        # a new file is started, and the window slides past the start of the first
+        self.write_file(second, 3600)
+        third = self.write_file(second + timedelta(hours=1), 1800)
+        now = second + timedelta(hours=1, minutes=30, seconds=30)
+        self.assertEqual(refresh_feeds([feed], now), [180 + 180])
+        self.assertEqual(feed.last_file, third)
+        mjd, means = feed.series()
+        self.assertEqual(len(mjd), 119)
+        self.assertAlmostEqual(means[0, 0], 31 * 60 + 30)
+        self.assertAlmostEqual(means[-1, 0], 149 * 60 + 30)
+
+    def test_overlapping_files(self):
+        self.write_file(self.start, 3600)
+        # the second file repeats the last row of the first
+        second = self.write_file(self.start + timedelta(seconds=3590), 1210)
+        now = self.start + timedelta(hours=1, minutes=20)
+        feed = DashboardFeed('test', self.sampler, ['A'], hours=2, points=120)
+        feed.load(now)
+        mjd, means = feed.series()
+        self.assertEqual(len(mjd), 80)
+        np.testing.assert_allclose(means[:, 0], np.arange(80) * 60 + 30)
+        self.assertEqual(feed.counts.sum(), 360 + 120)
+        # rows appended to the youngest file are still added
+        self.write_file(self.start + timedelta(seconds=3590), 1810)
+        self.assertEqual(feed.refresh(now + timedelta(minutes=10)), 60)
+        self.assertEqual(feed.last_file, second)
+        self.assertEqual(feed.counts.sum(), 360 + 180)
+
+    def test_empty(self):
+        feed = DashboardFeed('test', self.sampler, ['A'], hours=1, points=60)
+        self.assertEqual(feed.load(self.start), 0)
+        mjd, means = feed.series()
+        self.assertEqual(len(mjd), 0)
+        self.assertEqual(feed.refresh(self.start), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
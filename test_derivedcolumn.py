@@ -0,0 +1,57 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from DerivedColumn import DerivedColumn
+from LogViewConfig import load_derived_columns, derived_columns_for
+
+
+class TestDerivedColumn(unittest.TestCase):
+    def test_inputs(self):
+        derived = DerivedColumn('WIND_U', 'WINDVEL * sin(radians(WINDDIR)) + 0 * WINDVEL', 'MetersPerSec')
+        self.assertEqual(derived.inputs, ['WINDVEL', 'WINDDIR'])
+        self.assertEqual(derived.key, 'WIND_U=WINDVEL * sin(radians(WINDDIR)) + 0 * WINDVEL')
+
+    def test_evaluate(self):
+        arrays = {'A': np.array([1.0, 2.0, 3.0], dtype=np.float32), 'B': np.array([3.0, 4.0, 5.0])}
+        np.testing.assert_array_equal(DerivedColumn('D', 'A - B').evaluate(arrays), [-2.0, -2.0, -2.0])
+        np.testing.assert_array_equal(DerivedColumn('M', '(A + B) / 2').evaluate(arrays), [2.0, 3.0, 4.0])
+        # scalar results are spread over every row
+        np.testing.assert_array_equal(DerivedColumn('N', 'np.mean(A)').evaluate(arrays), [2.0, 2.0, 2.0])
+
+    def test_parse(self):
+        derived = DerivedColumn.parse('TEMP_DIFF', ' TEMP_1 - TEMP_2 [Celsius] ')
+        self.assertEqual((derived.formula, derived.units), ('TEMP_1 - TEMP_2', 'Celsius'))
+        self.assertEqual(DerivedColumn.parse('P', '(PRESSURE_1 + PRESSURE_2) / 2').units, '')
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            DerivedColumn('TEMP DIFF', 'TEMP_1 - TEMP_2')
+        with self.assertRaises(ValueError):
+            DerivedColumn('D', 'TEMP_1 -')
+        with self.assertRaises(ValueError):
+            DerivedColumn('D', 'pi * 2')
+        with self.assertRaises(ValueError):
+            DerivedColumn('D', 'D + 1')
+
+    def test_load_derived_columns(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(test_dir, 'sparrow.conf')
+            with open(filename, 'w') as f:
+                f.write('[Logs]\nweather2 = Weather-Weather2-weather2\n\n')
+                f.write('[Derived]\nTEMP_DIFF = TEMP_1 - TEMP_2 [Celsius]\nBAD = TEMP_1 +\n\n')
+                f.write('[Derived:Weather2]\nTEMP_DIFF = TEMP_2 - TEMP_1 [Celsius]\nP_MEAN = (PRESSURE_1 + PRESSURE_2) / 2 [MilliBars]\n')
+            derived_columns = load_derived_columns(filename)
+            self.assertEqual([d.name for d in derived_columns[None]], ['TEMP_DIFF'])
+            self.assertEqual([d.formula for d in derived_columns_for(derived_columns)], ['TEMP_1 - TEMP_2'])
+            # the alias's own definitions override those for every sampler
+            columns = derived_columns_for(derived_columns, 'weather2')
+            self.assertEqual([(d.name, d.formula) for d in columns], [('TEMP_DIFF', 'TEMP_2 - TEMP_1'), ('P_MEAN', '(PRESSURE_1 + PRESSURE_2) / 2')])
+        finally:
+            shutil.rmtree(test_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+import numpy as np
+from PeriodOverlay import PeriodOverlay, fold_times
+
+
+class TestPeriodOverlay(unittest.TestCase):
+    def test_fold_times(self):
+        periods, phases = fold_times([60000.25, 60001.5, 59999.75], 60000.0, 1.0)
+        np.testing.assert_array_equal(periods, [0, 1, -1])
+        np.testing.assert_allclose(phases, [21600.0, 43200.0, 64800.0])
+
+    def test_series_and_band(self):
+        # a sample a minute for 4 days from midnight, overlaying 06:00-12:00 of the last 3
+        times = 60000.0 + np.arange(4 * 1440) / 1440.0
+        values = np.column_stack([np.floor(times - 60000.0) * 100 + (times % 1.0) * 24])
+        overlay = PeriodOverlay(['A'], 60001.25, period_days=1.0, num_periods=3, window_days=0.25)
+        # chunks may come in any order, and repeat samples
+        overlay.add(times[3240:], values[3240:])
+        overlay.add(times[:3241], values[:3241])
+        self.assertEqual(overlay.num_samples, 3 * 361 + 1)
+        series = overlay.series()
+        self.assertEqual([period for period, _, _ in series], [0, 1, 2])
+        for period, phases, period_values in series:
+            self.assertEqual(len(phases), 361)
+            self.assertEqual(phases[0], 0.0)
+            self.assertAlmostEqual(phases[-1], 21600.0, places=3)
+            np.testing.assert_allclose(period_values[:, 0], (period + 1) * 100 + 6 + phases / 3600.0, atol=1e-6)
+        self.assertAlmostEqual(overlay.period_start(2), 60003.25)
+        centres, band = overlay.band(bins=6, percentiles=(0, 50, 100))
+        np.testing.assert_allclose(centres, np.arange(6) * 3600.0 + 1800.0)
+        self.assertEqual(band.shape, (3, 6))
+        np.testing.assert_allclose(band[:, 0], [106.5, 206.5, 306.5], atol=0.02)
+
+    def test_empty(self):
+        overlay = PeriodOverlay(['A', 'B'], 60000.0, period_days=7.0, num_periods=2)
+        overlay.add(np.array([59990.0]), np.array([[1.0, 2.0]]))
+        self.assertEqual(overlay.series(), [])
+        centres, band = overlay.band(column=1, bins=4)
+        self.assertTrue(np.isnan(band).all())
+        with self.assertRaises(ValueError):
+            PeriodOverlay(['A'], 60000.0, period_days=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
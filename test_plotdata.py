@@ -0,0 +1,83 @@
+import unittest
+import numpy as np
+from PlotData import PlotData, decimate_indices, insert_gap_breaks
+
+
+class TestPlotData(unittest.TestCase):
+    def test_decimate_indices_small(self):
+        y = np.arange(10.0)
+        np.testing.assert_array_equal(decimate_indices([y], 100), np.arange(10))
+
+    def test_decimate_indices_keeps_extremes(self):
+        rng = np.random.default_rng(1)
+        y = rng.normal(size=100000)
+        y[12345] = 50.0
+        y[54321] = -50.0
+        y2 = rng.normal(size=100000)
+        indices = decimate_indices([y, y2], 1000)
+        self.assertLessEqual(len(indices), 2 * 1000 + 2)
+        self.assertIn(12345, indices)
+        self.assertIn(54321, indices)
+        self.assertIn(int(np.argmax(y2)), indices)
+        self.assertEqual(indices[0], 0)
+        self.assertEqual(indices[-1], len(y) - 1)
+        self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_decimate_indices_nans(self):
+        y = np.full(1000, np.nan)
+        y[500] = 1.0
+        indices = decimate_indices([y], 10)
+        self.assertIn(500, indices)
+
+    def test_insert_gap_breaks(self):
+        x = np.concatenate([np.arange(10.0), np.arange(20.0, 30.0)])
+        y = x * 2
+        gaps = np.array([[-5.0, 0.0], [9.0, 20.0], [3.0, 3.5]])
+        broken, (broken_y,) = insert_gap_breaks(x, [y], gaps)
+        # only the long gap inside the data gets a break
+        self.assertEqual(len(broken), 21)
+        self.assertEqual(broken[10], 14.5)
+        self.assertTrue(np.isnan(broken_y[10]))
+        np.testing.assert_array_equal(np.delete(broken_y, 10), y)
+        same, _ = insert_gap_breaks(x, [y], np.empty((0, 2)))
+        self.assertIs(same, x)
+
+    def test_plotted_arrays_gaps(self):
+        x = np.concatenate([np.arange(10.0), np.arange(20.0, 30.0)])
+        plot_data = PlotData(x, [x * 2], 'DMJD', ['A'], None, 'test', {}, date_plot=True)
+        plot_data.gaps = np.array([[9.0, 20.0]])
+        broken, (y,), _ = plot_data.plotted_arrays()
+        self.assertEqual(len(broken), 21)
+        self.assertTrue(np.isnan(y[10]))
+        whole, (y,), _ = plot_data.plotted_arrays(break_gaps=False)
+        np.testing.assert_array_equal(whole, x)
+
+    def test_plotted_arrays_gaps_x_expression(self):
+        class Sampler:
+            sampler_name = 'test'
+            def apply_expression_to_data(self, data, expression):
+                return eval(expression, {"np": np}, {"data": data})
+        dmjd = np.concatenate([np.arange(10.0), np.arange(20.0, 30.0)])
+        data = np.column_stack([dmjd, dmjd * 2])
+        # the gaps, in DMJDs, are mapped through the x expression like the x column
+        for x_expr, middle in [('x+0', 14.5), ('x*24', 348.0)]:
+            plot_data = PlotData.from_data(Sampler(), data, 'DMJD', ['A'], [], x_expr, 'y*1', 'y2*1', {})
+            plot_data.gaps = np.array([[9.0, 20.0]])
+            broken, (y,), _ = plot_data.plotted_arrays()
+            self.assertEqual(len(broken), 21)
+            self.assertEqual(broken[10], middle)
+            self.assertTrue(np.isnan(y[10]))
+
+    def test_plot_and_update_data(self):
+        x = np.linspace(60863.0, 60864.0, 20000)
+        y = np.sin(x * 100)
+        plot_data = PlotData(x, [y], 'DMJD', ['A'], None, 'test', {'A': 'u'}, date_plot=True, max_points=500)
+        fig, ax = plot_data.plot_data()
+        self.assertEqual(len(plot_data.lines), 1)
+        self.assertLessEqual(len(plot_data.lines[0].get_xdata()), 502)
+        plot_data.update_data(x[:100], [y[:100]])
+        self.assertEqual(len(plot_data.lines[0].get_ydata()), 100)
+
+
+if __name__ == '__main__':
+    unittest.main()
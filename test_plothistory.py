@@ -0,0 +1,71 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from PlotHistory import PlotHistory
+
+
+class TestPlotHistory(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def add(self, history, i):
+        arrays = {'x': np.arange(100.0) + i, 'y': np.ones((2, 100)) * i, 'y2': np.array([])}
+        return history.add({'start': i}, {'y_cols': ['A', 'B']}, arrays, b'png %d' % i, [('f.fits', i, 0.0)])
+
+    def test_back_and_forward(self):
+        history = PlotHistory(max_entries=3)
+        self.assertIsNone(history.current)
+        self.assertIsNone(history.back())
+        for i in range(4):
+            self.add(history, i)
+        # the oldest entry was dropped
+        self.assertEqual([e['query']['start'] for e in history.entries], [1, 2, 3])
+        self.assertFalse(history.can_go_forward())
+        self.assertEqual(history.back()['query']['start'], 2)
+        self.assertEqual(history.back()['query']['start'], 1)
+        self.assertFalse(history.can_go_back())
+        self.assertEqual(history.forward()['query']['start'], 2)
+        # a new plot replaces the entries that could have been gone forward to
+        self.add(history, 4)
+        self.assertEqual([e['query']['start'] for e in history.entries], [1, 2, 4])
+        self.assertIs(history.current, history.entries[-1])
+
+    def test_spill_to_disk(self):
+        history = PlotHistory(self.cache_dir, max_bytes=3000)
+        for i in range(4):
+            self.add(history, i)
+        # only the current entry fits in memory, the rest are on disk
+        self.assertEqual([e['arrays'] is None for e in history.entries], [True, True, True, False])
+        self.assertLessEqual(history.memory_bytes(), 3000)
+        self.assertEqual(len(os.listdir(history.spill_dir)), 3 * 3)
+        entry = history.back()
+        np.testing.assert_array_equal(entry['arrays']['x'], np.arange(100.0) + 2)
+        np.testing.assert_array_equal(entry['arrays']['y'], np.ones((2, 100)) * 2)
+        self.assertEqual(entry['image'], b'png 2')
+        # the entry that was current moved to disk in its place
+        self.assertIsNone(history.entries[3]['arrays'])
+        self.assertEqual(len(os.listdir(history.spill_dir)), 3 * 3)
+        history.update(entry, entry['plot'], entry['arrays'], b'new', [('f.fits', 5, 1.0)])
+        self.assertEqual(history.current['fingerprints'], [('f.fits', 5, 1.0)])
+        # dropping the forward entry removes its files
+        self.add(history, 5)
+        self.assertEqual(len(history.entries), 4)
+        self.assertEqual(len(os.listdir(history.spill_dir)), 3 * 3)
+
+    def test_without_cache_dir(self):
+        history = PlotHistory(max_bytes=3000)
+        for i in range(2):
+            self.add(history, i)
+        # the data of the older entry was dropped, leaving the query to be run again
+        entry = history.back()
+        self.assertIsNone(entry['arrays'])
+        self.assertEqual(entry['query']['start'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import shutil
+import tempfile
+from ReadAhead import ReadAhead
+
+
+class TestReadAhead(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.files = []
+        for i in range(5):
+            file_path = os.path.join(self.test_dir, f"{i}.fits")
+            with open(file_path, 'wb') as f:
+                f.write(bytes([i]) * 1000 * (i + 1))
+            self.files.append(file_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_read_in_order(self):
+        read_ahead = ReadAhead(self.files, depth=2, chunk_bytes=256)
+        for i, file_path in enumerate(self.files):
+            self.assertEqual(read_ahead.get(file_path).read(), bytes([i]) * 1000 * (i + 1))
+        read_ahead.close()
+        stats = read_ahead.stats()
+        self.assertEqual(stats['files'], 5)
+        self.assertEqual(stats['bytes'], 15000)
+        self.assertGreaterEqual(stats['io_seconds'], 0.0)
+        self.assertIsNone(read_ahead.get('not read ahead'))
+
+    def test_depth_and_memory_cap(self):
+        read_ahead = ReadAhead(self.files, depth=2)
+        read_ahead.get(self.files[0])
+        # the reader stops two files ahead of the one taken
+        with read_ahead._condition:
+            read_ahead._condition.wait_for(lambda: len(read_ahead._ready) == 2, timeout=5)
+        self.assertEqual(sorted(read_ahead._ready), self.files[1:3])
+        read_ahead.close()
+        # with a cap smaller than a file, files are read one at a time
+        read_ahead = ReadAhead(self.files, depth=4, max_bytes=100)
+        with read_ahead._condition:
+            read_ahead._condition.wait_for(lambda: read_ahead._ready, timeout=5)
+        self.assertEqual(list(read_ahead._ready), self.files[:1])
+        # skipping a file drops it, making room for the next
+        self.assertIsNotNone(read_ahead.get(self.files[2]))
+        self.assertEqual(read_ahead._ready_bytes, sum(len(d) for d in read_ahead._ready.values()))
+        read_ahead.close()
+        self.assertFalse(read_ahead._thread.is_alive())
+
+    def test_missing_file(self):
+        read_ahead = ReadAhead([os.path.join(self.test_dir, 'missing.fits')] + self.files[:1])
+        self.assertIsNone(read_ahead.get(os.path.join(self.test_dir, 'missing.fits')))
+        self.assertIsNotNone(read_ahead.get(self.files[0]))
+        read_ahead.close()
+        self.assertFalse(read_ahead._thread.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
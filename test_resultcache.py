@@ -0,0 +1,60 @@
+import unittest
+import os
+import shutil
+import tempfile
+import numpy as np
+from ResultCache import ResultCache
+from CompactSeries import CompactSeries
+
+
+class TestResultCache(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def test_round_trip(self):
+        cache = ResultCache(self.cache_dir)
+        key = cache.make_key('dir', ['DMJD', 'A'], 1.0, 2.0, [('f.fits', 10, 3.5)], None)
+        self.assertEqual(key, cache.make_key('dir', ['DMJD', 'A'], 1.0, 2.0, [('f.fits', 10, 3.5)], None))
+        self.assertNotEqual(key, cache.make_key('dir', ['DMJD', 'A'], 1.0, 2.0, [('f.fits', 11, 3.5)], None))
+        self.assertIsNone(cache.get(key))
+        data = np.arange(12.0).reshape(6, 2)
+        cache.put(key, data)
+        cached = cache.get(key)
+        self.assertIsInstance(cached.base, np.memmap)
+        np.testing.assert_array_equal(cached, data)
+        # each column is contiguous on disk
+        self.assertTrue(cached[:, 1].flags['C_CONTIGUOUS'])
+
+    def test_compact_round_trip(self):
+        cache = ResultCache(self.cache_dir)
+        dmjd = 60863.0 + np.arange(6) / 86400.0
+        series = CompactSeries.from_columns(dmjd, {'A': np.arange(6, dtype=np.float32)}, ['DMJD', 'A'], 60863.0)
+        cache.put('compact', series)
+        self.assertTrue(os.path.isfile(cache.path('compact', '.npz')))
+        cached = cache.get('compact')
+        self.assertIsInstance(cached, CompactSeries)
+        self.assertEqual(cached.column('A').dtype, np.float32)
+        np.testing.assert_array_equal(cached.to_array(), series.to_array())
+        self.assertEqual(len(cache.entries()), 1)
+
+    def test_lru_eviction(self):
+        data = np.zeros((100, 2))
+        cache = ResultCache(self.cache_dir, max_bytes=3 * (data.nbytes + 128))
+        for i, key in enumerate('abc'):
+            cache.put(key, data)
+            os.utime(cache.path(key), (i, i))
+        # using 'a' makes 'b' the least recently used
+        self.assertIsNotNone(cache.get('a'))
+        cache.put('d', data)
+        self.assertIsNone(cache.get('b'))
+        for key in 'acd':
+            self.assertIsNotNone(cache.get(key))
+        cache.clear()
+        self.assertEqual(cache.entries(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,7 +5,10 @@ import shutil
 from datetime import datetime, timedelta
 from astropy.io import fits
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from SamplerData import SamplerData
+from ResultCache import ResultCache
+from DerivedColumn import DerivedColumn
 import pytest
 
 class TestSamplerData(unittest.TestCase):
@@ -81,6 +84,585 @@ class TestSamplerData(unittest.TestCase):
         self.assertEqual(data.shape[1], 3)
         self.assertTrue(np.all(data[:, 0] >= 60000.0))
 
+    def test_get_data_multiple_files(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        data = sampler.get_data(['DMJD', 'WINDVEL'], (start, end))
+        self.assertEqual(data.shape, (3600 + 3600 + 1343, 2))
+        self.assertTrue(np.all(np.diff(data[:, 0]) > 0))
+        blocks = list(sampler.iter_data(['DMJD', 'WINDVEL'], (start, end)))
+        self.assertEqual(len(blocks), 3)
+        np.testing.assert_array_equal(np.concatenate(blocks), data)
+
+    def test_get_data_block_cache(self):
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        first = self.sampler.get_data(['DMJD', 'A'], (start, end))
+        self.assertEqual(len(self.sampler._block_cache), 2)
+        # a narrower range is served from the cache
+        narrow = self.sampler.get_data(['A'], (start, datetime(2025, 7, 7, 17, 56, 9)))
+        np.testing.assert_array_equal(narrow[:, 0], first[:2, 1])
+        # rewriting the file invalidates what was cached for it
+        with fits.open(self.fits_filename, mode='update') as hdul:
+            hdul[1].data['A'] = [10.0, 20.0, 30.0]
+        os.utime(self.fits_filename, (0, 1))
+        again = self.sampler.get_data(['DMJD', 'A'], (start, end))
+        np.testing.assert_array_equal(again[:, 1], [10.0, 20.0, 30.0])
+
+    def test_get_data_result_cache(self):
+        cache = ResultCache(os.path.join(self.test_dir, 'results'))
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        sampler = SamplerData(self.test_dir, result_cache=cache)
+        first = sampler.get_data(['DMJD', 'A'], (start, end))
+        self.assertEqual(len(cache.entries()), 1)
+        # a new sampler, as after a restart, finds the result on disk without opening files
+        opened = []
+        sampler = SamplerData(self.test_dir, result_cache=cache)
+        again = sampler.get_data(['DMJD', 'A'], (start, end), pre_open_hook=lambda *args: opened.append(args))
+        self.assertEqual(opened, [])
+        np.testing.assert_array_equal(again, first)
+        # queries can bypass the cache, e.g. those of the views zoomed through
+        sampler.get_data(['DMJD', 'A'], (start, end - timedelta(hours=1)), pre_open_hook=lambda *args: opened.append(args), use_result_cache=False)
+        self.assertEqual(len(opened), 1)
+        self.assertEqual(len(cache.entries()), 1)
+        opened = []
+        # once the file grows, the cached result is not reused
+        dts = [datetime(2025, 7, 7, 17, 56, 8) + timedelta(seconds=i) for i in range(4)]
+        cols = fits.ColDefs([
+            fits.Column(name='DMJD', array=[self.sampler.datetime_to_mjd(dt) for dt in dts], format='D'),
+            fits.Column(name='A', array=np.array([1.0, 2.0, 3.0, 4.0]), format='D'),
+        ])
+        fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(self.fits_filename, overwrite=True)
+        grown = sampler.get_data(['DMJD', 'A'], (start, end), pre_open_hook=lambda *args: opened.append(args))
+        self.assertEqual(len(opened), 1)
+        np.testing.assert_array_equal(grown[:, 1], [1.0, 2.0, 3.0, 4.0])
+        # a result missing a file that failed to read is returned, but not kept
+        with open(os.path.join(self.test_dir, '2025_07_07_18:56:08.fits'), 'wb') as f:
+            f.write(b'not a FITS file')
+        num_entries = len(cache.entries())
+        failed = []
+        partial = sampler.get_data(['DMJD', 'A'], (start, end))
+        self.assertEqual(len(partial), 4)
+        self.assertEqual(len(cache.entries()), num_entries)
+        list(sampler.iter_data(['DMJD', 'A'], (start, end), failed=failed))
+        self.assertEqual([os.path.basename(f) for f in failed], ['2025_07_07_18:56:08.fits'])
+
+    def test_get_data_compact(self):
+        cache = ResultCache(os.path.join(self.test_dir, 'results'))
+        sampler = SamplerData('Weather-Weather2-weather2', result_cache=cache)
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        cols = ['DMJD', 'WINDVEL', 'TEMP_1']
+        data = sampler.get_data(cols, (start, end))
+        series = sampler.get_data(cols, (start, end), compact='int32')
+        self.assertEqual(series.shape, data.shape)
+        self.assertEqual(series.epoch, sampler.datetime_to_mjd(start))
+        self.assertEqual(series.column('WINDVEL').dtype, np.float32)
+        self.assertLessEqual(np.abs(series[:, 0] - data[:, 0]).max() * 86400.0, 0.0005 + 1e-6)
+        np.testing.assert_array_equal(series.to_array()[:, 1:], data[:, 1:])
+        # a third of the size of the float64 array, as estimated
+        estimate = sampler.estimate_query(cols, (start, end), compact='int32')
+        self.assertEqual(estimate['row_bytes'], 12)
+        self.assertEqual(series.nbytes, estimate['rows'] * estimate['row_bytes'])
+        # the compact result is cached apart from the array
+        self.assertEqual(len(cache.entries()), 2)
+        again = SamplerData('Weather-Weather2-weather2', result_cache=cache).get_data(cols, (start, end), compact='int32')
+        np.testing.assert_array_equal(again.to_array(), series.to_array())
+        empty = sampler.get_data(cols, (datetime(2026, 1, 1), datetime(2026, 1, 2)), compact='float32')
+        self.assertEqual(empty.shape, (0, 3))
+
+    def test_get_data_compact_long_range(self):
+        test_dir = os.path.join(self.test_dir, 'long')
+        os.makedirs(test_dir)
+        start = datetime(2025, 6, 1, 0, 0, 0)
+        # files a day apart for a month, of a sample a second, and of 50 samples a second
+        for rate, name in ((1, 'slow'), (50, 'fast')):
+            os.makedirs(os.path.join(test_dir, name))
+            for day in range(0, 40, 10):
+                file_start = start + timedelta(days=day)
+                dmjd = self.sampler.datetime_to_mjd(file_start) + np.arange(20) / rate / 86400.0
+                cols = fits.ColDefs([fits.Column(name='DMJD', array=dmjd, format='D'), fits.Column(name='A', array=np.arange(20.0), format='E')])
+                fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(test_dir, name, file_start.strftime('%Y_%m_%d_%H:%M:%S.fits')))
+        time_range = (start, start + timedelta(days=31))
+        # int32 ticks can't reach a month from the start, so float32 is used, losing no rows
+        cache = ResultCache(os.path.join(self.test_dir, 'results'))
+        sampler = SamplerData(os.path.join(test_dir, 'slow'), result_cache=cache)
+        series = sampler.get_data(['DMJD', 'A'], time_range, compact='int32')
+        self.assertEqual(series.time_format, 'float32')
+        self.assertEqual(len(series), 80)
+        self.assertEqual(len(list(sampler.iter_data(['DMJD', 'A'], time_range, compact='int32'))), 4)
+        self.assertEqual(sampler.estimate_query(['DMJD', 'A'], time_range, compact='int32')['row_bytes'], 8)
+        # float32 times would blur 50 Hz samples together, so they are kept as float64
+        sampler = SamplerData(os.path.join(test_dir, 'fast'))
+        data = sampler.get_data(['DMJD', 'A'], time_range, compact='int32')
+        self.assertIsInstance(data, np.ndarray)
+        self.assertEqual(data.shape, (80, 2))
+        self.assertTrue(np.all(np.diff(data[:, 0]) > 0))
+
+    def test_get_data_files_before_range(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 18, 30, 0)
+        end = datetime(2025, 7, 7, 18, 40, 0)
+        # the file that holds this range started before it
+        self.assertEqual(len(sampler.get_data(['DMJD'], (start, end))), 0)
+        files = sampler.get_fits_files_from_names(start, end, before=True)
+        data = sampler.get_data(['DMJD'], (start, end), files=files)
+        self.assertEqual(data.shape, (600, 1))
+
+    def test_parse_predicates(self):
+        self.assertEqual(self.sampler.parse_predicates(''), [])
+        self.assertEqual(self.sampler.parse_predicates('WINDVEL > 10 AND HUMIDITY_1>=0.5'), [('WINDVEL', '>', 10.0), ('HUMIDITY_1', '>=', 0.5)])
+        with self.assertRaises(ValueError):
+            self.sampler.parse_predicates('WINDVEL >> 10')
+        with self.assertRaises(ValueError):
+            self.sampler.parse_predicates('WINDVEL > TEMP_1')
+
+    def test_get_data_predicates(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        full = sampler.get_data(['DMJD', 'WINDVEL', 'HUMIDITY_1'], (start, end))
+        threshold = np.median(full[:, 1])
+        expected = full[(full[:, 1] > threshold) & (full[:, 2] <= 50.0)]
+        # the predicate columns need not be returned
+        data = sampler.get_data(['DMJD'], (start, end), predicates=[('WINDVEL', '>', threshold), ('HUMIDITY_1', '<=', 50.0)])
+        np.testing.assert_array_equal(data[:, 0], expected[:, 0])
+        self.assertGreater(len(data), 0)
+        stats = sampler.get_column_statistics(['HUMIDITY_1'], (start, end), predicates=[('WINDVEL', '>', threshold)])
+        self.assertEqual(stats['HUMIDITY_1'].count, np.sum(full[:, 1] > threshold))
+        # filtered statistics are not cached
+        self.assertEqual(len(sampler._stats_cache), 0)
+        # nothing matches
+        data = sampler.get_data(['DMJD'], (start, end), predicates=[('WINDVEL', '<', -1)])
+        self.assertEqual(len(data), 0)
+
+    def test_find_events(self):
+        cache_dir = os.path.join(self.test_dir, 'cache')
+        sampler = SamplerData('Weather-Weather2-weather2', cache_dir=cache_dir)
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        data = sampler.get_data(['DMJD', 'WINDVEL'], (start, end))
+        threshold = 6.0
+        events = sampler.find_events([('WINDVEL', '>', threshold)], (start, end))
+        self.assertGreater(len(events), 0)
+        # every matching row lies in an event, and the rows between events don't match
+        matching = data[data[:, 1] > threshold, 0]
+        in_event = np.zeros(len(matching), dtype=bool)
+        for event_start, event_end in events:
+            self.assertLessEqual(event_start, event_end)
+            in_event |= (matching >= event_start) & (matching <= event_end)
+        self.assertTrue(in_event.all())
+        for (_, end1), (start2, _) in zip(events, events[1:]):
+            between = data[(data[:, 0] > end1) & (data[:, 0] < start2), 1]
+            self.assertTrue(np.any(between <= threshold))
+        # the zone maps are saved in a sidecar, and reloaded by a new sampler
+        self.assertTrue(os.path.isfile(sampler.cache_path('.zonemaps.json')))
+        sampler2 = SamplerData('Weather-Weather2-weather2', cache_dir=cache_dir)
+        self.assertEqual(len(sampler2.load_zone_maps()), 3)
+        # a threshold above the max of every file skips them all without reading data
+        self.assertEqual(sampler2.find_events([('WINDVEL', '>', 100.0)], (start, end)), [])
+        self.assertEqual(len(sampler2._block_cache), 0)
+
+    def test_find_events_across_files(self):
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        # a second file, continuing the first, where the condition holds throughout
+        dt = datetime(2025, 7, 7, 17, 56, 11)
+        dmjd_values = [self.sampler.datetime_to_mjd(dt + timedelta(seconds=i)) for i in range(3)]
+        cols = fits.ColDefs([
+            fits.Column(name='DMJD', array=dmjd_values, format='D'),
+            fits.Column(name='A', array=np.array([4.0, 5.0, 0.0]), format='D'),
+            fits.Column(name='B', array=np.array([3.0, 4.0, 5.0]), format='D'),
+        ])
+        fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(self.test_dir, '2025_07_07_17:56:11.fits'))
+        events = self.sampler.find_events([('A', '>=', 2.0)], (start, end))
+        self.assertEqual(len(events), 1)
+        self.assertAlmostEqual(events[0][0], self.sampler.datetime_to_mjd(datetime(2025, 7, 7, 17, 56, 9)))
+        self.assertAlmostEqual(events[0][1], dmjd_values[1])
+        self.assertEqual(self.sampler.find_events([('A', '==', 2.0)], (start, end)), [(events[0][0], events[0][0])])
+
+    def test_find_events_outage(self):
+        test_dir = os.path.join(self.test_dir, 'outage')
+        os.makedirs(test_dir)
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        # the condition holds throughout two files, with a 10 minute outage between them
+        for file_start in (datetime(2025, 7, 7, 10, 0, 0), datetime(2025, 7, 7, 10, 11, 0)):
+            dmjd_values = [self.sampler.datetime_to_mjd(file_start + timedelta(seconds=i)) for i in range(60)]
+            cols = fits.ColDefs([
+                fits.Column(name='DMJD', array=dmjd_values, format='D'),
+                fits.Column(name='A', array=np.full(60, 5.0), format='D'),
+            ])
+            fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(test_dir, file_start.strftime('%Y_%m_%d_%H:%M:%S.fits')))
+        sampler = SamplerData(test_dir)
+        events = sampler.find_events([('A', '>', 1.0)], (start, end))
+        self.assertEqual(len(events), 2)
+        self.assertAlmostEqual(events[0][1], sampler.datetime_to_mjd(datetime(2025, 7, 7, 10, 0, 59)))
+        self.assertAlmostEqual(events[1][0], sampler.datetime_to_mjd(datetime(2025, 7, 7, 10, 11, 0)))
+
+    def test_find_events_nan(self):
+        test_dir = os.path.join(self.test_dir, 'nan')
+        os.makedirs(test_dir)
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        dmjd_values = [self.sampler.datetime_to_mjd(datetime(2025, 7, 7, 10, 0, i)) for i in range(5)]
+        cols = fits.ColDefs([
+            fits.Column(name='DMJD', array=dmjd_values, format='D'),
+            fits.Column(name='C', array=np.array([1.0, 1.0, np.nan, 1.0, np.nan]), format='D'),
+            fits.Column(name='D', array=np.full(5, np.nan), format='D'),
+        ])
+        fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(test_dir, '2025_07_07_10:00:00.fits'))
+        sampler = SamplerData(test_dir)
+        # NaN rows are != any value, however many of a column's rows are NaN
+        for predicate, expected in [(('C', '!=', 1.0), [2, 4]), (('D', '!=', 0.0), [0, 1, 2, 3, 4]), (('D', '>', 0.0), [])]:
+            data = sampler.get_data(['DMJD'], (start, end), predicates=[predicate])
+            np.testing.assert_array_equal(data[:, 0] if len(data) else [], [dmjd_values[i] for i in expected])
+            events = sampler.find_events([predicate], (start, end))
+            self.assertEqual(sum(len([t for t in dmjd_values if a <= t <= b]) for a, b in events), len(expected))
+        self.assertEqual(len(sampler.find_events([('C', '!=', 1.0)], (start, end))), 2)
+
+    def test_resample(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 18, 0, 0)
+        end = datetime(2025, 7, 7, 20, 30, 0)
+        files = sampler.get_fits_files_from_names(start, end, before=True)
+        data = sampler.get_data(['DMJD', 'WINDVEL', 'TEMP_1'], (start, end), files=files)
+        start_mjd = sampler.datetime_to_mjd(start)
+        buckets = ((data[:, 0] - start_mjd) * 86400.0 / 60.0).astype(int)
+        aggregators = {
+            'mean': np.mean,
+            'min': np.min,
+            'max': np.max,
+            'first': lambda v: v[0],
+            'last': lambda v: v[-1],
+            'count': len,
+        }
+        for aggregator, func in aggregators.items():
+            resampled = sampler.resample(['WINDVEL', 'TEMP_1'], (start, end), 60, aggregator=aggregator, files=files)
+            self.assertEqual(resampled.shape, (150, 3))
+            self.assertAlmostEqual(resampled[1, 0] - resampled[0, 0], 60.0 / 86400.0)
+            for bucket in range(resampled.shape[0]):
+                rows = data[buckets == bucket]
+                if len(rows) == 0:
+                    expected = [0.0, 0.0] if aggregator == 'count' else [np.nan, np.nan]
+                else:
+                    expected = [func(rows[:, 1]), func(rows[:, 2])]
+                np.testing.assert_allclose(resampled[bucket, 1:], expected, err_msg=f"{aggregator} bucket {bucket}")
+        # the bucket spanning the end of one file and the start of the next combines both
+        self.assertGreater(np.sum(sampler.resample(['WINDVEL'], (start, end), 60, aggregator='count', files=files)[:, 1]), 0)
+        with self.assertRaises(ValueError):
+            sampler.resample(['WINDVEL'], (start, end), 60, aggregator='median')
+
+    def test_resample_nans(self):
+        start = datetime(2025, 7, 7, 17, 56, 8)
+        end = datetime(2025, 7, 7, 17, 56, 18)
+        with fits.open(self.fits_filename, mode='update') as hdul:
+            hdul[1].data['A'][1] = np.nan
+        resampled = self.sampler.resample(['A'], (start, end), 5, aggregator='mean')
+        self.assertEqual(resampled.shape, (2, 2))
+        self.assertAlmostEqual(resampled[0, 1], 2.0)
+        self.assertTrue(np.isnan(resampled[1, 1]))
+        counts = self.sampler.resample(['A', 'B'], (start, end), 5, aggregator='count')
+        np.testing.assert_array_equal(counts[:, 1:], [[2, 3], [0, 0]])
+
+    def test_derived_columns(self):
+        derived_columns = [
+            DerivedColumn('TEMP_DIFF', 'TEMP_1 - TEMP_2', 'Celsius'),
+            DerivedColumn('WIND_U', 'WINDVEL * sin(radians(WINDDIR))', 'MetersPerSec'),
+        ]
+        sampler = SamplerData('Weather-Weather2-weather2', derived_columns=derived_columns)
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        cols, units, _ = sampler.find_column_info(start, end)
+        self.assertEqual(cols, self.weatherCols + ['TEMP_DIFF', 'WIND_U'])
+        self.assertEqual(units, self.weatherUnits + ['Celsius', 'MetersPerSec'])
+        raw = sampler.get_data(['DMJD', 'TEMP_1', 'TEMP_2', 'WINDVEL', 'WINDDIR'], (start, end))
+        sampler = SamplerData('Weather-Weather2-weather2', derived_columns=derived_columns)
+        data = sampler.get_data(['DMJD', 'TEMP_DIFF', 'WIND_U'], (start, end), predicates=[('TEMP_DIFF', '>', -100)])
+        np.testing.assert_array_equal(data[:, 0], raw[:, 0])
+        # the formulas are evaluated at the precision of the (4 byte E) inputs
+        np.testing.assert_allclose(data[:, 1], raw[:, 1] - raw[:, 2], rtol=1e-5)
+        np.testing.assert_allclose(data[:, 2], raw[:, 3] * np.sin(np.radians(raw[:, 4])), rtol=1e-5, atol=1e-6)
+        # only the inputs were read, and the derived columns are cached alongside them
+        keys = {key for _, key in sampler._block_cache._blocks}
+        self.assertEqual(keys, {'DMJD', 'TEMP_1', 'TEMP_2', 'WINDVEL', 'WINDDIR', 'TEMP_DIFF=TEMP_1 - TEMP_2', 'WIND_U=WINDVEL * sin(radians(WINDDIR))'})
+        self.assertEqual(len(sampler._block_cache), 3 * len(keys))
+        again = sampler.get_data(['TEMP_DIFF'], (start, end))
+        np.testing.assert_array_equal(again[:, 0], data[:, 1])
+        self.assertEqual(len(sampler._block_cache), 3 * len(keys))
+        # statistics, events and estimates work on derived columns too
+        stats = sampler.get_column_statistics(['TEMP_DIFF'], (start, end))
+        self.assertAlmostEqual(stats['TEMP_DIFF'].mean, data[:, 1].mean(), places=4)
+        events = sampler.find_events([('WIND_U', '>', 1000.0)], (start, end))
+        self.assertEqual(events, [])
+        self.assertEqual(sampler.estimate_query(['TEMP_DIFF'], (start, end))['rows'], len(data))
+        # a file without the inputs has no derived column
+        self.assertIsNone(sampler.read_file_data(self.fits_filename, ['TEMP_DIFF'], -np.inf, np.inf))
+
+    def test_spectrum(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        spectrum = sampler.spectrum('WINDVEL', (start, end), segment_seconds=60, spectrogram_bins=100)
+        self.assertAlmostEqual(spectrum.sample_rate, 1.0, places=3)
+        self.assertEqual(spectrum.nperseg, 60)
+        # the files are streamed as one run, with segments spanning their boundaries
+        self.assertEqual(spectrum.num_samples, 3600 + 3600 + 1343)
+        self.assertEqual(spectrum.num_gaps, 0)
+        self.assertEqual(spectrum.num_segments, (8543 - 60) // 30 + 1)
+        times, frequencies, power = spectrum.spectrogram()
+        self.assertEqual(power.shape, (len(times), 31))
+        self.assertIsNone(sampler.spectrum('WINDVEL', (datetime(2026, 1, 1), datetime(2026, 1, 2))))
+
+    def test_estimate_query(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        estimate = sampler.estimate_query(['DMJD', 'WINDVEL', 'TEMP_1'], (start, end))
+        self.assertEqual(estimate['files'], 3)
+        self.assertEqual(estimate['rows'], 3600 + 3600 + 1343)
+        # DMJD is 8 bytes wide, the others 4
+        self.assertEqual(estimate['read_bytes'], (3600 + 3600 + 1343) * 16)
+        self.assertEqual(estimate['result_bytes'], (3600 + 3600 + 1343) * 3 * 8)
+        self.assertEqual(estimate['max_file_bytes'], 3600 * 3 * 8)
+        # half of a file's span is in range
+        start = datetime(2025, 7, 7, 18, 26, 8)
+        end = datetime(2025, 7, 7, 18, 56, 7)
+        files = sampler.get_fits_files_from_names(start, end, before=True)
+        estimate = sampler.estimate_query(['DMJD'], (start, end), files=files)
+        actual = len(sampler.get_data(['DMJD'], (start, end), files=files))
+        self.assertAlmostEqual(estimate['rows'], actual, delta=5)
+        # columns that aren't there
+        self.assertEqual(sampler.estimate_query(['NOPE'], (start, end), files=files)['rows'], 0)
+        self.assertEqual(sampler.column_width('16X'), 2)
+        self.assertEqual(sampler.column_width('3J'), 12)
+
+    def test_choose_load_strategy(self):
+        estimate = {'files': 10, 'columns': 2, 'rows': 100000, 'result_bytes': 1600000, 'max_file_bytes': 160000}
+        self.assertEqual(self.sampler.choose_load_strategy(estimate, 2000000, 1000), 'full')
+        self.assertEqual(self.sampler.choose_load_strategy(estimate, 1000000, 1000), 'decimate')
+        self.assertEqual(self.sampler.choose_load_strategy(estimate, 100000, 1000), 'summary')
+
+    def test_iter_data_progressive(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        full = sampler.get_data(['DMJD', 'WINDVEL'], (start, end))
+        opened = []
+        def hook(filename, n, m):
+            opened.append((os.path.basename(filename), n, m))
+        steps = list(sampler.iter_data_progressive(['DMJD', 'WINDVEL'], (start, end), pre_open_hook=hook, preview_files=2))
+        # the preview reads the first and last files, the refinement the one in between
+        self.assertEqual([(n, m) for _, n, m in steps], [(2, 3), (3, 3)])
+        self.assertEqual(opened[0][0], '2025_07_07_17:56:08.fits')
+        self.assertEqual(opened[1][0], '2025_07_07_19:56:08.fits')
+        self.assertEqual([n for _, n, _ in opened], [0, 1, 2])
+        preview = steps[0][0]
+        self.assertEqual(preview.shape[0], 3600 + 1343)
+        self.assertTrue(np.all(np.diff(preview[:, 0]) > 0))
+        np.testing.assert_array_equal(steps[-1][0], full)
+        # each file's rows can be reduced as they are read, e.g. decimated
+        steps = list(sampler.iter_data_progressive(['DMJD', 'WINDVEL'], (start, end), preview_files=2, reduce_block=lambda block: np.arange(0, len(block), 10)))
+        self.assertEqual(steps[-1][0].shape[0], sum(len(block[::10]) for block in sampler.iter_data(['DMJD', 'WINDVEL'], (start, end))))
+
+    def test_get_column_statistics(self):
+        sampler = SamplerData('Weather-Weather2-weather2')
+        start = datetime(2025, 7, 7, 0, 0, 0)
+        end = datetime(2025, 7, 8, 0, 0, 0)
+        data = sampler.get_data(['WINDVEL', 'TEMP_1'], (start, end))
+        finished = []
+        stats = sampler.get_column_statistics(['WINDVEL', 'TEMP_1'], (start, end), progress_hook=lambda f, n, m: finished.append(n))
+        self.assertEqual(sorted(finished), [0, 1, 2])
+        for i, col in enumerate(['WINDVEL', 'TEMP_1']):
+            self.assertEqual(stats[col].count, data.shape[0])
+            self.assertAlmostEqual(stats[col].mean, data[:, i].mean(), places=4)
+            self.assertAlmostEqual(stats[col].std, data[:, i].std(), places=4)
+            self.assertEqual(stats[col].max, data[:, i].max())
+        # the whole file results are cached, and reused for a range covering them
+        self.assertEqual(len(sampler._stats_cache), 6)
+        again = sampler.get_column_statistics(['WINDVEL'], (start, end))
+        self.assertEqual(again['WINDVEL'].count, stats['WINDVEL'].count)
+        # a range that cuts a file short doesn't use its cached result
+        mid = datetime(2025, 7, 7, 18, 30, 0)
+        partial = sampler.get_column_statistics(['WINDVEL'], (start, mid))
+        self.assertEqual(partial['WINDVEL'].count, sampler.get_data(['WINDVEL'], (start, mid)).shape[0])
+
+    def test_concurrent_queries(self):
+        # a small block cache, so that the threads keep evicting each other's columns
+        cache_dir = os.path.join(self.test_dir, 'cache')
+        sampler = SamplerData('Weather-Weather2-weather2', cache_bytes=200000, cache_dir=cache_dir)
+        day = datetime(2025, 7, 7, 0, 0, 0)
+        ranges = [(day, day + timedelta(days=1)), (datetime(2025, 7, 7, 18, 30, 0), datetime(2025, 7, 7, 19, 45, 0))]
+        column_sets = [['DMJD', 'WINDVEL'], ['DMJD', 'TEMP_1', 'HUMIDITY_1'], ['WINDVEL', 'PRESSURE_1']]
+        queries = [
+            (lambda s, cols=cols, time_range=time_range: s.get_data(cols, time_range))
+            for cols in column_sets for time_range in ranges
+        ] + [
+            (lambda s, time_range=time_range: s.get_column_statistics(['WINDVEL', 'TEMP_1'], time_range))
+            for time_range in ranges
+        ] + [
+            (lambda s, time_range=time_range: s.find_events([('WINDVEL', '>', 6.0)], time_range))
+            for time_range in ranges
+        ] + [
+            lambda s: s.find_column_info(*ranges[0]),
+            lambda s: s.estimate_query(['WINDVEL'], ranges[0]),
+        ]
+        expected = [query(SamplerData('Weather-Weather2-weather2')) for query in queries]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [(i, executor.submit(queries[i], sampler)) for _ in range(4) for i in range(len(queries))]
+            for i, future in futures:
+                result = future.result()
+                if isinstance(result, np.ndarray):
+                    np.testing.assert_array_equal(result, expected[i])
+                elif isinstance(result, dict) and 'WINDVEL' in result:
+                    for col, stats in result.items():
+                        self.assertEqual(stats.count, expected[i][col].count)
+                        self.assertAlmostEqual(stats.mean, expected[i][col].mean, places=4)
+                else:
+                    self.assertEqual(result, expected[i])
+        # the zone maps written by the threads can be read back
+        self.assertEqual(len(SamplerData('Weather-Weather2-weather2', cache_dir=cache_dir).load_zone_maps()), 3)
+        # queries don't change the sampler
+        self.assertIsNone(sampler.youngest_file)
+        self.assertEqual(sampler.colnames, [])
+
+    def test_read_ahead(self):
+        day = datetime(2025, 7, 7, 0, 0, 0)
+        cols = ['DMJD', 'WINDVEL', 'TEMP_1']
+        expected = SamplerData('Weather-Weather2-weather2').get_data(cols, (day, day + timedelta(days=1)))
+        sampler = SamplerData('Weather-Weather2-weather2', read_ahead=2)
+        stats = {}
+        np.testing.assert_array_equal(np.concatenate(list(sampler.iter_data(cols, (day, day + timedelta(days=1)), read_stats=stats))), expected)
+        self.assertEqual(stats['files'], 3)
+        self.assertEqual(stats['bytes'], sum(os.path.getsize(f) for f in sampler.get_fits_files_from_names(day, day + timedelta(days=1))))
+        self.assertGreater(stats['decode_seconds'], 0.0)
+        # cached files aren't read again
+        np.testing.assert_array_equal(sampler.get_data(cols, (day, day + timedelta(days=1))), expected)
+        stats = {}
+        list(sampler.iter_data(cols, (day, day + timedelta(days=1)), read_stats=stats))
+        self.assertEqual(stats['files'], 0)
+        # stopping part way through stops the reading ahead
+        stats = {}
+        blocks = sampler.iter_data(['DMJD', 'HUMIDITY_1'], (day, day + timedelta(days=1)), read_stats=stats)
+        next(blocks)
+        blocks.close()
+        self.assertLessEqual(stats['files'], 3)
+
+    def test_file_boundaries_and_gaps(self):
+        test_dir = os.path.join(self.test_dir, 'gaps')
+        os.makedirs(test_dir)
+        start = datetime(2025, 7, 7, 10, 0, 0)
+        start_mjd = self.sampler.datetime_to_mjd(start)
+        # the second file repeats the last two samples of the first, and the third starts
+        # after a 10 minute outage; the first also has a 30 s gap
+        seconds = [
+            np.concatenate([np.arange(0, 100), np.arange(130, 3600)]),
+            np.arange(3598, 7200),
+            np.arange(7800, 9000),
+        ]
+        for offsets in seconds:
+            file_start = start + timedelta(seconds=int(offsets[0]))
+            cols = fits.ColDefs([
+                fits.Column(name='DMJD', array=start_mjd + offsets / 86400.0, format='D'),
+                fits.Column(name='A', array=offsets.astype(float), format='E'),
+            ])
+            fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(test_dir, file_start.strftime('%Y_%m_%d_%H:%M:%S.fits')))
+        cache_dir = os.path.join(self.test_dir, 'cache')
+        sampler = SamplerData(test_dir, cache_dir=cache_dir)
+        time_range = (start, start + timedelta(seconds=9000))
+        data = sampler.get_data(['DMJD', 'A'], time_range)
+        # the repeated samples are dropped, leaving the times in order
+        self.assertEqual(len(data), 3570 + 3600 + 1200)
+        self.assertTrue(np.all(np.diff(data[:, 0]) > 0))
+        np.testing.assert_array_equal(data[:, 1], np.unique(np.concatenate(seconds)))
+        # as they are by progressive reads, statistics and events, whatever order the
+        # files are read in
+        for preview_files in (1, 2, 3):
+            steps = list(sampler.iter_data_progressive(['A'], time_range, preview_files=preview_files))
+            np.testing.assert_array_equal(steps[-1][0][:, 0], data[:, 1])
+        stats = sampler.get_column_statistics(['A'], time_range)
+        self.assertEqual(stats['A'].count, len(data))
+        self.assertEqual(stats['A'].mean, data[:, 1].mean())
+        self.assertEqual(sampler.get_column_statistics(['A'], time_range)['A'].count, len(data))
+        # the statistics don't need the zone maps of the files to leave the repeats out
+        self.assertFalse(os.path.isfile(sampler.cache_path('.zonemaps.json')))
+        events = sampler.find_events([('A', '>=', 3590), ('A', '<=', 3610)], time_range)
+        self.assertEqual(len(events), 1)
+        self.assertAlmostEqual((events[0][0] - start_mjd) * 86400.0, 3590, places=2)
+        self.assertAlmostEqual((events[0][1] - start_mjd) * 86400.0, 3610, places=2)
+        gap_index = sampler.get_gap_index(time_range)
+        self.assertAlmostEqual(gap_index['step_seconds'], 1.0, places=3)
+        self.assertEqual(len(gap_index['gaps']), 2)
+        for (gap_start, gap_end), (expected_start, expected_end) in zip(gap_index['gaps'], [(99, 130), (7199, 7800)]):
+            self.assertAlmostEqual((gap_start - start_mjd) * 86400.0, expected_start, places=2)
+            self.assertAlmostEqual((gap_end - start_mjd) * 86400.0, expected_end, places=2)
+        self.assertAlmostEqual(gap_index['coverage'], 1 - (31 + 601) / 9000.0, places=4)
+        # the gap index is kept in a sidecar, and the range can extend past the data
+        self.assertEqual(len(SamplerData(test_dir, cache_dir=cache_dir).load_gap_index()), 3)
+        gap_index = SamplerData(test_dir, cache_dir=cache_dir).get_gap_index((start - timedelta(hours=1), start + timedelta(seconds=9000)))
+        self.assertEqual(len(gap_index['gaps']), 3)
+        self.assertAlmostEqual(gap_index['gaps'][0][1], start_mjd)
+        # as for the other queries, a range that isn't a pair of datetimes finds nothing
+        self.assertEqual(sampler.get_gap_index((None, start))['rows'], 0)
+
+    def test_overlay_periods(self):
+        test_dir = os.path.join(self.test_dir, 'overlay')
+        os.makedirs(test_dir)
+        start = datetime(2025, 7, 5, 0, 0, 0)
+        start_mjd = self.sampler.datetime_to_mjd(start)
+        # 6 hour files of a sample a minute, each repeating the last sample of the one before
+        for ifile in range(12):
+            offsets = ifile * 21600 + np.arange(0, 21601, 60)
+            days = np.floor(offsets / 86400.0)
+            cols = fits.ColDefs([
+                fits.Column(name='DMJD', array=start_mjd + offsets / 86400.0, format='D'),
+                fits.Column(name='A', array=days * 100 + (offsets % 86400) / 3600.0, format='D'),
+            ])
+            file_start = start + timedelta(seconds=ifile * 21600)
+            fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(cols)]).writeto(os.path.join(test_dir, file_start.strftime('%Y_%m_%d_%H:%M:%S.fits')))
+        sampler = SamplerData(test_dir)
+        read = []
+        overlay = sampler.overlay_periods(['A'], (datetime(2025, 7, 7, 6, 0), datetime(2025, 7, 7, 12, 0)), num_periods=3, progress_hook=lambda f, i, n: read.append(os.path.basename(f)))
+        # only the files holding 06:00 to 12:00 are read
+        self.assertEqual(sorted(read), [f"2025_07_0{day}_{hour}:00:00.fits" for day in (5, 6, 7) for hour in ('06', '12')])
+        series = overlay.series()
+        self.assertEqual([period for period, _, _ in series], [0, 1, 2])
+        for period, phases, values in series:
+            self.assertEqual(len(phases), 361)
+            np.testing.assert_allclose(values[:, 0], period * 100 + 6 + phases / 3600.0, atol=1e-6)
+
+    def test_table_schema(self):
+        cache_dir = os.path.join(self.test_dir, 'cache')
+        sampler = SamplerData('Weather-Weather2-weather2', cache_dir=cache_dir)
+        cols, units, msg = sampler.find_column_info(datetime(2025, 7, 7, 0, 0), datetime(2025, 7, 8, 0, 0))
+        self.assertIsNone(msg)
+        self.assertEqual(cols, self.weatherCols)
+        self.assertEqual(units, self.weatherUnits)
+        # the schemas are read from the sidecar by a new sampler, without the headers
+        sampler2 = SamplerData('Weather-Weather2-weather2', cache_dir=cache_dir)
+        self.assertEqual(len(sampler2.load_schemas()), 2)
+        self.assertEqual(sampler2.find_column_info(datetime(2025, 7, 7, 0, 0), datetime(2025, 7, 8, 0, 0))[:2], (cols, units))
+        self.assertEqual(sampler2._header_cache, {})
+        # a file that changes replaces its cached header and statistics, rather than adding to them
+        start, end = datetime(2025, 7, 7, 0, 0), datetime(2025, 7, 8, 0, 0)
+        self.sampler.get_table_header(self.fits_filename)
+        self.assertEqual(self.sampler.get_column_statistics(['A'], (start, end))['A'].count, 3)
+        dts = [datetime(2025, 7, 7, 17, 56, 8) + timedelta(seconds=i) for i in range(4)]
+        fits.HDUList([fits.PrimaryHDU(), fits.BinTableHDU.from_columns(fits.ColDefs([
+            fits.Column(name='DMJD', array=[self.sampler.datetime_to_mjd(dt) for dt in dts], format='D'),
+            fits.Column(name='A', array=np.arange(4.0), format='D'),
+            fits.Column(name='B', array=np.arange(4.0), format='D'),
+        ]))]).writeto(self.fits_filename, overwrite=True)
+        self.assertEqual(self.sampler.get_table_header(self.fits_filename)['NAXIS2'], 4)
+        self.assertEqual(self.sampler.get_column_statistics(['A'], (start, end))['A'].count, 4)
+        self.assertEqual(len(self.sampler._header_cache), 1)
+        self.assertEqual(len(self.sampler._stats_cache), 1)
+        # units missing from the header are blank
+        self.assertEqual(self.sampler.get_table_schema(self.fits_filename), (['DMJD', 'A', 'B'], ['', '', '']))
+        self.assertEqual(self.sampler.get_table_schema(os.path.join(self.test_dir, 'missing.fits')), ([], []))
+
     def test_apply_expression_to_data(self):
         arr = np.array([1, 2, 3])
         # Test a simple multiplication
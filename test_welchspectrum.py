@@ -0,0 +1,78 @@
+import unittest
+import numpy as np
+from WelchSpectrum import WelchSpectrum, SPECTRUM_WINDOWS
+
+
+class TestWelchSpectrum(unittest.TestCase):
+    def setUp(self):
+        self.rate = 50.0
+        self.rng = np.random.default_rng(1)
+        self.times = 60863.0 + np.arange(50 * 600) / self.rate / 86400.0
+        seconds = np.arange(len(self.times)) / self.rate
+        self.values = 2.0 * np.sin(2 * np.pi * 5.0 * seconds) + self.rng.normal(size=len(self.times))
+
+    def test_peak(self):
+        spectrum = WelchSpectrum(self.rate, 500)
+        spectrum.add(self.times, self.values)
+        self.assertEqual(spectrum.frequencies[np.argmax(spectrum.psd)], 5.0)
+        self.assertEqual(spectrum.num_segments, (len(self.values) - 500) // 250 + 1)
+        self.assertEqual(spectrum.num_samples, len(self.values))
+
+    def test_parseval(self):
+        # the PSD integrates to the variance of the data
+        for window in SPECTRUM_WINDOWS:
+            spectrum = WelchSpectrum(self.rate, 512, window=window)
+            spectrum.add(self.times, self.values)
+            power = np.sum(spectrum.psd) * (spectrum.frequencies[1] - spectrum.frequencies[0])
+            self.assertAlmostEqual(power / np.var(self.values), 1.0, delta=0.1)
+
+    def test_chunks(self):
+        # the result doesn't depend on how the data is split into chunks
+        whole = WelchSpectrum(self.rate, 256, overlap=0.75, spectrogram_seconds=30)
+        whole.add(self.times, self.values)
+        chunked = WelchSpectrum(self.rate, 256, overlap=0.75, spectrogram_seconds=30)
+        cuts = np.sort(self.rng.integers(0, len(self.values), size=20))
+        for times, values in zip(np.split(self.times, cuts), np.split(self.values, cuts)):
+            chunked.add(times, values)
+        self.assertEqual(chunked.num_segments, whole.num_segments)
+        np.testing.assert_allclose(chunked.psd, whole.psd)
+        np.testing.assert_allclose(chunked.spectrogram()[2], whole.spectrogram()[2])
+
+    def test_gaps(self):
+        # segments don't span a gap in time or a NaN
+        times = np.concatenate([self.times[:1000], self.times[2000:3000]])
+        values = np.concatenate([self.values[:1000], self.values[2000:3000]])
+        values[1500] = np.nan
+        spectrum = WelchSpectrum(self.rate, 200, overlap=0.0)
+        spectrum.add(times[:1100], values[:1100])
+        spectrum.add(times[1100:], values[1100:])
+        self.assertEqual(spectrum.num_gaps, 1)
+        # 5 segments before the gap, 2 between the gap and the NaN, 2 after the NaN
+        self.assertEqual(spectrum.num_segments, 9)
+
+    def test_spectrogram(self):
+        spectrum = WelchSpectrum(self.rate, 500, spectrogram_seconds=60)
+        spectrum.add(self.times[:9000], self.values[:9000])
+        # ten minutes later
+        spectrum.add(self.times[:9000] + 600 / 86400.0, self.values[:9000])
+        times, frequencies, power = spectrum.spectrogram()
+        self.assertEqual(power.shape, (len(times), len(frequencies)))
+        self.assertTrue(np.all(np.diff(times) > 0))
+        # the bins in the gap are empty
+        empty = np.isnan(power).all(axis=1)
+        self.assertTrue(empty.any())
+        self.assertFalse(empty.all())
+        self.assertTrue(np.all(frequencies[np.nanargmax(power[~empty], axis=1)] == 5.0))
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            WelchSpectrum(self.rate, 100, window='kaiser')
+        with self.assertRaises(ValueError):
+            WelchSpectrum(self.rate, 100, overlap=1.0)
+        spectrum = WelchSpectrum(self.rate, 100)
+        self.assertTrue(np.isnan(spectrum.psd).all())
+        self.assertEqual(spectrum.spectrogram()[0].shape, (0,))
+
+
+if __name__ == '__main__':
+    unittest.main()